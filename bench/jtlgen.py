@@ -0,0 +1,97 @@
+"""Synthetic JTL files with realistic shape for benchmarks.
+
+Labels have skewed frequencies and own lognormal latency distributions,
+samples are ordered by time within test duration, threads ramp up during
+first tenth of test, errors are spread randomly.
+
+Usage (from repository root):
+    python -m bench.jtlgen PATH [--rows N] [--labels N] [--errors RATIO] [--span SECONDS] [--seed N]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# columns of JMeter CSV output with default save configuration
+COLUMNS = ['timeStamp', 'elapsed', 'label', 'responseCode', 'responseMessage', 'threadName', 'dataType',
+           'success', 'bytes', 'grpThreads', 'allThreads', 'Latency', 'Connect']
+# epoch time of first sample, msec
+START = 1400000000000
+# rows written at once
+CHUNK = 1000000
+
+
+def label_params(labels, seed=42):
+    """Names, frequencies and lognormal parameters (mu, sigma) of labels.
+    """
+    rng = np.random.RandomState(seed)
+    kinds = ['GET_PAGE', 'POST_FORM', 'SEARCH', 'LOGIN', 'API_CALL']
+    names = np.array(['%s_%03d' % (kinds[i % len(kinds)], i) for i in range(labels)])
+    # Zipf-like frequencies: few labels make most of samples
+    weights = 1. / np.arange(1, labels + 1) ** 0.8
+    return names, weights / weights.sum(), rng.uniform(3, 7, labels), rng.uniform(0.3, 1.2, labels)
+
+
+def generate(path, rows, labels=50, error_ratio=0.01, span=3600, threads=100, seed=42, slowdown=1.):
+    """Write synthetic JTL file.
+
+    Keyword arguments:
+    path -- path of JTL file.
+    rows -- number of samples.
+    labels -- number of labels.
+    error_ratio -- part of failed samples.
+    span -- test duration, seconds.
+    threads -- maximum number of active threads.
+    seed -- random seed, the same arguments give the same file.
+    slowdown -- factor of latencies, e.g. 1.1 for run with 10% regression.
+    """
+    names, weights, mu, sigma = label_params(labels, seed)
+    rng = np.random.RandomState(seed + 1)
+    chunks = max(int(np.ceil(rows / float(CHUNK))), 1)
+    with open(path, 'w') as f:
+        f.write(','.join(COLUMNS) + '\n')
+        for i in range(chunks):
+            size = min(CHUNK, rows - i * CHUNK)
+            # samples of chunk are in its own slice of test duration
+            offset = np.sort(rng.uniform(i, i + 1, size)) / chunks * span * 1000
+            code = rng.choice(labels, size, p=weights)
+            latency = np.floor(rng.lognormal(mu[code], sigma[code]) * slowdown).astype(np.int64)
+            connect = np.floor(latency * rng.uniform(0, 0.1, size)).astype(np.int64)
+            elapsed = latency + np.floor(rng.exponential(5, size)).astype(np.int64)
+            failed = rng.rand(size) < error_ratio
+            active = np.minimum(threads, 1 + offset * threads * 10 // (span * 1000)).astype(np.int64)
+            thread = rng.randint(0, threads, size) % active + 1
+
+            chunk = pd.DataFrame({'timeStamp': START + offset.astype(np.int64),
+                                  'elapsed': elapsed,
+                                  'label': names[code],
+                                  'responseCode': np.where(failed, '500', '200'),
+                                  'responseMessage': np.where(failed, 'Internal Server Error', 'OK'),
+                                  'threadName': np.char.add('Thread Group 1-', thread.astype(str)),
+                                  'dataType': 'text',
+                                  'success': np.where(failed, 'false', 'true'),
+                                  'bytes': rng.randint(200, 20000, size),
+                                  'grpThreads': active,
+                                  'allThreads': active,
+                                  'Latency': latency,
+                                  'Connect': connect},
+                                 columns=COLUMNS)
+            chunk.to_csv(f, header=False, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic JTL file')
+    parser.add_argument('path', metavar='PATH', help='Path of JTL file')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of samples (default 1000000)')
+    parser.add_argument('--labels', type=int, default=50, help='Number of labels (default 50)')
+    parser.add_argument('--errors', type=float, default=0.01, help='Part of failed samples (default 0.01)')
+    parser.add_argument('--span', type=int, default=3600, help='Test duration, seconds (default 3600)')
+    parser.add_argument('--threads', type=int, default=100, help='Maximum number of threads (default 100)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default 42)')
+    parser.add_argument('--slowdown', type=float, default=1., help='Factor of latencies (default 1)')
+    args = parser.parse_args()
+    generate(args.path, args.rows, args.labels, args.errors, args.span, args.threads, args.seed, args.slowdown)
+
+
+if __name__ == '__main__':
+    main()
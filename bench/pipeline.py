@@ -0,0 +1,153 @@
+"""Time and memory of report pipeline stages on synthetic JTL files.
+
+Every report is built in its own process, stage by stage: reading data
+files, timestamp conversion (measured separately on timeStamp column),
+statistics table, copying of static files, plots and template rendering.
+For every stage wall and CPU time, resident memory after stage and growth
+of peak resident memory are written to JSON file, with versions of code and
+libraries, so results of different versions can be compared.
+
+Usage (from repository root):
+    python -m bench.pipeline [--rows N] [--labels N] [--reports Aggregate Compare] [--output FILE]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from bench.jtlgen import generate
+from lib import jtl
+from lib.instrument import peak_rss, rss
+
+# directory of generated data files
+DATA_DIR = 'results/bench'
+# latency factor of second run of Compare report
+SLOWDOWN = 1.1
+
+
+def measure(results, report, stage, func, *args):
+    """Call func(*args), append timings of stage to results and return result.
+    """
+    peak = peak_rss()
+    wall, cpu = time.time(), sum(os.times()[:2])
+    result = func(*args)
+    results.append({'report': report,
+                    'stage': stage,
+                    'wall': round(time.time() - wall, 4),
+                    'cpu': round(sum(os.times()[:2]) - cpu, 4),
+                    'rss_mb': round(rss() / 1048576., 1),
+                    'peak_growth_mb': round((peak_rss() - peak) / 1048576., 1)})
+    print('%-10s %-12s %8.3f s %8.3f s cpu %8.1f MB' % (report, stage, results[-1]['wall'], results[-1]['cpu'],
+                                                        results[-1]['rss_mb']))
+    return result
+
+
+def data_files(args):
+    """Paths of generated data files of base and slow run, files are
+    generated once for every set of parameters.
+    """
+    if not os.path.isdir(DATA_DIR):
+        os.makedirs(DATA_DIR)
+    paths = []
+    for slowdown in (1., SLOWDOWN):
+        path = os.path.join(DATA_DIR, 'jtl_%d_%d_%s_%d_%d_%s.jtl' % (args.rows, args.labels, args.errors, args.span,
+                                                                     args.seed, slowdown))
+        if not os.path.isfile(path):
+            start = time.time()
+            generate(path, args.rows, args.labels, args.errors, args.span, seed=args.seed, slowdown=slowdown)
+            print('generated %s in %.1f s' % (path, time.time() - start))
+        paths.append(path)
+    return paths
+
+
+def run_report(name, paths, args, queue):
+    """Build report `name` from data files stage by stage and put list of
+    stage results into queue.
+    """
+    results = []
+    try:
+        _build(name, paths, args, results)
+    except Exception as e:
+        traceback.print_exc()
+        results.append({'report': name, 'stage': 'error', 'error': repr(e)})
+    queue.put(results)
+
+
+def _build(name, paths, args, results):
+    module = __import__('reports.' + name + '.report', fromlist=[name + 'Report'])
+    report = getattr(module, name + 'Report')()
+    report.set_quantiles(args.quantiles)
+    report.set_jobs(args.jobs)
+    report.set_charts(args.charts)
+
+    measure(results, name, 'read_csv', report.read_csv, paths, args.chunksize)
+    timestamps = pd.read_csv(paths[0], usecols=['timeStamp'])['timeStamp']
+    measure(results, name, 'to_datetime', jtl.to_datetime, timestamps)
+    del timestamps
+
+    # rows of table are generated lazily, consume them to measure
+    data = measure(results, name, 'html_data', lambda: ''.join(report._generate_html_data()))
+    report_name = measure(results, name, 'copy_files', report._prepare_report_dir, 'bench_' + name)
+    if not args.no_plots:
+        measure(results, name, 'plots', report._generate_plots, report_name)
+    # template is rendered with table of previous stage
+    report._generate_html_data = lambda: [data]
+    html = measure(results, name, 'render', lambda: ''.join(report._generate_html_report()))
+    with open('results/' + report_name + '/index.html', 'w') as f:
+        f.write(html)
+
+
+def versions():
+    """Versions of code, Python and libraries.
+    """
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.STDOUT).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'platform': platform.platform()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of report stages on synthetic JTL files')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of samples of run (default 1000000)')
+    parser.add_argument('--labels', type=int, default=50, help='Number of labels (default 50)')
+    parser.add_argument('--errors', type=float, default=0.01, help='Part of failed samples (default 0.01)')
+    parser.add_argument('--span', type=int, default=3600, help='Test duration, seconds (default 3600)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed of data (default 42)')
+    parser.add_argument('--reports', nargs='+', default=['Aggregate', 'Compare'], help='Reports to build')
+    parser.add_argument('--chunksize', type=int, help='Streaming mode with chunks of ROWS rows')
+    parser.add_argument('--quantiles', choices=['exact', 'histogram', 'sketch'], help='Percentile engine')
+    parser.add_argument('--charts', choices=['png', 'json'], default='png', help='Output of plots (default png)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of processes (default 1)')
+    parser.add_argument('--no-plots', action='store_true', help='Skip plots stage')
+    parser.add_argument('--output', default='results/bench/pipeline.json', help='JSON file of results')
+    args = parser.parse_args()
+
+    paths = data_files(args)
+    results = []
+    for name in args.reports:
+        # every report in own process, so peak memory of one does not hide the other
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=run_report,
+                                          args=(name, paths if name == 'Compare' else paths[:1], args, queue))
+        process.start()
+        results.extend(queue.get())
+        process.join()
+
+    params = dict((k, v) for k, v in vars(args).items() if k != 'output')
+    with open(args.output, 'w') as f:
+        json.dump({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'versions': versions(), 'params': params,
+                   'stages': results}, f, indent=2)
+    print('results written to %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
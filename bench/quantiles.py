@@ -0,0 +1,62 @@
+"""Accuracy and speed of quantile engines compared to np.percentile.
+
+Usage (from repository root):
+    python -m bench.quantiles [SAMPLES]
+"""
+import sys
+import time
+
+import numpy as np
+
+from lib.quantiles import ExactQuantiles, IntegerHistogram, LogHistogram
+
+PERCENTILES = [50, 90, 95, 99, 99.9]
+CHUNK = 100000
+
+
+def distributions(size, seed=42):
+    """Synthetic latency samples in msec.
+    """
+    rng = np.random.RandomState(seed)
+    yield 'lognormal', np.floor(rng.lognormal(5, 1, size))
+    yield 'bimodal', np.floor(np.concatenate([rng.normal(50, 5, size // 2).clip(0),
+                                              rng.lognormal(7, 0.5, size - size // 2)]))
+    yield 'timeouts', np.floor(np.where(rng.rand(size) < 0.01, 60000, rng.exponential(200, size)))
+
+
+def engines():
+    yield 'exact', ExactQuantiles
+    yield 'histogram', IntegerHistogram
+    for error in (0.05, 0.01, 0.001):
+        yield 'sketch %s' % error, lambda error=error: LogHistogram(error)
+
+
+def measure(factory, values):
+    engine = factory()
+    start = time.time()
+    for i in range(0, len(values), CHUNK):
+        engine.update(values[i:i + CHUNK])
+    update_time = time.time() - start
+
+    start = time.time()
+    result = engine.percentile(PERCENTILES)
+    query_time = time.time() - start
+
+    buckets = len(getattr(engine, 'counts', [])) or engine.count
+    return result, update_time, query_time, buckets
+
+
+def main(size):
+    print('%-10s %-14s %10s %10s %10s %s' % ('data', 'engine', 'update, s', 'query, ms', 'buckets',
+                                              '  '.join('p%s err,%%' % p for p in PERCENTILES)))
+    for data_name, values in distributions(size):
+        expected = np.percentile(values, PERCENTILES)
+        for engine_name, factory in engines():
+            result, update_time, query_time, buckets = measure(factory, values)
+            errors = np.abs(result - expected) / np.maximum(expected, 1) * 100
+            print('%-10s %-14s %10.3f %10.3f %10d %s' % (data_name, engine_name, update_time, query_time * 1000,
+                                                         buckets, '  '.join('%9.3f' % e for e in errors)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
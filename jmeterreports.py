@@ -3,10 +3,35 @@ __author__ = 'Evgeny.Luvsandugar'
 import argparse
 import os
 
+from lib.artifacts import DEFAULT_ARTIFACTS_DIR, ArtifactCache
+from lib.cache import DEFAULT_CACHE_DIR, JtlCache
+from lib.instrument import PROFILERS, Instrumentation
+from lib.runstore import DEFAULT_RUNS_DIR, RunStore
+from lib.timeseries import RESOLUTIONS
+
 parser = argparse.ArgumentParser(description='JMeter report generator')
 parser.add_argument('name', metavar='REPORT_NAME', type=str, help='Report name')
-parser.add_argument('data_files', metavar='DATA_FILE', type=str, nargs='*', help='Path to JMeter jtl report in CSV format (from aggregate report or simple data writer)')
+parser.add_argument('data_files', metavar='DATA_FILE', type=str, nargs='*', help='Path or glob pattern of JMeter jtl reports in CSV format (from aggregate report or simple data writer)')
 parser.add_argument('-d', '--description', metavar='DESCRIPTION', type=str, help='Path to YAML file with report description')
+parser.add_argument('--chunksize', metavar='ROWS', type=int, help='Read data files by chunks of ROWS rows and keep only statistics by label (low memory, no per-label plots)')
+parser.add_argument('--quantiles', metavar='ENGINE', choices=['exact', 'histogram', 'sketch'], help='Percentile engine: exact (default for whole file), histogram (exact for integer msec) or sketch (bounded memory, default with --chunksize)')
+parser.add_argument('--quantile-error', metavar='ERROR', type=float, default=0.01, help='Relative error of percentiles calculated by sketch (default 0.01)')
+parser.add_argument('-j', '--jobs', metavar='N', type=int, default=1, help='Number of processes for reading data files and plot rendering (default 1)')
+parser.add_argument('--resolution', metavar='SECONDS', type=int, choices=RESOLUTIONS, default=10, help='Resolution of time series (requests per second, errors, threads, percentiles over time): 1, 10 or 60 seconds (default 10)')
+parser.add_argument('--charts', metavar='MODE', choices=['png', 'json'], default='png', help='Plots as png images (default) or json: downsampled chart data drawn by browser when label row is expanded')
+parser.add_argument('--no-plots', action='store_true', help='Table-only report: statistics without plots and charts, plotting libraries are not loaded')
+parser.add_argument('--single-file', action='store_true', help='Write report as one self-contained HTML file results/<name>.html with inlined static files and compressed plots, instead of directory')
+parser.add_argument('--cache', metavar='DIR', nargs='?', const=DEFAULT_CACHE_DIR, help='Cache parsed data files in DIR (default "%s") and memory map them on next runs' % DEFAULT_CACHE_DIR)
+parser.add_argument('--plot-cache', metavar='DIR', nargs='?', const=DEFAULT_ARTIFACTS_DIR, help='Cache rendered plots in DIR (default "%s") by hash of their data, unchanged plots are linked instead of rendered on next runs' % DEFAULT_ARTIFACTS_DIR)
+parser.add_argument('--cache-max-size', metavar='MB', type=int, default=10240, help='Maximum total size of every cache (default 10240 MB)')
+parser.add_argument('--cache-max-age', metavar='DAYS', type=int, default=30, help='Remove cache entries unused for DAYS days (default 30)')
+parser.add_argument('--baseline', metavar='N', type=int, default=1, help='Number of baseline test run for Compare report, trends of other runs are calculated against it (default 1)')
+parser.add_argument('--alpha', metavar='LEVEL', type=float, default=0.05, help='Significance level of differences against baseline run in Compare report, 0 to skip significance tests (default 0.05)')
+parser.add_argument('--save-run', metavar='RUN_ID', type=str, help='Save summary of test into run store, RUN_ID can be used instead of data file in Compare report')
+parser.add_argument('--runs', metavar='DIR', type=str, default=DEFAULT_RUNS_DIR, help='Directory of run store (default "%s")' % DEFAULT_RUNS_DIR)
+parser.add_argument('--follow', metavar='SECONDS', type=int, nargs='?', const=10, help='Live report of running test: tail data files and regenerate report every SECONDS seconds (default 10) until Ctrl+C')
+parser.add_argument('--stats', action='store_true', help='Measure time and memory of generation stages, write them into stats.json and "Generation stats" panel of report')
+parser.add_argument('--profile', metavar='PROFILER', choices=PROFILERS, help='Run profiler during generation: cprofile (function timings, also stats.pstats) or tracemalloc (allocated memory), implies --stats')
 parser.add_argument('--perfmon', metavar='PERFMON_CONFIG', type=str, help='Perfmon plot configurator')
 args = parser.parse_args()
 
@@ -17,9 +42,38 @@ if not os.path.isdir('results/'):
     os.mkdir('results')
 
 report = klass()
-report.read_csv(args.data_files)
-if args.perfmon:
-    report.read_perfmon(args.perfmon)
-if args.description:
-    report.set_description(args.description)
-report.to_html(args.name)
\ No newline at end of file
+if args.stats or args.profile:
+    report.set_instrumentation(Instrumentation(args.profile))
+report.set_quantiles(args.quantiles, args.quantile_error)
+report.set_jobs(args.jobs)
+report.set_charts(None if args.no_plots else args.charts)
+report.set_resolution(args.resolution)
+report.set_single_file(args.single_file)
+if args.cache:
+    report.set_cache(JtlCache(args.cache, args.cache_max_size * 1024 * 1024, args.cache_max_age * 24 * 3600))
+if args.plot_cache:
+    report.set_artifacts(ArtifactCache(args.plot_cache, args.cache_max_size * 1024 * 1024, args.cache_max_age * 24 * 3600))
+report.set_run_store(RunStore(args.runs))
+if args.follow:
+    if not hasattr(report, 'follow'):
+        parser.error('--follow is not supported by %s report' % args.name)
+    if args.single_file:
+        parser.error('--single-file is not supported with --follow')
+    if args.description:
+        report.set_description(args.description)
+    report.follow(args.data_files, args.name, args.follow)
+else:
+    report.read_csv(args.data_files, chunksize=args.chunksize)
+    if args.save_run:
+        if not hasattr(report, 'save_run'):
+            parser.error('--save-run is not supported by %s report' % args.name)
+        report.save_run(args.save_run)
+    if hasattr(report, 'set_baseline'):
+        report.set_baseline(args.baseline - 1)
+    if hasattr(report, 'set_significance'):
+        report.set_significance(args.alpha or None)
+    if args.perfmon:
+        report.read_perfmon(args.perfmon)
+    if args.description:
+        report.set_description(args.description)
+    report.to_html(args.name)
\ No newline at end of file
@@ -0,0 +1,455 @@
+import numpy as np
+import pandas as pd
+
+from lib import jtl
+from lib.quantiles import IntegerHistogram
+from lib.timeseries import success_mask
+
+# columns of data frame with statistics by label
+# (duration is seconds from first to last sample, see durations)
+STATS_COLUMNS = ['count', 'mean', 'median', 'percentile90', 'amin', 'amax', 'std', 'sum', 'duration']
+# columns of data frame with error, time breakdown and traffic statistics by label
+DETAILS_COLUMNS = ['count', 'errors', 'error_rate', 'elapsed', 'connect', 'server', 'download', 'bytes_per_sec']
+# JTL columns used for details
+DETAILS_SOURCE = ['timeStamp', 'elapsed', 'success', 'responseCode', 'bytes', 'Connect']
+
+
+def group_stats(codes, values, n_groups, percentiles=(50, 90)):
+    """Statistics of values by group in one pass over data sorted by group.
+
+    Samples are sorted by group (and by value inside group if percentiles are
+    requested) once, then every statistic is a segment reduction over
+    contiguous groups, without python loop by group.
+
+    Keyword arguments:
+    codes -- group index of every value, integers from 0 to n_groups - 1.
+    values -- array of values.
+    n_groups -- number of groups.
+    percentiles -- percentiles to calculate (numbers from 0 to 100).
+
+    Return dict of arrays of length n_groups: count, sum, min, max, mean, m2
+    (sum of squared differences from the mean), and arrays of percentiles
+    by percentile. Statistics of empty groups are NaN.
+    """
+    codes = np.asarray(codes)
+    values = np.asarray(values)
+    if percentiles:
+        order = np.lexsort((values, codes))
+    else:
+        order = np.argsort(codes, kind='mergesort')
+    return segment_stats(values[order].astype(np.float64), np.bincount(codes, minlength=n_groups), percentiles,
+                         sorted_values=bool(percentiles))
+
+
+def segment_stats(v, count, percentiles=(50, 90), sorted_values=True):
+    """Statistics of groups of values stored contiguously, see group_stats.
+
+    Keyword arguments:
+    v -- float array of values ordered by group.
+    count -- number of values of every group.
+    percentiles -- percentiles to calculate, values must be sorted inside
+                   groups.
+    sorted_values -- values are sorted inside groups, so minimum and maximum
+                     are taken from ends of groups.
+    """
+    count = np.asarray(count)
+    n_groups = len(count)
+    present = np.flatnonzero(count)
+    n = count[present]
+    starts = np.cumsum(count)[present] - n
+
+    result = {'count': count}
+
+    def scatter(data):
+        full = np.full(n_groups, np.nan)
+        full[present] = data
+        return full
+
+    if not len(v):
+        for name in ('sum', 'min', 'max', 'mean', 'm2'):
+            result[name] = np.full(n_groups, np.nan)
+        for q in percentiles:
+            result[q] = np.full(n_groups, np.nan)
+        return result
+
+    total = np.add.reduceat(v, starts)
+    mean = total / n
+    result['sum'] = scatter(total)
+    result['mean'] = scatter(mean)
+    result['m2'] = scatter(np.add.reduceat((v - np.repeat(mean, n)) ** 2, starts))
+    if sorted_values:
+        result['min'] = scatter(v[starts])
+        result['max'] = scatter(v[starts + n - 1])
+    else:
+        result['min'] = scatter(np.minimum.reduceat(v, starts))
+        result['max'] = scatter(np.maximum.reduceat(v, starts))
+
+    # percentiles with linear interpolation, as np.percentile
+    for q in percentiles:
+        pos = q / 100. * (n - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.ceil(pos).astype(np.int64)
+        v_lo = v[starts + lo]
+        result[q] = scatter(v_lo + (v[starts + hi] - v_lo) * (pos - lo))
+
+    return result
+
+
+def durations(first, last):
+    """Seconds from first to last sample by label from times in msec, at
+    least 1 second, NaN for labels without times.
+    """
+    with np.errstate(invalid='ignore'):
+        return np.where(np.isfinite(first), np.maximum((last - first) / 1000., 1.), np.nan)
+
+
+def stats_frame(labels, count, total, vmin, vmax, m2, median, percentile90, duration=None):
+    """Data frame of statistics by label with STATS_COLUMNS columns, sorted by label.
+    Duration is NaN if it is None.
+    """
+    count = np.asarray(count)
+    std = np.sqrt(m2 / np.maximum(count - 1, 1))
+    std[count < 2] = np.nan
+    result = pd.DataFrame({'count': count,
+                           'mean': total / np.maximum(count, 1),
+                           'median': median,
+                           'percentile90': percentile90,
+                           'amin': vmin,
+                           'amax': vmax,
+                           'std': std,
+                           'sum': total,
+                           'duration': np.nan if duration is None else duration},
+                          index=pd.Index(labels, name='label'),
+                          columns=STATS_COLUMNS)
+    return result[result['count'] > 0].sort_index()
+
+
+def merge_stats(partials):
+    """Merge list of LabelStats into the first one and return it.
+    """
+    result = partials[0]
+    for stats in partials[1:]:
+        result.merge(stats)
+    return result
+
+
+def throughput(stats):
+    """Throughput by label, req/sec, from data frame of statistics: number of
+    samples per second of time from first to last sample of label, NaN if
+    times of samples are unknown.
+    """
+    return stats['count'] / stats['duration']
+
+
+class LabelStats(object):
+    """Incremental latency statistics by label.
+
+    Chunks of samples are merged into count, sum, min, max and M2 (sum of
+    squared differences from the mean) by label and into quantile engine by
+    label (see lib.quantiles), so with histogram or sketch engine memory
+    depends on number of labels and not on number of samples.
+    """
+
+    def __init__(self, engine=IntegerHistogram, details=False):
+        """Keyword arguments:
+        engine -- function creating empty quantile engine for label, None to
+                  skip percentiles.
+        details -- also collect errors, response codes, elapsed, connect time
+                   and bytes by label from chunks of samples, see update.
+        """
+        self.engine = engine
+        self.details = details
+        # label names in order of appearance
+        self.labels = []
+        self._index = {}
+        self.count = np.zeros(0, dtype=np.int64)
+        self.sum = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        self.m2 = np.zeros(0)
+        # quantile engine for every label
+        self.quantiles = []
+        # first and last time of samples (ms), infinite without times
+        self.first = np.zeros(0)
+        self.last = np.zeros(0)
+        # details: number of errors, sums of elapsed, connect time and bytes,
+        # number of samples with connect time
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.elapsed = np.zeros(0)
+        self.connect = np.zeros(0)
+        self.connect_count = np.zeros(0, dtype=np.int64)
+        self.bytes = np.zeros(0)
+        # columns of DETAILS_SOURCE found in samples
+        self.sources = set()
+        # response codes and labels x codes counts
+        self.codes = []
+        self._code_index = {}
+        self.code_counts = np.zeros((0, 0), dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, engine, labels, quantiles=None, **arrays):
+        """Statistics of labels from saved arrays (e.g. of lib.runstore).
+
+        Keyword arguments:
+        engine -- function creating empty quantile engine for label.
+        labels -- list of labels.
+        quantiles -- quantile engines of labels, empty ones if None.
+        arrays -- arrays by label by attribute name (count, sum, min, max, m2,
+                  first, last, ...), other arrays are empty statistics.
+        """
+        stats = cls(engine)
+        stats._add_labels(list(labels))
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            if values.shape != getattr(stats, name).shape:
+                raise ValueError('%s of %d labels expected, got shape %s' % (name, len(stats.labels), values.shape))
+            setattr(stats, name, values)
+        if quantiles is not None:
+            stats.quantiles = list(quantiles)
+        return stats
+
+    def update(self, labels, values, chunk=None):
+        """Add chunk of samples.
+
+        Keyword arguments:
+        labels -- labels of samples (categorical Series or array).
+        values -- latencies of samples in msec.
+        chunk -- data frame of samples with timeStamp column or index for
+                 duration (see durations) and DETAILS_SOURCE columns (any of
+                 them) for details, None to skip them.
+        """
+        g = self._label_codes(labels)
+        values = np.asarray(values)
+        mask = g >= 0
+        if not mask.all():
+            g = g[mask]
+            values = values[mask]
+        else:
+            mask = None
+        if len(g) == 0:
+            return
+        if chunk is not None:
+            self._update_times(g, chunk, mask)
+        if self.details and chunk is not None:
+            self._update_details(g, chunk, mask)
+
+        chunk = group_stats(g, values, len(self.labels), percentiles=())
+        count = chunk['count']
+        present = count > 0
+        self._merge_moments(count,
+                            np.where(present, chunk['sum'], 0),
+                            np.where(present, chunk['m2'], 0),
+                            chunk['min'],
+                            chunk['max'])
+
+        # split samples by label and update quantile engines
+        if self.engine is None:
+            return
+        order = np.argsort(g, kind='mergesort')
+        bounds = np.cumsum(count)
+        sorted_values = values[order]
+        for i in np.flatnonzero(count):
+            end = bounds[i]
+            self.quantiles[i].update(sorted_values[end - count[i]:end])
+
+    def merge(self, other):
+        """Add statistics of other LabelStats, e.g. of other file of the same test.
+        Quantile engines of both statistics must be of the same kind.
+        """
+        if not other.labels:
+            return
+        index = self._label_codes(np.array(other.labels, dtype=object))
+        n = len(self.labels)
+
+        def align(values, fill):
+            result = np.full(n, fill, dtype=np.asarray(values).dtype)
+            result[index] = values
+            return result
+
+        self._merge_moments(align(other.count, 0), align(other.sum, 0), align(other.m2, 0),
+                            align(other.min, np.inf), align(other.max, -np.inf))
+        for i, engine in zip(index, other.quantiles):
+            self.quantiles[i].merge(engine)
+        self.first = np.fmin(self.first, align(other.first, np.inf))
+        self.last = np.fmax(self.last, align(other.last, -np.inf))
+
+        if self.details and other.details:
+            self.sources |= other.sources
+            self.errors = self.errors + align(other.errors, 0)
+            self.elapsed = self.elapsed + align(other.elapsed, 0)
+            self.connect = self.connect + align(other.connect, 0)
+            self.connect_count = self.connect_count + align(other.connect_count, 0)
+            self.bytes = self.bytes + align(other.bytes, 0)
+            columns = np.array([self._code(code) for code in other.codes], dtype=np.int64)
+            counts = np.zeros((n, len(self.codes)), dtype=np.int64)
+            counts[np.ix_(index, columns)] = other._code_matrix()
+            self.code_counts = self._code_matrix() + counts
+
+    def details_frame(self):
+        """Details as data frame indexed by label with DETAILS_COLUMNS columns:
+        number and rate (%) of errors, mean elapsed, connect, server (latency
+        without connect) and download (elapsed without latency) time in msec
+        and bytes per second of time from first to last sample of label.
+        Columns without source data in samples are NaN.
+        """
+        def source(name, values):
+            return values if name in self.sources else np.full(len(self.labels), np.nan)
+
+        count = np.maximum(self.count, 1)
+        connect = np.where(self.connect_count > 0, self.connect / np.maximum(self.connect_count, 1), np.nan)
+        elapsed = source('elapsed', self.elapsed / count)
+        latency = self.sum / count
+        duration = durations(self.first, self.last)
+        result = pd.DataFrame({'count': self.count,
+                               'errors': source('success', self.errors),
+                               'error_rate': source('success', self.errors * 100. / count),
+                               'elapsed': elapsed,
+                               'connect': connect,
+                               'server': latency - connect,
+                               'download': elapsed - latency,
+                               'bytes_per_sec': source('bytes', self.bytes) / duration},
+                              index=pd.Index(self.labels, name='label'),
+                              columns=DETAILS_COLUMNS)
+        return result[result['count'] > 0].sort_index()
+
+    def codes_frame(self):
+        """Number of samples by label (rows) and response code (columns).
+        """
+        result = pd.DataFrame(self._code_matrix(), index=pd.Index(self.labels, name='label'),
+                              columns=pd.Index(self.codes, name='responseCode'))
+        return result[self.count > 0].sort_index()[sorted(self.codes)]
+
+    def frame(self):
+        """Statistics as data frame indexed by label with STATS_COLUMNS columns.
+        """
+        if self.engine is None:
+            percentiles = np.full((len(self.labels), 2), np.nan)
+        else:
+            percentiles = np.array([e.percentile([50, 90]) for e in self.quantiles]).reshape(-1, 2)
+        return stats_frame(self.labels, self.count, self.sum, self.min, self.max, self.m2,
+                           percentiles[:, 0], percentiles[:, 1], durations(self.first, self.last))
+
+    def _merge_moments(self, count, total, m2, vmin, vmax):
+        """Merge moments of new samples by label, see Chan et al. parallel
+        variance algorithm.
+        """
+        old_count = self.count
+        new_count = old_count + count
+        delta = total / np.maximum(count, 1) - self.sum / np.maximum(old_count, 1)
+        self.m2 = self.m2 + m2 + delta ** 2 * old_count * count / np.maximum(new_count, 1)
+        self.count = new_count
+        self.sum = self.sum + total
+        self.min = np.fmin(self.min, vmin)
+        self.max = np.fmax(self.max, vmax)
+
+    def _label_codes(self, labels):
+        """Map labels of chunk to indices of labels in statistics.
+        """
+        if hasattr(labels, 'cat'):
+            codes = np.asarray(labels.cat.codes)
+            uniques = labels.cat.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(labels))
+
+        self._add_labels([label for label in uniques if label not in self._index])
+        mapping = np.array([self._index[label] for label in uniques], dtype=np.int64)
+        result = np.full(len(codes), -1, dtype=np.int64)
+        valid = codes >= 0
+        result[valid] = mapping[codes[valid]]
+        return result
+
+    def _add_labels(self, new):
+        """Append new labels with empty statistics to all arrays.
+        """
+        if new:
+            for label in new:
+                self._index[label] = len(self.labels)
+                self.labels.append(label)
+                if self.engine is not None:
+                    self.quantiles.append(self.engine())
+            size = len(new)
+            self.count = np.concatenate([self.count, np.zeros(size, dtype=np.int64)])
+            self.sum = np.concatenate([self.sum, np.zeros(size)])
+            self.min = np.concatenate([self.min, np.full(size, np.inf)])
+            self.max = np.concatenate([self.max, np.full(size, -np.inf)])
+            self.m2 = np.concatenate([self.m2, np.zeros(size)])
+            self.errors = np.concatenate([self.errors, np.zeros(size, dtype=np.int64)])
+            self.elapsed = np.concatenate([self.elapsed, np.zeros(size)])
+            self.connect = np.concatenate([self.connect, np.zeros(size)])
+            self.connect_count = np.concatenate([self.connect_count, np.zeros(size, dtype=np.int64)])
+            self.bytes = np.concatenate([self.bytes, np.zeros(size)])
+            self.first = np.concatenate([self.first, np.full(size, np.inf)])
+            self.last = np.concatenate([self.last, np.full(size, -np.inf)])
+
+    def _update_times(self, g, chunk, mask):
+        """Update first and last time of labels from chunk, `g` is label index
+        of every (masked) sample.
+        """
+        n = len(self.labels)
+        # only differences of times are used, so epoch and local time are equal
+        if 'timeStamp' in chunk:
+            times = chunk['timeStamp']
+            if not pd.api.types.is_numeric_dtype(times):
+                times = jtl.to_datetime(times).values.astype('datetime64[ms]').astype(np.int64)
+            times = np.asarray(times) if mask is None else np.asarray(times)[mask]
+        elif isinstance(chunk.index, pd.DatetimeIndex):
+            times = chunk.index.values.astype('datetime64[ms]').astype(np.int64)
+            times = times if mask is None else times[mask]
+        else:
+            times = None
+        if times is not None:
+            times = times.astype(np.float64)
+            first = np.full(n, np.inf)
+            last = np.full(n, -np.inf)
+            np.minimum.at(first, g, times)
+            np.maximum.at(last, g, times)
+            self.first = np.fmin(self.first, first)
+            self.last = np.fmax(self.last, last)
+
+    def _update_details(self, g, chunk, mask):
+        """Add details of chunk, `g` is label index of every (masked) sample.
+        """
+        n = len(self.labels)
+        self.sources.update(c for c in DETAILS_SOURCE if c in chunk)
+        if isinstance(chunk.index, pd.DatetimeIndex):
+            self.sources.add('timeStamp')
+
+        def column(name):
+            values = np.asarray(chunk[name])
+            return values if mask is None else values[mask]
+
+        if 'success' in chunk:
+            self.errors = self.errors + np.bincount(g[~success_mask(column('success'))], minlength=n)
+        if 'elapsed' in chunk:
+            self.elapsed = self.elapsed + np.bincount(g, weights=column('elapsed').astype(np.float64), minlength=n)
+        if 'bytes' in chunk:
+            self.bytes = self.bytes + np.bincount(g, weights=column('bytes').astype(np.float64), minlength=n)
+        if 'Connect' in chunk:
+            self.connect = self.connect + np.bincount(g, weights=column('Connect').astype(np.float64), minlength=n)
+            self.connect_count = self.connect_count + np.bincount(g, minlength=n)
+
+        if 'responseCode' in chunk:
+            codes, uniques = pd.factorize(column('responseCode').astype(str))
+            columns = np.array([self._code(code) for code in uniques], dtype=np.int64)
+            counts = self._code_matrix()
+            m = len(self.codes)
+            counts += np.bincount(g * m + columns[codes], minlength=n * m).reshape(n, m)
+            self.code_counts = counts
+
+    def _code(self, code):
+        """Index of response code, new codes are appended.
+        """
+        if code not in self._code_index:
+            self._code_index[code] = len(self.codes)
+            self.codes.append(code)
+        return self._code_index[code]
+
+    def _code_matrix(self):
+        """Counts of response codes resized to current labels and codes.
+        """
+        counts = self.code_counts
+        shape = (len(self.labels), len(self.codes))
+        if counts.shape != shape:
+            counts = np.zeros(shape, dtype=np.int64)
+            counts[:self.code_counts.shape[0], :self.code_counts.shape[1]] = self.code_counts
+        return counts
@@ -0,0 +1,203 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib.cache import DEFAULT_MAX_AGE, DEFAULT_MAX_SIZE, evict
+
+# default directory of cached plots
+DEFAULT_ARTIFACTS_DIR = 'plot_cache'
+# modules shared by plot functions, their code is part of every key
+SHARED_MODULES = ('lib.plots', 'lib.charts', 'lib.density', 'lib.downsample', 'lib.samples')
+
+_META = 'meta.json'
+# content hashes of module sources by module name
+_source_hashes = {}
+
+
+def _source_hash(name):
+    """SHA1 of source of module `name`, empty if module has no source file.
+    """
+    if name not in _source_hashes:
+        h = hashlib.sha1()
+        module = sys.modules.get(name) or __import__(name, fromlist=['__name__'])
+        try:
+            path = inspect.getsourcefile(module)
+        except TypeError:
+            path = None
+        if path and os.path.isfile(path):
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        _source_hashes[name] = h.hexdigest()
+    return _source_hashes[name]
+
+
+def _update(h, value):
+    """Feed value into hash: arrays by dtype, shape and content, data frames
+    by columns and index, containers recursively, other values by repr.
+    """
+    if isinstance(value, pd.DataFrame):
+        h.update(b'frame')
+        _update(h, [str(c) for c in value.columns])
+        _update(h, value.index)
+        for c in value.columns:
+            _update(h, value[c])
+    elif isinstance(value, (pd.Series, pd.Index)):
+        h.update(b'series')
+        _update(h, np.asarray(value))
+    elif isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            h.update(b'objects')
+            _update(h, value.tolist())
+        else:
+            h.update(('array %s %s' % (value.dtype.str, value.shape)).encode('utf-8'))
+            h.update(np.ascontiguousarray(value).reshape(-1).view(np.uint8))
+    elif isinstance(value, (list, tuple)):
+        h.update(('%s %d' % (type(value).__name__, len(value))).encode('utf-8'))
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, dict):
+        h.update(('dict %d' % len(value)).encode('utf-8'))
+        for k, v in sorted(value.items(), key=lambda x: repr(x[0])):
+            _update(h, k)
+            _update(h, v)
+    elif hasattr(value, '__dict__'):
+        # objects of plot arguments (e.g. lib.samples.Samples) by attributes
+        h.update(('object %s' % type(value).__name__).encode('utf-8'))
+        _update(h, vars(value))
+    else:
+        h.update(repr(value).encode('utf-8'))
+    h.update(b'\0')
+
+
+def _link(src, dst):
+    """Hard link src to dst, copy it if linking is not possible (other file
+    system, no support). Existing dst is replaced, not overwritten, so file
+    of cache linked to it earlier is not changed.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except (OSError, AttributeError):
+        shutil.copyfile(src, dst)
+
+
+class ArtifactCache(object):
+    """Content addressed cache of rendered plots and chart data files.
+
+    Key of plot task is hash of its input: arrays of samples, data frames and
+    other arguments, name of output file, code of plot function and of shared
+    plot modules and style (e.g. matplotlib version). Files of known key are
+    hard linked into report directory instead of rendering plot again.
+
+    Missing plots are rendered into temporary directory inside cache and
+    moved into new entry, report files are always links to entries made after
+    old report file is removed. So rendering over existing report (live
+    report, the same report name) never writes into cached file.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_ARTIFACTS_DIR, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE):
+        """Keyword arguments:
+        cache_dir -- cache directory.
+        max_size -- maximum total size of cache in bytes.
+        max_age -- maximum age of unused entry in seconds.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        # number of plots restored from cache by last render
+        self.restored = 0
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def key(self, func, args, style=''):
+        """Key of plot task (func, args), args[0] is output path or prefix of
+        output files.
+        """
+        h = hashlib.sha1()
+        h.update(('%s.%s\0%s\0' % (func.__module__, func.__name__, style)).encode('utf-8'))
+        for name in (func.__module__,) + SHARED_MODULES:
+            h.update(_source_hash(name).encode('utf-8'))
+        _update(h, os.path.basename(args[0]))
+        _update(h, list(args[1:]))
+        return h.hexdigest()
+
+    def render(self, tasks, run, style=''):
+        """Restore files of plot tasks from cache and render missing ones.
+
+        Keyword arguments:
+        tasks -- list of (function, args) tuples, see lib.plots.render. Every
+                 file written by function must be in its timings.
+        run -- function rendering list of tasks, returns list of timings of
+               every task.
+        style -- description of plot style, part of keys.
+
+        Return list of timings of every task, restored files have zero time.
+        """
+        keys = [self.key(func, args, style) for func, args in tasks]
+        results = [None] * len(tasks)
+        missing = []
+        for i, (func, args) in enumerate(tasks):
+            timings = self._restore(keys[i], os.path.dirname(args[0]))
+            if timings is None:
+                missing.append(i)
+            else:
+                results[i] = [(name, 0.) for name, _ in timings]
+        self.restored = len(tasks) - len(missing)
+        if not missing:
+            return results
+
+        tmp_dirs = [tempfile.mkdtemp(prefix='tmp', dir=self.cache_dir) for _ in missing]
+        try:
+            pending = [(tasks[i][0], (os.path.join(tmp, os.path.basename(tasks[i][1][0])),) + tuple(tasks[i][1][1:]))
+                       for i, tmp in zip(missing, tmp_dirs)]
+            for i, tmp, timings in zip(missing, tmp_dirs, run(pending)):
+                self._store(keys[i], tmp, timings)
+                self._restore(keys[i], os.path.dirname(tasks[i][1][0]))
+                results[i] = timings
+        finally:
+            for tmp in tmp_dirs:
+                shutil.rmtree(tmp, ignore_errors=True)
+        evict(self.cache_dir, self.max_size, self.max_age)
+        return results
+
+    def _restore(self, key, out_dir):
+        """Link files of entry into out_dir, return their timings or None if
+        entry does not exist or is incomplete (e.g. file removed by hand),
+        then it is rendered again.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry, _META)) as f:
+                timings = json.load(f)['timings']
+        except (IOError, OSError, ValueError):
+            return None
+        if out_dir and not os.path.isdir(out_dir):
+            os.makedirs(out_dir)
+        try:
+            for name, _ in timings:
+                _link(os.path.join(entry, name), os.path.join(out_dir, name))
+        except (IOError, OSError):
+            return None
+        # mark entry as recently used
+        os.utime(entry, None)
+        return timings
+
+    def _store(self, key, tmp, timings):
+        """Turn temporary directory with rendered files into entry.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        with open(os.path.join(tmp, _META), 'w') as f:
+            json.dump({'timings': timings, 'time': time.time()}, f)
+        if os.path.isdir(entry):
+            # rendered concurrently by other report
+            shutil.rmtree(entry, ignore_errors=True)
+        os.rename(tmp, entry)
@@ -2,12 +2,174 @@ import codecs
 import datetime
 import os
 import sys
-import pandas as pd
+import time
 import shutil
 import yaml
+import numpy as np
 
 from jinja2 import Template
 
+from lib import jtl, plots
+from lib.aggregate import DETAILS_SOURCE, LabelStats, durations, merge_stats
+from lib.bundle import bundle
+from lib.instrument import NULL_STAGE, stats_html
+from lib.quantiles import DEFAULT_ERROR, engine_factory
+from lib.runstore import RunStore
+from lib.samples import SampleViews
+from lib.samplestore import SampleStore, StoreBuilder
+from lib.timeseries import TimeSeries
+from lib.utils import parallel_map, run_tasks
+
+# outputs of plots, see BaseReport.set_charts
+CHART_MODES = ('png', 'json')
+
+
+def sample_columns(resolution=None):
+    """JTL columns kept in sample store: label and latency for statistics and
+    plots, time for order of samples of several files and time series,
+    success for errors and active threads if time series is enabled.
+    """
+    columns = ['label', 'Latency', 'timeStamp', 'success']
+    if resolution:
+        columns.append('allThreads')
+    return columns
+
+
+def read_store(file_path, columns, cache=None, details=False, chunksize=jtl.DEFAULT_CHUNKSIZE):
+    """Read JTL file by chunks into compact store of samples.
+
+    Keyword arguments:
+    file_path -- path to JTL file in CSV format.
+    columns -- list of columns to store, see lib.samplestore.SampleStore.
+    cache -- cache of parsed files (lib.cache.JtlCache) or None.
+    details -- also collect errors, response codes, time breakdown and bytes
+               by label while file is read, so their columns are not stored.
+
+    Return tuple of SampleStore and LabelStats with details (without
+    percentiles), None if details is False.
+    """
+    read = columns + [c for c in DETAILS_SOURCE if c not in columns] if details else columns
+    if cache is not None:
+        chunks = cache.read_chunks(file_path, chunksize, columns=read)
+    else:
+        chunks = jtl.read_chunks(file_path, chunksize, columns=read)
+
+    builder = StoreBuilder(columns)
+    stats = LabelStats(None, details=True) if details else None
+    for chunk in chunks:
+        builder.append(chunk)
+        if stats is not None:
+            stats.update(chunk['label'], chunk['Latency'], chunk)
+    return builder.store(), stats
+
+
+def read_stats(file_path, chunksize, engine, cache=None, resolution=None, details=False):
+    """Stream JTL file by chunks into incremental statistics by label.
+
+    Keyword arguments:
+    file_path -- path to JTL file in CSV format.
+    chunksize -- number of rows in chunk.
+    engine -- function creating quantile engine, see lib.quantiles.
+    cache -- cache of parsed files (lib.cache.JtlCache) or None.
+    resolution -- also collect time series with this resolution in seconds
+                  (see lib.timeseries), None to skip it.
+    details -- also collect errors, response codes, time breakdown and bytes
+               by label in the same pass, see lib.aggregate.LabelStats.
+
+    Return tuple of LabelStats and TimeSeries (None if resolution is None).
+    """
+    columns = ['label', 'Latency', 'timeStamp']
+    if resolution:
+        columns += ['success', 'allThreads']
+    if details:
+        columns += [c for c in DETAILS_SOURCE if c not in columns]
+    if cache is not None:
+        chunks = cache.read_chunks(file_path, chunksize, columns=columns)
+    else:
+        chunks = jtl.read_chunks(file_path, chunksize, columns=columns)
+
+    stats = LabelStats(engine, details)
+    series = TimeSeries(resolution) if resolution else None
+    for chunk in chunks:
+        stats.update(chunk['label'], chunk['Latency'], chunk)
+        if series is not None and 'timeStamp' in chunk:
+            update_series(series, chunk, jtl.to_datetime(chunk['timeStamp']))
+    return stats, series
+
+
+def update_series(series, df, timestamps):
+    """Add samples of data frame to TimeSeries.
+    """
+    series.update(timestamps, df['label'], df['Latency'],
+                  df['success'] if 'success' in df else None,
+                  df['allThreads'] if 'allThreads' in df else None)
+
+
+def read_files(file_paths, chunksize=None, engine=None, cache=None, jobs=1, resolution=None, details=False):
+    """Read JTL files of one test in `jobs` processes.
+
+    In streaming mode (chunksize is set) every file is reduced to statistics
+    by label (and time series if resolution is set) and statistics are
+    merged, otherwise samples of files are read into stores (see read_store)
+    joined in order of time of samples.
+
+    Return tuple of SampleStore, None, None and LabelStats with details (None
+    if details is False), or None, LabelStats, TimeSeries (or None) and None
+    in streaming mode.
+    """
+    if chunksize:
+        partials = parallel_map(read_stats, [(p, chunksize, engine, cache, resolution, details) for p in file_paths],
+                                jobs)
+        series = [s for _, s in partials if s is not None]
+        for s in series[1:]:
+            series[0].merge(s)
+        return None, merge_stats([stats for stats, _ in partials]), series[0] if series else None, None
+
+    columns = sample_columns(resolution)
+    partials = parallel_map(read_store, [(p, columns, cache, details) for p in file_paths], jobs)
+    store = SampleStore.concat([store for store, _ in partials])
+    return store, None, None, merge_stats([stats for _, stats in partials]) if details else None
+
+
+def store_series(store, resolution, chunksize=jtl.DEFAULT_CHUNKSIZE):
+    """Time series of samples of SampleStore.
+    """
+    series = TimeSeries(resolution)
+    for chunk in store.chunks(chunksize):
+        update_series(series, chunk, chunk.index.values)
+    return series
+
+
+def store_stats(store, engine, chunksize=jtl.DEFAULT_CHUNKSIZE):
+    """Feed samples of SampleStore by chunks into incremental statistics by label.
+    """
+    stats = LabelStats(engine)
+    for chunk in store.chunks(chunksize):
+        stats.update(chunk['label'], chunk['Latency'], chunk)
+    return stats
+
+
+def store_views(store):
+    """Samples of every label of SampleStore sorted once, see lib.samples.SampleViews.
+    """
+    codes, labels = store.codes('label')
+    return SampleViews(codes, store['Latency'], labels)
+
+
+def store_durations(store):
+    """Seconds from first to last sample of every label of dictionary of
+    store, see lib.aggregate.durations. None if store has no times.
+    """
+    if 'timeStamp' not in store:
+        return None
+    codes, labels = store.codes('label')
+    times = store.columns['timeStamp'].astype(np.float64)
+    first = np.full(len(labels), np.inf)
+    last = np.full(len(labels), -np.inf)
+    np.minimum.at(first, codes, times)
+    np.maximum.at(last, codes, times)
+    return durations(first, last)
+
 
 class BaseReport(object):
     """Base class for reports.
@@ -20,10 +182,49 @@ class BaseReport(object):
         self.environment = []
         # test report
         self.report = ''
-        # pandas data frame
-        self.df = None
+        # samples of test (lib.samplestore.SampleStore)
+        self.store = None
+        # incremental statistics by label, used instead of samples in streaming mode
+        self.stats = None
+        # collect errors, response codes, time breakdown and bytes by label
+        # (see lib.aggregate.LabelStats), set by reports showing them
+        self.details = False
+        # statistics with details collected while samples were read, see _details
+        self._details_stats = None
+        # sorted samples by label of store (lib.samples.SampleViews), see
+        # _sample_views
+        self._views = None
+        # time series of test (lib.timeseries.TimeSeries), calculated from
+        # samples on demand, see _time_series
+        self.series = None
+        # resolution of time series in seconds, None to disable time series
+        self.resolution = 10
+        # quantile engine (see lib.quantiles). None means exact percentiles for
+        # samples and sketch in streaming mode
+        self.quantile_engine = None
+        self.quantile_error = DEFAULT_ERROR
+        # number of processes for reading files and plot rendering
+        self.jobs = 1
+        # list of (plot file name, seconds) of last plot rendering
+        self.plot_timings = []
+        # reload interval of report page in seconds, None for static report
+        self.refresh = None
+        # output of plots: 'png' files or 'json' data of charts drawn in browser,
+        # None for table-only report
+        self.charts = 'png'
+        # write report as one self-contained HTML file, see lib.bundle
+        self.single_file = False
+        # cache of parsed JTL files (lib.cache.JtlCache), None if disabled
+        self.cache = None
+        # cache of rendered plots (lib.artifacts.ArtifactCache), None if disabled
+        self.artifacts = None
+        # store of run summaries (lib.runstore.RunStore)
+        self.run_store = RunStore()
         # report name
         self.report_name = ''
+        # timings and memory of generation stages (lib.instrument.Instrumentation),
+        # None if disabled
+        self.instrumentation = None
         # perfmon data
         self.perfmon = None
         # set default template name. you can redefine in child report class
@@ -33,41 +234,194 @@ class BaseReport(object):
         report_dir = os.path.dirname(sys.modules[self.__module__].__file__)
         self.set_template(report_dir + '/' + self._template_name)
 
-    def read_csv(self, file_paths):
-        self.df = pd.read_csv(file_paths[0])
-        # convert timeStamp to normal datetime
-        self.df['timeStamp'] = self.df['timeStamp'].apply(lambda x: datetime.datetime.fromtimestamp(int(str(x)[:-3])).strftime('%Y-%m-%d %H:%M:%S'))
+    def read_csv(self, file_paths, chunksize=None):
+        """Read JMeter results.
+
+        Files are read in self.jobs processes. In streaming mode every file is
+        reduced to statistics by label and statistics are merged, otherwise
+        samples of files are kept in compact store (lib.samplestore.SampleStore)
+        in order of time of samples.
+
+        Keyword arguments:
+        file_paths -- list of paths or glob patterns of JTL files in CSV format.
+        chunksize -- read files by chunks of this number of rows and keep only
+                     statistics by label instead of samples.
+        """
+        file_paths = jtl.expand_paths(file_paths)
+        with self._stage('read_csv'):
+            self.store, self.stats, self.series, self._details_stats = read_files(
+                file_paths, chunksize, self._engine(), self.cache, self.jobs, self.resolution, self.details)
+        self._views = None
+        self._count_input(file_paths, self.store, self.stats)
+
+    def _count_input(self, file_paths, store, stats):
+        """Record number of files, rows and labels of data and size of
+        sample store in instrumentation.
+        """
+        if self.instrumentation is None:
+            return
+        self.instrumentation.count('files', len(file_paths))
+        if store is not None:
+            self.instrumentation.count('rows', len(store))
+            self.instrumentation.count('store_bytes', store.nbytes)
+            if 'label' in store:
+                self.instrumentation.count('labels', len(store.dictionaries['label']))
+        elif stats is not None:
+            self.instrumentation.count('rows', int(stats.count.sum()))
+            self.instrumentation.count('labels', len(stats.labels))
+
+    def set_quantiles(self, engine, error=DEFAULT_ERROR):
+        """Set quantile engine used for median and percentiles.
+
+        Keyword arguments:
+        engine -- 'exact', 'histogram' or 'sketch', see lib.quantiles. None for
+                  default engine.
+        error -- relative error of 'sketch' engine.
+        """
+        if engine is not None:
+            # check engine name
+            engine_factory(engine, error)
+        self.quantile_engine = engine
+        self.quantile_error = error
+
+    def _engine(self):
+        """Function creating quantile engine of incremental statistics.
+        """
+        return engine_factory(self.quantile_engine or 'sketch', self.quantile_error)
+
+    def _store_stats(self, store, chunksize=jtl.DEFAULT_CHUNKSIZE):
+        """Feed samples of store by chunks into incremental statistics by label.
+        Return None if exact percentiles are requested.
+        """
+        if self.quantile_engine in (None, 'exact'):
+            return None
+        return store_stats(store, self._engine(), chunksize)
+
+    def _details(self):
+        """Incremental statistics with details by label (see self.details), from
+        streaming statistics or collected without percentiles while samples
+        were read (see read_store). None if details are disabled or there is
+        no data.
+        """
+        if not self.details:
+            return None
+        if self.stats is not None:
+            return self.stats
+        return self._details_stats
+
+    def _sample_views(self):
+        """Samples of every label of store sorted once (see
+        lib.samples.SampleViews), shared by statistics and plots. They take
+        12 bytes per sample in addition to store and are freed after plots
+        (see _release_samples). None in streaming mode.
+        """
+        if self._views is None and self.store is not None:
+            self._views = store_views(self.store)
+        return self._views
+
+    def _has_samples(self):
+        """Whether samples are kept for plots of latency by label, they are not
+        in streaming mode.
+        """
+        return self.store is not None
+
+    def _release_samples(self):
+        """Free sorted samples (see _sample_views) when statistics and plots
+        are done, store of samples is kept.
+        """
+        self._views = None
+
+    def _label_stats(self, store, stats=None):
+        """Data frame of latency statistics by label (see lib.aggregate.STATS_COLUMNS)
+        from incremental statistics or from sorted samples of store.
+        """
+        if stats is None:
+            stats = self._store_stats(store)
+        if stats is not None:
+            return stats.frame()
+        views = self._sample_views() if store is self.store else store_views(store)
+        return views.frame(store_durations(store))
 
     def read_perfmon(self, file_path):
-        self.perfmon = yaml.load(codecs.open(file_path, encoding='utf-8').read())
+        """Load perfmon plots config (see perfmon.yml and lib.perfmon).
+        """
+        self.perfmon = yaml.safe_load(codecs.open(file_path, encoding='utf-8').read())
 
     def to_html(self, report_name):
+        with self._stage('copy_files'):
+            report_name = self._prepare_report_dir(report_name)
+        self._write_report(report_name)
+        if self.single_file:
+            self._bundle(report_name)
+        self._write_stats(report_name)
+
+    def _bundle(self, report_name):
+        """Replace directory of report with single file results/<report name>.html.
+        """
+        with self._stage('bundle'):
+            size, dir_size = bundle('results/' + report_name, 'results/' + report_name + '.html')
+        shutil.rmtree('results/' + report_name)
+        print('Report written to results/%s.html (%d KB, directory of report was %d KB)'
+              % (report_name, size // 1024, dir_size // 1024))
+
+    def _write_stats(self, report_name):
+        """Write instrumentation stats of report into stats.json of report
+        directory (results/<report name>.stats.json for single file report)
+        and print total time.
+        """
+        if self.instrumentation is None:
+            return
+        path = 'results/' + report_name + ('.stats.json' if self.single_file else '/stats.json')
+        result = self.instrumentation.finish(path)
+        print('Report generated in %.2f sec, stats in %s' % (result['total'], path))
+
+    def _prepare_report_dir(self, report_name):
+        """Create directory of report with static files, return its name.
+        """
         report_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_" + report_name)
 
         # rename previous report if exist
         if os.path.isdir('results/' + report_name):
             os.rename('results/' + report_name, 'results/' + report_name + '_before_' + datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
 
-        report_name = 'test'
-        shutil.rmtree('results/' + report_name)
-
         # prepare dir
         os.mkdir('results/' + report_name)
         os.mkdir('results/' + report_name + '/css')
         os.mkdir('results/' + report_name + '/js')
-        os.mkdir('results/' + report_name + '/plots')
+        if self.charts is not None:
+            os.mkdir('results/' + report_name + '/plots')
+        if self.charts == 'json':
+            os.mkdir('results/' + report_name + '/data')
 
         # copy external lib
         shutil.copy('lib/external/bootstrap/css/bootstrap.css', 'results/' + report_name + '/css')
         shutil.copy('lib/theme.css', 'results/' + report_name + '/css')
         shutil.copy('lib/external/bootstrap/js/bootstrap.js', 'results/' + report_name + '/js')
         shutil.copy('lib/external/jquery/jquery.js', 'results/' + report_name + '/js')
+        if self.charts == 'json':
+            shutil.copy('lib/charts.js', 'results/' + report_name + '/js')
+
+        return report_name
 
+    def _write_report(self, report_name):
+        """Generate plots and index.html of report in prepared directory.
+        Page is replaced at once, so it is never seen half written.
+        """
         report = self._generate_html_report()
-        self._generate_plots(report_name)
+        if self.charts is not None:
+            with self._stage('plots'):
+                self._generate_plots(report_name)
+        self._release_samples()
 
-        f = codecs.open('results/' + report_name + '/index.html', 'w', encoding='utf-8')
-        f.write(report)
+        path = 'results/' + report_name + '/index.html'
+        with self._stage('render'):
+            f = codecs.open(path + '.tmp', 'w', encoding='utf-8')
+            for chunk in report:
+                f.write(chunk)
+            f.close()
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(path + '.tmp', path)
 
     def set_template(self, file_path):
         """Load template.
@@ -77,13 +431,78 @@ class BaseReport(object):
         else:
             print('Template "%s" not found. Set default.' % file_path)
 
+    def set_jobs(self, jobs):
+        """Set number of processes for plot rendering.
+        """
+        self.jobs = max(1, int(jobs))
+
+    def set_resolution(self, seconds):
+        """Set resolution of time series in seconds, None to disable time series.
+        """
+        self.resolution = seconds
+
+    def _time_series(self):
+        """Time series of test, None if disabled or samples have no time.
+        """
+        if self.series is None and self.resolution and self.store is not None and 'timeStamp' in self.store:
+            self.series = store_series(self.store, self.resolution)
+        return self.series
+
+    def set_charts(self, mode):
+        """Set output of plots.
+
+        Keyword arguments:
+        mode -- 'png' for plot images or 'json' for downsampled data of
+                charts, which are drawn by browser when label row is expanded.
+                None for table-only report: plots are not generated and
+                plotting libraries are not loaded.
+        """
+        if mode is not None and mode not in CHART_MODES:
+            raise ValueError('Unknown charts mode "%s", use one of: %s' % (mode, ', '.join(CHART_MODES)))
+        self.charts = mode
+
+    def set_single_file(self, enabled):
+        """Write report as one self-contained HTML file results/<report name>.html
+        with inlined static files and embedded plots instead of directory.
+        """
+        self.single_file = enabled
+
+    def set_instrumentation(self, instrumentation):
+        """Set instrumentation of generation stages (lib.instrument.Instrumentation),
+        None to disable it.
+        """
+        self.instrumentation = instrumentation
+
+    def _stage(self, name):
+        """Context manager measuring stage of generation, it does nothing if
+        instrumentation is disabled.
+        """
+        if self.instrumentation is None:
+            return NULL_STAGE
+        return self.instrumentation.stage(name)
+
+    def set_cache(self, cache):
+        """Set cache of parsed JTL files (lib.cache.JtlCache) or None to disable it.
+        """
+        self.cache = cache
+
+    def set_artifacts(self, artifacts):
+        """Set cache of rendered plots (lib.artifacts.ArtifactCache) or None to disable it.
+        """
+        self.artifacts = artifacts
+
+    def set_run_store(self, store):
+        """Set store of run summaries (lib.runstore.RunStore).
+        """
+        self.run_store = store
+
     def set_description(self, file_path):
         """Parse report description.
 
         Keyword arguments:
         description -- string in YAML format.
         """
-        d = yaml.load(codecs.open(file_path, encoding='utf-8').read())
+        d = yaml.safe_load(codecs.open(file_path, encoding='utf-8').read())
 
         if 'environment' in d:
             self.environment = d['environment']
@@ -95,14 +514,68 @@ class BaseReport(object):
         data_table = self._generate_html_data()
 
         template = Template(self.template)
-        return template.render(data_table=data_table, env=self.environment, report=self.report, perfmon=None)
+        # rows of data table are rendered while report is written
+        return template.generate(data_table=data_table, env=self.environment, report=self.report,
+                                 perfmon=len(self.perfmon) if self.perfmon and self.charts else 0,
+                                 plots=self.charts is not None and self._has_samples(), charts=self.charts == 'json',
+                                 timeseries=self.charts is not None and self._time_series() is not None,
+                                 refresh=self.refresh, generation_stats=self._generation_stats(),
+                                 **self._template_vars())
+
+    def _generation_stats(self):
+        """HTML of generation stats panel, None if instrumentation is disabled.
+        It is rendered when template reaches it, so it includes stages
+        finished by that time.
+        """
+        if self.instrumentation is None:
+            return None
+        return stats_html(self.instrumentation)
+
+    def _template_vars(self):
+        """Additional variables of report template.
+        """
+        return {}
 
     def _generate_html_data(self):
-        return self.df.to_html()
+        """Data table as iterable of HTML chunks.
+        """
+        return [self.store.frame().to_html()]
 
     def _generate_plots(self, report_name):
         pass
 
+    def _render_plots(self, tasks, cached=True):
+        """Render plot tasks in self.jobs processes and print timings, see lib.plots.render.
+
+        Keyword arguments:
+        cached -- restore plots from self.artifacts if it is set. Plots which
+                  read their input from files (perfmon) are not cached.
+        """
+        start = time.time()
+        artifacts = self.artifacts if cached else None
+        self.plot_timings = plots.render(tasks, self.jobs, artifacts)
+        plots.print_timings(self.plot_timings, time.time() - start, restored=artifacts.restored if artifacts else 0)
+        if self.instrumentation is not None:
+            self.instrumentation.add_plot_timings(self.plot_timings)
+
+    def _render_charts(self, tasks):
+        """Write chart data files in self.jobs processes and print timings.
+        Files are restored from self.artifacts if it is set.
+
+        Keyword arguments:
+        tasks -- list of (function, args) tuples, see lib.plots.render.
+        """
+        start = time.time()
+        def run(tasks):
+            return run_tasks(tasks, self.jobs)
+
+        results = run(tasks) if self.artifacts is None else self.artifacts.render(tasks, run)
+        self.plot_timings = [timing for result in results for timing in result]
+        plots.print_timings(self.plot_timings, time.time() - start,
+                            restored=self.artifacts.restored if self.artifacts else 0)
+        if self.instrumentation is not None:
+            self.instrumentation.add_plot_timings(self.plot_timings)
+
     def _normalize_test_name(self, name):
         return name.replace('/', '_') \
             .replace(' ', '_') \
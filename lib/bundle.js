@@ -0,0 +1,21 @@
+/*
+ * Loader of plots of single file report (see lib/bundle.py).
+ * Image data is kept in script elements and assigned to images when their
+ * section is shown, so plots of collapsed rows are not decoded on page load.
+ */
+(function ($) {
+    function show(img) {
+        var asset = document.getElementById('asset-' + $(img).attr('data-asset'));
+        $(img).removeAttr('data-asset');
+        if (asset) img.src = 'data:' + $(asset).attr('data-type') + ';base64,' + $.trim(asset.text);
+    }
+
+    $(document).on('show.bs.collapse', function (e) {
+        $(e.target).find('img[data-asset]').each(function (i, img) { show(img); });
+    });
+
+    // plots of sections which are not collapsed
+    $(function () {
+        $('img[data-asset]').not('.collapse:not(.in) img').each(function (i, img) { show(img); });
+    });
+})(jQuery);
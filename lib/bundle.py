@@ -0,0 +1,225 @@
+import base64
+import codecs
+import hashlib
+import io
+import os
+import re
+import struct
+import zlib
+
+try:
+    from PIL import Image
+except ImportError:
+    # optional, plots are embedded as optimized PNG without it
+    Image = None
+
+# loader of embedded plots
+LOADER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bundle.js')
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_STYLESHEET = re.compile(r'<link rel="stylesheet" type="text/css" href="(css/[^"]+)">')
+_SCRIPT = re.compile(r'<script type="text/javascript" src="(js/[^"]+)"></script>')
+_IMAGE = re.compile(r'<img src="(plots/[^"]+)"')
+_CHARTS = re.compile(r'data-src="(data/[^"]+)"')
+# JavaScript data file of charts, see lib.charts.write_charts
+_CHARTS_DATA = re.compile(r'^JMeterCharts\.data\((".*?"), (.*)\);\s*$', re.S)
+# tokens of CSS: strings and comments are kept apart from code
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)', re.S)
+
+
+def minify_css(text):
+    """Remove comments and redundant whitespace from CSS, strings are kept.
+    """
+    result = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(text):
+        result.append(_minify_css_code(text[position:match.start()]))
+        if match.group(1):
+            result.append(match.group(1))
+        position = match.end()
+    result.append(_minify_css_code(text[position:]))
+    return ''.join(result).strip()
+
+
+def _minify_css_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r' ?([{};,>]) ?', r'\1', code).replace(': ', ':')
+    return code.replace(';}', '}')
+
+
+def minify_js(text):
+    """Remove comments, indentation and empty lines from JavaScript.
+
+    Minification is conservative and works by lines: only lines which are
+    whole comments are removed and line breaks are kept, so automatic
+    semicolon insertion works as in the original code. License comments
+    (/*! ... */) are kept.
+    """
+    lines = []
+    comment = False
+    for line in text.splitlines():
+        line = line.strip()
+        if comment:
+            comment = '*/' not in line
+            continue
+        if line.startswith('/*') and not line.startswith('/*!'):
+            comment = '*/' not in line[2:]
+            if not comment and not line.endswith('*/'):
+                # code after comment
+                lines.append(line)
+            continue
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def optimize_png(data):
+    """Recompress image data of PNG at maximum zlib level, return smaller of
+    original and recompressed PNG.
+    """
+    if not data.startswith(_PNG_SIGNATURE):
+        return data
+    chunks = []
+    idat = []
+    position = len(_PNG_SIGNATURE)
+    try:
+        while position < len(data):
+            length, kind = struct.unpack('>I4s', data[position:position + 8])
+            body = data[position + 8:position + 8 + length]
+            position += 12 + length
+            if kind == b'IDAT':
+                if not idat:
+                    chunks.append((kind, None))
+                idat.append(body)
+            else:
+                chunks.append((kind, body))
+        pixels = zlib.compress(zlib.decompress(b''.join(idat)), 9)
+    except (struct.error, zlib.error):
+        return data
+
+    result = [_PNG_SIGNATURE]
+    for kind, body in chunks:
+        body = pixels if body is None else body
+        result.append(struct.pack('>I', len(body)) + kind + body +
+                      struct.pack('>I', zlib.crc32(kind + body) & 0xffffffff))
+    result = b''.join(result)
+    return result if len(result) < len(data) else data
+
+
+def encode_image(path):
+    """Compressed data of plot image: lossless WebP if Pillow with WebP
+    support is installed and image gets smaller, optimized PNG otherwise.
+
+    Return tuple of MIME type and data.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not path.endswith('.png'):
+        return 'image/' + os.path.splitext(path)[1][1:], data
+    data = optimize_png(data)
+    if Image is not None:
+        try:
+            buf = io.BytesIO()
+            Image.open(io.BytesIO(data)).save(buf, 'WEBP', lossless=True)
+            if buf.tell() < len(data):
+                return 'image/webp', buf.getvalue()
+        except (IOError, OSError, KeyError, ValueError):
+            pass
+    return 'image/png', data
+
+
+class _Assets(object):
+    """Embedded files of report, identical files are embedded once.
+    """
+
+    def __init__(self):
+        # list of (id, MIME type, text) of embedded files
+        self.items = []
+        self._keys = set()
+
+    def add(self, mime, text):
+        """Embed text, return its id.
+        """
+        key = hashlib.sha1((mime + '\0' + text).encode('utf-8')).hexdigest()[:16]
+        if key not in self._keys:
+            self._keys.add(key)
+            self.items.append((key, mime, text))
+        return key
+
+    def html(self):
+        for key, mime, text in self.items:
+            yield '<script type="text/plain" id="asset-%s" data-type="%s">%s</script>\n' % (key, mime, text)
+
+
+def _read(path):
+    with codecs.open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _inline_script(text):
+    return '<script type="text/javascript">\n%s\n</script>' % text.replace('</script', '<\\/script')
+
+
+def bundle(report_dir, path):
+    """Write report of directory (index.html with css, js, plots and data
+    subdirectories) as one self-contained HTML file.
+
+    Style sheets and scripts are minified and inlined. Plot images are
+    compressed (see encode_image) and chart data files are embedded as
+    base64 and JSON in script elements, which are not parsed by browser.
+    Plots are decoded when their section is shown (see bundle.js).
+    Identical plots are embedded once.
+
+    Return tuple of number of bytes of HTML file and of files of directory.
+    """
+    html = _read(os.path.join(report_dir, 'index.html'))
+    assets = _Assets()
+
+    def stylesheet(match):
+        return '<style type="text/css">%s</style>' % minify_css(_read(os.path.join(report_dir, match.group(1))))
+
+    def script(match):
+        return _inline_script(minify_js(_read(os.path.join(report_dir, match.group(1)))))
+
+    def image(match):
+        file_path = os.path.join(report_dir, match.group(1))
+        if not os.path.isfile(file_path):
+            return match.group(0)
+        mime, data = encode_image(file_path)
+        return '<img data-asset="%s"' % assets.add(mime, base64.b64encode(data).decode('ascii'))
+
+    def charts(match):
+        file_path = os.path.join(report_dir, match.group(1))
+        if not os.path.isfile(file_path):
+            return match.group(0)
+        data = _CHARTS_DATA.match(_read(file_path))
+        if data is None:
+            return match.group(0)
+        # data of charts is JSON, '</' is escaped to keep script element closed
+        return 'data-asset="%s"' % assets.add('application/json', data.group(2).replace('</', '<\\/'))
+
+    html = _STYLESHEET.sub(stylesheet, html)
+    html = _SCRIPT.sub(script, html)
+    html = _IMAGE.sub(image, html)
+    html = _CHARTS.sub(charts, html)
+
+    end = html.rfind('</body>')
+    if end < 0:
+        end = len(html)
+    tail = list(assets.html())
+    if assets.items:
+        tail.append(_inline_script(minify_js(_read(LOADER))) + '\n')
+    html = html[:end] + ''.join(tail) + html[end:]
+
+    tmp = path + '.tmp'
+    with codecs.open(tmp, 'w', encoding='utf-8') as f:
+        f.write(html)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
+
+    size = 0
+    for root, _, files in os.walk(report_dir):
+        size += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return os.path.getsize(path), size
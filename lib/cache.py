@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib import jtl
+
+# default cache directory
+DEFAULT_CACHE_DIR = 'cache'
+# default limits of cache: total size in bytes and age of entry in seconds
+DEFAULT_MAX_SIZE = 10 * 1024 ** 3
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+# index file of JTL file, named by hash of its path
+_INDEX = 'index-%s.json'
+_META = 'meta.json'
+
+
+def file_hash(file_path, block_size=1024 * 1024):
+    """SHA1 of file content.
+    """
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def evict(cache_dir, max_size, max_age, keep=None):
+    """Remove entries (subdirectories) of cache directory unused longer than
+    max_age seconds, then least recently used entries until total size of
+    entries is not more than max_size bytes. Entry is used when its
+    modification time is updated. Entries without meta.json are being
+    written (e.g. <key>.tmp<pid> of other process) and are removed only
+    when they are older than max_age (left by killed process).
+
+    Keyword arguments:
+    keep -- path of entry which must not be removed.
+    """
+    now = time.time()
+    entries = []
+    for key in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, key)
+        if not os.path.isdir(path) or path == keep:
+            continue
+        try:
+            used = os.path.getmtime(path)
+            if now - used > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if not os.path.isfile(os.path.join(path, _META)):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        except OSError:
+            # removed by other process meanwhile
+            continue
+        entries.append((used, size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for used, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+class _EntryWriter(object):
+    """Append chunks of JTL data frame to cache entry.
+
+    Every column is stored in raw binary file, string columns are dictionary
+    encoded: int32 codes in file and list of values in meta.json. Type of
+    column comes from its first chunk, but chunks are parsed independently,
+    e.g. response codes are numbers until first "Non HTTP response code", so
+    column is promoted when chunk does not fit it (see _promote).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.columns = None
+        self._dictionaries = {}
+        os.makedirs(path)
+
+    def append(self, chunk):
+        if 'timeStamp' in chunk and not pd.api.types.is_numeric_dtype(chunk['timeStamp']):
+            # formatted dates are stored as datetime64, not as dictionary
+            chunk = chunk.assign(timeStamp=jtl.to_datetime(chunk['timeStamp']).values.astype('datetime64[ms]'))
+
+        if self.columns is None:
+            self.columns = []
+            for name in chunk.columns:
+                column = chunk[name]
+                if jtl.JTL_DTYPES.get(name) == 'category' or not _is_numeric(column):
+                    self.columns.append({'name': name, 'dtype': 'int32', 'categories': []})
+                    self._dictionaries[name] = {}
+                else:
+                    self.columns.append({'name': name, 'dtype': str(column.dtype)})
+
+        for c in self.columns:
+            column = chunk[c['name']]
+            if 'categories' not in c:
+                self._promote(c, column)
+            if 'categories' in c:
+                values = self._encode(c, column)
+            else:
+                values = np.asarray(column, dtype=c['dtype'])
+            with open(self._file(c), 'ab') as f:
+                values.tofile(f)
+        self.rows += len(chunk)
+
+    def commit(self, source):
+        meta = {'rows': self.rows, 'columns': self.columns or [], 'source': source}
+        with open(os.path.join(self.path, _META), 'w') as f:
+            json.dump(meta, f)
+
+    def _file(self, c):
+        return os.path.join(self.path, c['name'] + '.bin')
+
+    def _promote(self, c, column):
+        """Change type of numeric column `c` to fit values of chunk column:
+        wider numeric type (e.g. float for missing values) or dictionary if
+        values are not numbers. Values written before are converted.
+        """
+        if _is_numeric(column):
+            dtype = np.result_type(np.dtype(c['dtype']), column.dtype)
+            if dtype == np.dtype(c['dtype']):
+                return
+        else:
+            dtype = None
+
+        values = np.fromfile(self._file(c), dtype=c['dtype'])
+        if dtype is None:
+            c['dtype'] = 'int32'
+            c['categories'] = []
+            self._dictionaries[c['name']] = {}
+            values = self._encode(c, values)
+        else:
+            c['dtype'] = str(dtype)
+            values = values.astype(dtype)
+        with open(self._file(c), 'wb') as f:
+            values.tofile(f)
+
+    def _encode(self, c, column):
+        """Map values of string column to codes of column dictionary. Numbers
+        are stored as strings of JTL file, so 200 of numeric chunk and "200"
+        of string chunk have the same code.
+        """
+        if hasattr(column, 'cat'):
+            codes = np.asarray(column.cat.codes)
+            uniques = column.cat.categories
+        else:
+            codes, uniques = pd.factorize(np.asarray(column, dtype=object))
+
+        dictionary = self._dictionaries[c['name']]
+        mapping = []
+        for value in uniques:
+            value = _string(value)
+            if value not in dictionary:
+                dictionary[value] = len(c['categories'])
+                c['categories'].append(value)
+            mapping.append(dictionary[value])
+
+        mapping = np.array(mapping + [-1], dtype=np.int32)
+        return mapping[codes]
+
+
+def _is_numeric(column):
+    """Whether column is stored as numbers (or times), not as dictionary.
+    """
+    return not hasattr(column, 'cat') and (pd.api.types.is_numeric_dtype(column)
+                                           or pd.api.types.is_datetime64_dtype(column))
+
+
+def _string(value):
+    """Value of dictionary column as string, integral floats (numbers of
+    column with missing values) without fraction.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class JtlCache(object):
+    """Cache of parsed JTL files.
+
+    Parsed file is stored as raw binary column files, which are memory mapped
+    on next read instead of parsing CSV again. Entries are keyed by content
+    hash, index file of every JTL file maps its path, size and mtime to
+    hash, so content of unchanged file is not hashed again. Index files are
+    replaced atomically and every file has its own, so processes reading
+    different files in parallel do not overwrite entries of each other.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE):
+        """Keyword arguments:
+        cache_dir -- cache directory.
+        max_size -- maximum total size of cache in bytes.
+        max_age -- maximum age of unused entry in seconds.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def read_chunks(self, file_path, chunksize=jtl.DEFAULT_CHUNKSIZE, columns=None):
+        """Iterate over JTL file by data frames of at most `chunksize` rows.
+        Entry of cache is written while file is read first time.
+        """
+        key, source = self._key(file_path)
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.isfile(os.path.join(entry, _META)):
+            df = self._load(entry)
+            if columns is not None:
+                df = df[[c for c in columns if c in df]]
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize]
+            return
+
+        for chunk in self._write(entry, source, jtl.read_chunks(file_path, chunksize)):
+            if columns is not None:
+                chunk = chunk[[c for c in columns if c in chunk]]
+            yield chunk
+
+    def evict(self, keep=None):
+        """Remove entries unused longer than max_age, then least recently used
+        entries until total size of cache is not more than max_size.
+
+        Keyword arguments:
+        keep -- path of entry which must not be removed.
+        """
+        evict(self.cache_dir, self.max_size, self.max_age, keep)
+
+    def _key(self, file_path):
+        """Content hash of file and description of file for meta.json.
+        """
+        st = os.stat(file_path)
+        source = {'path': os.path.abspath(file_path), 'size': st.st_size, 'mtime': st.st_mtime}
+
+        known = self._read_index(source['path'])
+        if known and known['size'] == source['size'] and known['mtime'] == source['mtime']:
+            source['hash'] = known['hash']
+        else:
+            source['hash'] = file_hash(file_path)
+            self._write_index(source)
+        return source['hash'], source
+
+    def _index_path(self, path):
+        return os.path.join(self.cache_dir, _INDEX % hashlib.sha1(path.encode('utf-8')).hexdigest())
+
+    def _read_index(self, path):
+        """Description of JTL file at path from its index file, None if it is unknown.
+        """
+        try:
+            with open(self._index_path(path)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write_index(self, source):
+        path = self._index_path(source['path'])
+        tmp = path + '.tmp%d' % os.getpid()
+        with open(tmp, 'w') as f:
+            json.dump(source, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # rename does not replace existing file on Windows
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(tmp, path)
+
+    def _write(self, entry, source, chunks):
+        """Write chunks into new entry and yield them. Entry is visible only
+        after last chunk is written.
+        """
+        tmp = entry + '.tmp%d' % os.getpid()
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        writer = _EntryWriter(tmp)
+        try:
+            for chunk in chunks:
+                writer.append(chunk)
+                yield chunk
+            writer.commit(source)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            os.rename(tmp, entry)
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=entry)
+
+    def _load(self, entry):
+        """Data frame with columns memory mapped from entry.
+        """
+        with open(os.path.join(entry, _META)) as f:
+            meta = json.load(f)
+        # mark entry as recently used
+        os.utime(entry, None)
+
+        rows = meta['rows']
+        data = {}
+        for c in meta['columns']:
+            if rows:
+                values = np.memmap(os.path.join(entry, c['name'] + '.bin'), dtype=c['dtype'], mode='r', shape=(rows,))
+            else:
+                values = np.zeros(0, dtype=c['dtype'])
+            if 'categories' in c:
+                values = pd.Categorical.from_codes(values, c['categories'])
+            data[c['name']] = values
+        return pd.DataFrame(data, columns=[c['name'] for c in meta['columns']], copy=False)
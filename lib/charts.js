@@ -0,0 +1,135 @@
+/*
+ * Renderer of report charts (see lib/charts.py).
+ * Data of every label is in data/<id>.js, it is loaded when row is expanded
+ * and drawn on canvas.
+ */
+var JMeterCharts = (function ($) {
+    var COLORS = ['#348ABD', '#7A68A6', '#A60628', '#467821', '#CF4457', '#188487', '#E24A33'];
+    var WIDTH = 480, HEIGHT = 320, MARGIN = {left: 60, right: 15, top: 25, bottom: 40};
+
+    function niceTicks(min, max, count) {
+        var span = max - min || 1;
+        var step = Math.pow(10, Math.floor(Math.log(span / count) / Math.LN10));
+        var err = count / span * step;
+        if (err <= 0.15) step *= 10; else if (err <= 0.35) step *= 5; else if (err <= 0.75) step *= 2;
+        var ticks = [];
+        for (var v = Math.ceil(min / step) * step; v <= max + step / 2; v += step) ticks.push(+v.toPrecision(12));
+        return ticks;
+    }
+
+    function extent(series, key) {
+        var min = Infinity, max = -Infinity;
+        $.each(series, function (i, s) {
+            $.each(s[key], function (j, v) {
+                if (v === null) return;
+                if (v < min) min = v;
+                if (v > max) max = v;
+            });
+        });
+        if (min === Infinity) return [0, 1];
+        return min === max ? [min, min + 1] : [min, max];
+    }
+
+    function draw(canvas, chart) {
+        var ctx = canvas.getContext('2d');
+        var w = WIDTH - MARGIN.left - MARGIN.right, h = HEIGHT - MARGIN.top - MARGIN.bottom;
+        var xr = extent(chart.series, 'x'), yr = extent(chart.series, 'y');
+        if (chart.type === 'bar') yr[0] = 0;
+        var sx = function (v) { return MARGIN.left + (v - xr[0]) / (xr[1] - xr[0]) * w; };
+        var sy = function (v) { return MARGIN.top + h - (v - yr[0]) / (yr[1] - yr[0]) * h; };
+
+        ctx.font = '10px sans-serif';
+        ctx.fillStyle = '#E5E5E5';
+        ctx.fillRect(MARGIN.left, MARGIN.top, w, h);
+
+        // grid and ticks
+        ctx.strokeStyle = '#FFFFFF';
+        ctx.fillStyle = '#555555';
+        ctx.textAlign = 'center';
+        $.each(niceTicks(xr[0], xr[1], 6), function (i, v) {
+            if (v < xr[0] || v > xr[1]) return;
+            ctx.beginPath(); ctx.moveTo(sx(v), MARGIN.top); ctx.lineTo(sx(v), MARGIN.top + h); ctx.stroke();
+            ctx.fillText(v, sx(v), MARGIN.top + h + 12);
+        });
+        ctx.textAlign = 'right';
+        $.each(niceTicks(yr[0], yr[1], 5), function (i, v) {
+            if (v < yr[0] || v > yr[1]) return;
+            ctx.beginPath(); ctx.moveTo(MARGIN.left, sy(v)); ctx.lineTo(MARGIN.left + w, sy(v)); ctx.stroke();
+            ctx.fillText(v, MARGIN.left - 4, sy(v) + 3);
+        });
+
+        // series
+        $.each(chart.series, function (i, s) {
+            var color = COLORS[i % COLORS.length];
+            ctx.strokeStyle = color;
+            ctx.fillStyle = color;
+            if (chart.type === 'bar') {
+                var bw = s.x.length > 1 ? sx(s.x[1]) - sx(s.x[0]) : w;
+                ctx.globalAlpha = 0.4;
+                $.each(s.x, function (j, x) { ctx.fillRect(sx(x), sy(s.y[j]), bw, sy(0) - sy(s.y[j])); });
+                ctx.globalAlpha = 1;
+            } else if (chart.type === 'scatter') {
+                ctx.globalAlpha = 0.5;
+                $.each(s.x, function (j, x) { ctx.fillRect(sx(x) - 1, sy(s.y[j]) - 1, 3, 3); });
+                ctx.globalAlpha = 1;
+            } else {
+                ctx.beginPath();
+                $.each(s.x, function (j, x) { if (j) ctx.lineTo(sx(x), sy(s.y[j])); else ctx.moveTo(sx(x), sy(s.y[j])); });
+                ctx.stroke();
+            }
+            if (chart.series.length > 1) {
+                ctx.textAlign = 'left';
+                ctx.fillRect(MARGIN.left + w - 40, MARGIN.top + 6 + i * 12, 8, 8);
+                ctx.fillStyle = '#555555';
+                ctx.fillText(s.name, MARGIN.left + w - 28, MARGIN.top + 14 + i * 12);
+            }
+        });
+
+        // titles
+        ctx.fillStyle = '#333333';
+        ctx.textAlign = 'center';
+        ctx.font = '12px sans-serif';
+        ctx.fillText(chart.title, MARGIN.left + w / 2, 15);
+        ctx.font = '11px sans-serif';
+        ctx.fillText(chart.xlabel, MARGIN.left + w / 2, HEIGHT - 8);
+        ctx.save();
+        ctx.translate(12, MARGIN.top + h / 2);
+        ctx.rotate(-Math.PI / 2);
+        ctx.fillText(chart.ylabel, 0, 0);
+        ctx.restore();
+    }
+
+    function render(container, data) {
+        $.each(data.charts, function (i, chart) {
+            var canvas = $('<canvas/>').attr({width: WIDTH, height: HEIGHT}).appendTo(container)[0];
+            if (canvas.getContext) draw(canvas, chart);
+        });
+    }
+
+    // load data file of every container of charts inside shown element
+    function load(element) {
+        $(element).find('.charts').addBack('.charts').each(function (i, container) {
+            if ($(container).data('loaded')) return;
+            $(container).data('loaded', true);
+            // single file report keeps data in script element (see lib/bundle.py)
+            var asset = $(container).attr('data-asset');
+            if (asset) {
+                render($(container), JSON.parse(document.getElementById('asset-' + asset).text));
+                return;
+            }
+            var script = document.createElement('script');
+            script.src = $(container).data('src');
+            document.body.appendChild(script);
+        });
+    }
+
+    $(document).on('show.bs.collapse', function (e) { load(e.target); });
+
+    return {
+        // called by data file
+        data: function (key, data) {
+            render($('.charts[data-key="' + key + '"]'), data);
+        },
+        load: load
+    };
+})(jQuery);
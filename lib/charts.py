@@ -0,0 +1,99 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from lib.downsample import downsample
+from lib.samples import sorted_percentile
+
+# maximum number of points of scatter chart
+DEFAULT_POINTS = 1000
+# number of bins of histogram chart
+DEFAULT_BINS = 50
+# percentiles of percentile chart
+PERCENTILES = np.arange(0, 100.5, 0.5)
+
+
+def histogram_chart(title, series, bins=DEFAULT_BINS):
+    """Chart of probability density histograms with common bins.
+
+    Keyword arguments:
+    title -- chart title.
+    series -- list of (name, values) tuples, values are None if absent.
+    bins -- number of bins.
+    """
+    present = [np.asarray(values) for _, values in series if values is not None and len(values)]
+    if present:
+        lo = min(v.min() for v in present)
+        hi = max(v.max() for v in present)
+        edges = np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+    result = []
+    for name, values in series:
+        if values is None or not len(values):
+            continue
+        density, _ = np.histogram(values, edges, density=True)
+        result.append({'name': name, 'x': _round(edges[:-1]), 'y': _round(density, 6)})
+    return {'title': title, 'type': 'bar', 'xlabel': 'Response time', 'ylabel': 'Probability', 'series': result}
+
+
+def scatter_chart(title, series, points=DEFAULT_POINTS):
+    """Chart of response time of every request, downsampled by LTTB with
+    outliers kept.
+    """
+    result = []
+    for name, values in series:
+        if values is None or not len(values):
+            continue
+        x, y = downsample(np.arange(1, len(values) + 1), values, points, method='lttb')
+        result.append({'name': name, 'x': _round(x), 'y': _round(y)})
+    return {'title': title, 'type': 'scatter', 'xlabel': 'Request', 'ylabel': 'Time', 'series': result}
+
+
+def percentiles_chart(title, series, is_sorted=False):
+    """Chart of response time by percentile.
+
+    Keyword arguments:
+    is_sorted -- values of series are sorted, percentiles are read without
+                 partitioning them.
+    """
+    result = []
+    for name, values in series:
+        if values is None or not len(values):
+            continue
+        y = sorted_percentile(values, PERCENTILES) if is_sorted else np.percentile(values, PERCENTILES)
+        result.append({'name': name, 'x': _round(PERCENTILES), 'y': _round(y)})
+    return {'title': title, 'type': 'line', 'xlabel': 'Percentiles', 'ylabel': 'Response time', 'series': result}
+
+
+def line_chart(title, xlabel, ylabel, series, points=DEFAULT_POINTS):
+    """Chart of lines, downsampled by LTTB.
+
+    Keyword arguments:
+    series -- list of (name, x, y) tuples.
+    """
+    result = []
+    for name, x, y in series:
+        if not len(x):
+            continue
+        y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+        x, y = downsample(x, y, points, method='lttb', outliers=None)
+        result.append({'name': name, 'x': _round(x), 'y': _round(y)})
+    return {'title': title, 'type': 'line', 'xlabel': xlabel, 'ylabel': ylabel, 'series': result}
+
+
+def write_charts(path, key, charts):
+    """Write charts as JavaScript file registering data in renderer (js/charts.js).
+    File is loaded by script tag, so report works from local file system.
+
+    Return list of (file name, seconds) tuple, see lib.plots.PlotTimer.
+    """
+    start = time.time()
+    data = json.dumps({'charts': charts}, separators=(',', ':'))
+    with open(path, 'w') as f:
+        f.write('JMeterCharts.data(%s, %s);\n' % (json.dumps(key), data))
+    return [(os.path.basename(path), time.time() - start)]
+
+
+def _round(values, decimals=2):
+    return [None if np.isnan(v) else v for v in np.round(np.asarray(values, dtype=np.float64), decimals).tolist()]
@@ -0,0 +1,101 @@
+import numpy as np
+
+from lib.samples import sorted_percentile
+
+# number of points of density grid
+DEFAULT_GRID = 1024
+
+
+class Density(object):
+    """Binned density estimation of sample.
+
+    Values are linearly binned once onto regular grid between minimum and
+    maximum value, histograms and gaussian KDE (FFT convolution of binned
+    counts with kernel) of whole sample or of values below some bound (e.g.
+    90% line) are calculated from the grid, in O(n + grid log grid) instead
+    of O(n * grid) of exact KDE.
+    """
+
+    def __init__(self, values, grid=DEFAULT_GRID, is_sorted=False):
+        """Keyword arguments:
+        values -- array of values.
+        grid -- number of grid points.
+        is_sorted -- values are sorted (e.g. lib.samples.Samples.sorted), so
+                     range and 90% line are read without passes over values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.count = len(values)
+        if not self.count:
+            lo, hi = 0., 1.
+        elif is_sorted:
+            lo, hi = values[0], values[-1]
+        else:
+            lo, hi = values.min(), values.max()
+        if hi <= lo:
+            # zero variance sample: grid of unit width around value
+            hi = lo + 1.
+        self.x = np.linspace(lo, hi, grid)
+        self.step = self.x[1] - self.x[0]
+        # 90% line of sample
+        if not self.count:
+            self.p90 = hi
+        else:
+            self.p90 = sorted_percentile(values, 90) if is_sorted else np.percentile(values, 90)
+
+        # linear binning: every value is split between two nearest grid points
+        pos = (values - lo) / self.step
+        i = np.clip(np.floor(pos).astype(np.int64), 0, grid - 2)
+        w = pos - i
+        self.counts = np.bincount(i, 1 - w, minlength=grid) + np.bincount(i + 1, w, minlength=grid)
+
+    def histogram(self, bins=10, upper=None):
+        """Probability density histogram of values (of values below `upper`).
+
+        Return tuple of arrays of bin edges and density of bins.
+        """
+        x, counts = self._grid(upper)
+        edges = np.linspace(x[0], x[-1] if x[-1] > x[0] else x[0] + self.step, bins + 1)
+        h, _ = np.histogram(x, edges, weights=counts)
+        total = counts.sum()
+        return edges, h / (total * np.diff(edges)) if total else h
+
+    def kde(self, upper=None, bandwidth=None):
+        """Gaussian KDE of values (of values below `upper`).
+
+        Keyword arguments:
+        upper -- use only values less than this bound.
+        bandwidth -- kernel standard deviation, Scott's rule by default. It is
+                     not less than grid step, so zero variance sample gives
+                     narrow peak instead of error.
+
+        Return tuple of arrays x and density, x is extended by kernel width
+        on both sides of values range.
+        """
+        x, counts = self._grid(upper)
+        n = counts.sum()
+        if not n:
+            return x, np.zeros(len(x))
+        if bandwidth is None:
+            mean = (x * counts).sum() / n
+            std = np.sqrt(max((counts * (x - mean) ** 2).sum() / n, 0.))
+            bandwidth = std * n ** (-1. / 5)
+        bandwidth = max(bandwidth, self.step)
+
+        m = int(min(np.ceil(4 * bandwidth / self.step), len(self.x)))
+        offsets = np.arange(-m, m + 1) * self.step
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+        # full linear convolution by FFT
+        size = len(counts) + len(kernel) - 1
+        fft_size = 1 << int(np.ceil(np.log2(size)))
+        density = np.fft.irfft(np.fft.rfft(counts, fft_size) * np.fft.rfft(kernel, fft_size), fft_size)[:size]
+        grid = x[0] + np.arange(-m, len(counts) + m) * self.step
+        return grid, np.clip(density, 0, None) / n
+
+    def _grid(self, upper):
+        """Grid points and binned counts, only points below `upper` if set.
+        """
+        if upper is None:
+            return self.x, self.counts
+        end = max(int(np.searchsorted(self.x, upper, side='left')), 1)
+        return self.x[:end], self.counts[:end]
@@ -0,0 +1,92 @@
+import numpy as np
+
+# default number of points of downsampled series
+DEFAULT_POINTS = 2000
+# values above this percentile are kept by downsample
+DEFAULT_OUTLIERS = 99.9
+
+
+def minmax_index(y, buckets):
+    """Indices of minimum and maximum value in each of `buckets` buckets of
+    consecutive points (pixel columns of plot), in order of points.
+    Visual extremes of every bucket are exact.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if buckets <= 0 or 2 * buckets >= n:
+        return np.arange(n)
+    size = -(-n // buckets)
+    rows = -(-n // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(rows, size)
+    offsets = np.arange(rows) * size
+    return np.union1d(offsets + np.nanargmin(padded, axis=1), offsets + np.nanargmax(padded, axis=1))
+
+
+def lttb_index(x, y, threshold):
+    """Indices of points selected by Largest-Triangle-Three-Buckets
+    downsampling of line (x, y) to `threshold` points. First and last points
+    are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # bucket boundaries of inner points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    result = np.zeros(threshold, dtype=np.int64)
+    result[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # average point of next bucket, last point for last bucket
+        if i < threshold - 3:
+            next_end = edges[i + 2]
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        result[i + 1] = a
+    return result
+
+
+def lttb(x, y, threshold):
+    """LTTB downsampling of line (x, y), return tuple of arrays x and y.
+    """
+    index = lttb_index(x, y, threshold)
+    return np.asarray(x)[index], np.asarray(y)[index]
+
+
+def downsample(x, y, points=DEFAULT_POINTS, method='minmax', outliers=DEFAULT_OUTLIERS):
+    """Reduce series to about `points` points before plotting.
+
+    Keyword arguments:
+    x, y -- arrays of series.
+    points -- number of points of result (plus outliers).
+    method -- 'minmax' (minimum and maximum of each of points / 2 buckets) or
+              'lttb' (Largest-Triangle-Three-Buckets).
+    outliers -- percentile of y, all points above it are kept. None to keep
+                only points selected by method.
+
+    Return tuple of arrays x and y in original order of points.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= points:
+        return x, y
+
+    if method == 'minmax':
+        index = minmax_index(y, points // 2)
+    elif method == 'lttb':
+        index = lttb_index(x, y, points)
+    else:
+        raise ValueError('Unknown downsampling method "%s", use minmax or lttb' % method)
+
+    if outliers is not None:
+        index = np.union1d(index, np.flatnonzero(y > np.percentile(y, outliers)))
+    return x[index], y[index]
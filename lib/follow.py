@@ -0,0 +1,72 @@
+import io
+import os
+
+import pandas as pd
+
+from lib import jtl
+
+
+# maximum number of bytes of file parsed into one data frame
+BLOCK_SIZE = 64 * 1024 * 1024
+
+
+class JtlTail(object):
+    """Read new complete lines of growing JTL file.
+
+    Byte offset of last complete line is kept, so every read parses only
+    lines written since previous read. Incomplete last line is left for the
+    next read. If file is truncated or replaced by shorter one, it is read
+    from the beginning. New lines are read by blocks, so memory does not
+    depend on size of file on first read.
+    """
+
+    def __init__(self, file_path, block_size=BLOCK_SIZE):
+        """Keyword arguments:
+        file_path -- path to JTL file in CSV format.
+        block_size -- maximum number of bytes of one data frame of samples.
+        """
+        self.file_path = file_path
+        self.block_size = block_size
+        self.offset = 0
+        self.header = None
+
+    def read(self):
+        """Iterate over data frames of new samples, every one parsed from at
+        most block_size bytes of complete lines (or one longer line).
+        """
+        if not os.path.isfile(self.file_path):
+            return
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            self.offset = 0
+            self.header = None
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            pending = b''
+            while self.offset + len(pending) < size:
+                data = pending + f.read(min(self.block_size, size - self.offset - len(pending)))
+                end = data.rfind(b'\n')
+                if end < 0:
+                    # line longer than block
+                    pending = data
+                    continue
+                pending = data[end + 1:]
+                self.offset += end + 1
+                chunk = self._parse(data[:end + 1])
+                if chunk is not None and len(chunk):
+                    yield chunk
+
+    def _parse(self, data):
+        """Data frame of complete lines, header line is taken from first lines of file.
+        """
+        if self.header is None:
+            line_end = data.find(b'\n') + 1
+            self.header = list(pd.read_csv(io.BytesIO(data[:line_end]), nrows=0).columns)
+            data = data[line_end:]
+            if not data:
+                return None
+
+        # timeStamp dtype is left to pandas, it may be formatted date
+        dtype = dict((c, jtl.JTL_DTYPES[c]) for c in self.header if c in jtl.JTL_DTYPES and c != 'timeStamp')
+        return pd.read_csv(io.BytesIO(data), names=self.header, header=None, dtype=dtype)
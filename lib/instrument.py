@@ -0,0 +1,237 @@
+import json
+import os
+import sys
+import time
+
+from markupsafe import escape
+
+from lib.table import html_table
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is not measured
+    resource = None
+
+# profilers of Instrumentation
+PROFILERS = ('cprofile', 'tracemalloc')
+# number of top functions or allocation sites in profile summary
+PROFILE_TOP = 30
+
+
+def peak_rss(who='self'):
+    """Peak resident memory of process ('self') or of its finished child
+    processes ('children'), bytes. None if unknown.
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def rss():
+    """Current resident memory of process, bytes. None if unknown.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def _cpu():
+    """CPU time (user + system) of process and of its finished children.
+    """
+    times = os.times()
+    return times[0] + times[1], times[2] + times[3]
+
+
+def _mb(value):
+    return None if value is None else round(value / 1048576., 1)
+
+
+class _NullStage(object):
+    """Stage of disabled instrumentation, does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+# shared stage of disabled instrumentation
+NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.instrumentation._start(self.name)
+        return self
+
+    def __exit__(self, *args):
+        self.instrumentation._stop()
+        return False
+
+
+class Instrumentation(object):
+    """Timings and memory of report generation stages.
+
+    Every stage records wall time, CPU time of process and of finished plot
+    worker processes, resident memory after stage and peak resident memory.
+    Stages can be nested. Counters (rows, labels, files) and timings of
+    single plots are kept as well. Optional profiler runs during whole
+    generation: 'cprofile' collects function timings, 'tracemalloc' peak of
+    allocated memory of every stage and top allocation sites.
+    """
+
+    def __init__(self, profiler=None):
+        """Keyword arguments:
+        profiler -- None, 'cprofile' or 'tracemalloc'.
+        """
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError('Unknown profiler %s, expected one of %s' % (profiler, ', '.join(PROFILERS)))
+        self.profiler = profiler
+        # finished stages in order of end
+        self.stages = []
+        # counters by name
+        self.counters = {}
+        # list of (plot file name, seconds) of all rendered plots
+        self.plot_timings = []
+        self._stack = []
+        self._started = time.time()
+        self._profile = None
+        if profiler == 'cprofile':
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif profiler == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start()
+
+    def stage(self, name):
+        """Context manager measuring stage `name`.
+        """
+        return _Stage(self, name)
+
+    def count(self, name, value):
+        """Set counter, e.g. number of rows.
+        """
+        self.counters[name] = value
+
+    def add_plot_timings(self, timings):
+        """Add list of (plot file name, seconds) of rendered plots.
+        """
+        self.plot_timings.extend(timings)
+
+    def summary(self, top=10):
+        """Stages, counters and slowest plots as dict.
+        """
+        plot_time = sum(t for _, t in self.plot_timings)
+        return {'total': round(time.time() - self._started, 4),
+                'stages': self.stages,
+                'counters': self.counters,
+                'peak_rss_mb': _mb(peak_rss()),
+                'workers_peak_rss_mb': _mb(peak_rss('children')),
+                'plots': {'count': len(self.plot_timings),
+                          'seconds': round(plot_time, 4),
+                          'slowest': [(name, round(t, 4)) for name, t in
+                                      sorted(self.plot_timings, key=lambda x: -x[1])[:top]]}}
+
+    def finish(self, path):
+        """Stop profiler and write stats as JSON to `path` (cProfile stats
+        are also written next to it with .pstats extension).
+        """
+        result = self.summary(top=None)
+        result['profiler'] = self.profiler
+        if self.profiler == 'cprofile':
+            import pstats
+            self._profile.disable()
+            self._profile.dump_stats(os.path.splitext(path)[0] + '.pstats')
+            stats = pstats.Stats(self._profile).stats
+            functions = sorted(stats.items(), key=lambda x: -x[1][3])[:PROFILE_TOP]
+            result['profile'] = [{'function': '%s:%d(%s)' % key, 'calls': value[1],
+                                  'own': round(value[2], 4), 'cumulative': round(value[3], 4)}
+                                 for key, value in functions]
+        elif self.profiler == 'tracemalloc':
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            result['profile'] = [{'line': str(s.traceback), 'size_mb': _mb(s.size), 'count': s.count}
+                                 for s in snapshot.statistics('lineno')[:PROFILE_TOP]]
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        return result
+
+    def _start(self, name):
+        frame = {'name': name, 'wall': time.time(), 'cpu': _cpu(), 'traced_peak': 0}
+        if self.profiler == 'tracemalloc':
+            self._reset_traced_peak()
+        self._stack.append(frame)
+
+    def _stop(self):
+        frame = self._stack.pop()
+        cpu, children_cpu = _cpu()
+        stage = {'name': frame['name'],
+                 'parent': self._stack[-1]['name'] if self._stack else None,
+                 'depth': len(self._stack),
+                 'wall': round(time.time() - frame['wall'], 4),
+                 'cpu': round(cpu - frame['cpu'][0], 4),
+                 'children_cpu': round(children_cpu - frame['cpu'][1], 4),
+                 'rss_mb': _mb(rss()),
+                 'peak_rss_mb': _mb(peak_rss())}
+        if self.profiler == 'tracemalloc':
+            import tracemalloc
+            frame['traced_peak'] = max(frame['traced_peak'], tracemalloc.get_traced_memory()[1])
+            stage['traced_peak_mb'] = _mb(frame['traced_peak'])
+            if self._stack:
+                self._stack[-1]['traced_peak'] = max(self._stack[-1]['traced_peak'], frame['traced_peak'])
+        self.stages.append(stage)
+
+    def _reset_traced_peak(self):
+        """Keep peak of allocated memory of enclosing stage and start new peak.
+        """
+        import tracemalloc
+        if self._stack:
+            self._stack[-1]['traced_peak'] = max(self._stack[-1]['traced_peak'], tracemalloc.get_traced_memory()[1])
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+
+def stats_html(instrumentation, top=10):
+    """Render stages, counters and slowest plots of instrumentation as HTML,
+    stages finished by the time of rendering are included.
+
+    Yield HTML text chunks.
+    """
+    summary = instrumentation.summary(top)
+    stages = summary['stages']
+    index = [stage['name'] if stage['parent'] is None else '%s / %s' % (stage['parent'], stage['name'])
+             for stage in stages]
+    columns = [('Wall, sec', 'stats-wall', [stage['wall'] for stage in stages]),
+               ('CPU, sec', 'stats-cpu', [stage['cpu'] for stage in stages]),
+               ('Workers CPU, sec', 'stats-cpu', [stage['children_cpu'] for stage in stages]),
+               ('RSS, MB', 'stats-memory', [stage['rss_mb'] for stage in stages]),
+               ('Peak RSS, MB', 'stats-memory', [stage['peak_rss_mb'] for stage in stages])]
+    if instrumentation.profiler == 'tracemalloc':
+        columns.append(('Allocated peak, MB', 'stats-memory', [stage.get('traced_peak_mb') for stage in stages]))
+
+    counters = ', '.join('%s: %s' % (name, value) for name, value in sorted(summary['counters'].items()))
+    yield '<p>%.2f sec since start%s</p>\n' % (summary['total'], escape(', ' + counters) if counters else '')
+    for chunk in html_table(index, columns, table_id='stages', index_name='Stage'):
+        yield chunk
+
+    plots = summary['plots']
+    if plots['count']:
+        yield '<p>%d plots, %.2f sec of plot time, slowest:</p>\n' % (plots['count'], plots['seconds'])
+        for chunk in html_table([name for name, _ in plots['slowest']],
+                                [('Time, sec', 'stats-wall', [t for _, t in plots['slowest']])],
+                                table_id='slowest-plots', index_name='Plot'):
+            yield chunk
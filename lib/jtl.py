@@ -0,0 +1,93 @@
+import glob
+import time
+
+import numpy as np
+import pandas as pd
+
+# Narrow dtypes for JTL columns used by reports. Everything not listed here
+# is left to pandas.
+JTL_DTYPES = {'timeStamp': 'int64',
+              'elapsed': 'int32',
+              'Latency': 'int32',
+              'label': 'category',
+              'bytes': 'int64',
+              'grpThreads': 'int32',
+              'allThreads': 'int32'}
+
+# default number of rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 500000
+# period of local time offset lookup, msec
+QUARTER_MS = 15 * 60 * 1000
+
+
+def expand_paths(patterns):
+    """Expand glob patterns of JTL files. Patterns without matches are kept
+    as is, so missing file is reported by reader.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches if matches else [pattern])
+    return paths
+
+
+def read_header(file_path):
+    """Return list of column names of JTL file.
+    """
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+
+def has_epoch_timestamps(file_path):
+    """Check whether timeStamp field of JTL file is in epoch milliseconds
+    (JMeter default) and not formatted date.
+    """
+    first = pd.read_csv(file_path, nrows=1)
+    return 'timeStamp' not in first or pd.api.types.is_numeric_dtype(first['timeStamp'])
+
+
+def to_datetime(timestamps, date_format=None):
+    """Vectorized conversion of JTL timeStamp column to datetime64 in local time.
+
+    Keyword arguments:
+    timestamps -- Series with epoch milliseconds or formatted dates.
+    date_format -- strftime format of formatted dates. Inferred if None.
+    """
+    if pd.api.types.is_numeric_dtype(timestamps):
+        # conversion by pandas to local zone asks zone for offset of every
+        # value, so offset is taken once for every distinct quarter of hour
+        # (DST changes are at quarter boundaries) and added to epoch time
+        ms = np.asarray(timestamps, dtype=np.int64)
+        quarters = ms // QUARTER_MS
+        distinct = np.sort(pd.unique(quarters))
+        offsets = np.array([_utc_offset_ms(q * QUARTER_MS) for q in distinct], dtype=np.int64)
+        local = ms + offsets[np.searchsorted(distinct, quarters)]
+        return pd.Series(pd.to_datetime(local, unit='ms'), index=timestamps.index, name=timestamps.name)
+    return pd.to_datetime(timestamps, format=date_format)
+
+
+def _utc_offset_ms(ms):
+    """Offset of local time from UTC at epoch time in msec.
+    """
+    local = time.localtime(ms // 1000)
+    if hasattr(local, 'tm_gmtoff'):
+        return local.tm_gmtoff * 1000
+    return -(time.altzone if local.tm_isdst > 0 else time.timezone) * 1000
+
+
+def read_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, columns=None):
+    """Iterate over JTL file by data frames of at most `chunksize` rows.
+
+    Keyword arguments:
+    file_path -- path to JTL file in CSV format.
+    chunksize -- number of rows in one chunk.
+    columns -- list of columns to load. All columns if None.
+    """
+    header = read_header(file_path)
+    if columns is None:
+        columns = header
+    usecols = [c for c in columns if c in header]
+    dtype = dict((c, JTL_DTYPES[c]) for c in usecols if c in JTL_DTYPES)
+    if 'timeStamp' in dtype and not has_epoch_timestamps(file_path):
+        del dtype['timeStamp']
+
+    return pd.read_csv(file_path, usecols=usecols, dtype=dtype, chunksize=chunksize)
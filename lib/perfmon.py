@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from lib import jtl
+
+
+def series_name(column, column_params, group=None):
+    """Name of metric series: label of column (column name by default),
+    prefixed by group for grouped input.
+    """
+    label = (column_params or {}).get('label', column)
+    return label if group is None else '%s %s' % (group, label)
+
+
+def read_metrics(file_path, params, resolution=1, chunksize=jtl.DEFAULT_CHUNKSIZE):
+    """Read PerfMon Metrics Collector CSV and resample it to time buckets.
+
+    File is read by chunks, every chunk is reduced to sum and count of values
+    by bucket and series, so memory depends on number of buckets and not on
+    length of file.
+
+    Keyword arguments:
+    file_path -- path to CSV file (JTL format, metric values in columns).
+    params -- input parameters from perfmon config: 'columns' (dict of
+              column name to {'label': ..., 'as_is': ...}), optional
+              'group-by' column and list of 'groups' to keep. Values are
+              divided by 1000 (PerfMon stores value * 1000) unless 'as_is'.
+    resolution -- bucket size in seconds, as lib.timeseries.TimeSeries.
+
+    Return data frame of mean value by bucket start time (rows) and series
+    (columns).
+    """
+    columns = params.get('columns') or {}
+    group_by = params.get('group-by')
+    groups = params.get('groups')
+    usecols = ['timeStamp'] + list(columns) + ([group_by] if group_by else [])
+
+    total = None
+    count = None
+    for chunk in jtl.read_chunks(file_path, chunksize, columns=usecols):
+        if group_by and groups:
+            chunk = chunk[chunk[group_by].isin(groups)]
+        if chunk.empty:
+            continue
+        buckets = jtl.to_datetime(chunk['timeStamp']).values.astype('datetime64[ms]').astype(np.int64) \
+            // (resolution * 1000)
+
+        data = {}
+        for column, column_params in columns.items():
+            if column not in chunk:
+                continue
+            values = chunk[column].astype(np.float64)
+            if not (column_params or {}).get('as_is', False):
+                values = values / 1000.
+            if group_by:
+                for group, part in values.groupby(np.asarray(chunk[group_by], dtype=object)):
+                    data[series_name(column, column_params, group)] = part
+            else:
+                data[series_name(column, column_params)] = values
+        if not data:
+            continue
+
+        frame = pd.DataFrame(data)
+        frame['bucket'] = buckets
+        grouped = frame.groupby('bucket')
+        total = grouped.sum() if total is None else total.add(grouped.sum(), fill_value=0)
+        count = grouped.count() if count is None else count.add(grouped.count(), fill_value=0)
+
+    if total is None:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='time'))
+    result = (total / count.replace(0, np.nan)).sort_index()
+    result.index = pd.DatetimeIndex(pd.to_datetime(result.index.values * resolution * 1000, unit='ms'), name='time')
+    return result
+
+
+def align(metrics, index, resolution=1):
+    """Align resampled metrics to time buckets of test (e.g. index of
+    lib.timeseries.TimeSeries.frame) by nearest bucket within resolution,
+    in one merge pass over sorted times.
+    """
+    left = pd.DataFrame({'time': np.asarray(index, dtype='datetime64[ns]')})
+    right = metrics.reset_index()
+    right['time'] = right['time'].values.astype('datetime64[ns]')
+    result = pd.merge_asof(left, right, on='time', direction='nearest',
+                           tolerance=pd.Timedelta(seconds=resolution))
+    return result.set_index('time')
@@ -0,0 +1,109 @@
+import os
+import time
+
+from lib.utils import run_tasks
+
+# style of report plots, see setup_style
+STYLE = 'ggplot'
+FONT = {'size': '8'}
+#'family' : 'monospace',
+#'weight' : 'bold',
+
+
+def setup_style():
+    """Common style of report plots.
+    """
+    from matplotlib import rc
+    from mpltools import style
+
+    rc('font', **FONT)
+    style.use(STYLE)
+
+
+def style_key():
+    """Description of plot style for keys of cached plots: matplotlib
+    version and style settings.
+    """
+    import matplotlib
+
+    return 'matplotlib %s %s %r' % (matplotlib.__version__, STYLE, sorted(FONT.items()))
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    setup_style()
+
+
+class PlotTimer(object):
+    """Save plots and collect time spent on every plot.
+    """
+
+    def __init__(self):
+        self.timings = []
+        self._start = time.time()
+
+    def save(self, path):
+        """Save current figure to `path`, close it and record plot time.
+        """
+        import matplotlib.pyplot as plt
+
+        plt.tight_layout()
+        plt.savefig(path)
+        plt.close()
+        self.timings.append((os.path.basename(path), time.time() - self._start))
+        self._start = time.time()
+
+
+def density_plot(density, upper=None, label=None, color=None):
+    """Plot probability histogram and KDE curve of lib.density.Density on
+    current figure.
+
+    Keyword arguments:
+    density -- Density of sample.
+    upper -- plot only values below this bound, e.g. density.p90.
+    label -- legend label.
+    color -- color of histogram and curve.
+    """
+    import matplotlib.pyplot as plt
+
+    edges, h = density.histogram(upper=upper)
+    plt.bar(edges[:-1], h, width=edges[1] - edges[0], align='edge', alpha=0.2, color=color, label=label)
+    x, y = density.kde(upper=upper)
+    plt.plot(x, y, color=color, label=label)
+
+
+def render(tasks, jobs=1, artifacts=None):
+    """Render plots.
+
+    Keyword arguments:
+    tasks -- list of (function, args) tuples. Function must be defined at module
+             level (to be passed to worker process) and return list of
+             (file name, seconds) tuples, see PlotTimer.
+    jobs -- number of worker processes. Plots are rendered in current process
+            if jobs is 1.
+    artifacts -- cache of rendered plots (lib.artifacts.ArtifactCache), only
+                 missing plots are rendered. None to render all plots.
+
+    Return list of (file name, seconds) tuples for all plots.
+    """
+    def run(tasks):
+        if jobs <= 1 or len(tasks) <= 1:
+            setup_style()
+        return run_tasks(tasks, jobs, initializer=_init_worker)
+
+    results = run(tasks) if artifacts is None else artifacts.render(tasks, run, style_key())
+    return [timing for result in results for timing in result]
+
+
+def print_timings(timings, wall_time, top=5, restored=0):
+    """Print summary of plot rendering time.
+
+    Keyword arguments:
+    restored -- number of plot tasks restored from cache.
+    """
+    total = sum(t for _, t in timings)
+    print('Rendered %d plots in %.2f sec (%.2f sec of plot time%s)'
+          % (len(timings), wall_time, total, ', %d tasks restored from cache' % restored if restored else ''))
+    for name, t in sorted(timings, key=lambda x: -x[1])[:top]:
+        print('    %-60s %.3f sec' % (name, t))
@@ -0,0 +1,174 @@
+import math
+from functools import partial
+
+import numpy as np
+
+# default relative error of percentiles calculated by sketch
+DEFAULT_ERROR = 0.01
+
+
+class ExactQuantiles(object):
+    """Exact percentiles. Keeps all values, use it for small runs only.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._values = None
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values):
+            self._chunks.append(values)
+            self._values = None
+            self.count += len(values)
+
+    def merge(self, other):
+        self._chunks.extend(other._chunks)
+        self._values = None
+        self.count += other.count
+
+    def percentile(self, q):
+        if not self.count:
+            return np.full(np.shape(q), np.nan)
+        if self._values is None:
+            self._values = np.concatenate(self._chunks)
+            self._chunks = [self._values]
+        return np.percentile(self._values, q)
+
+
+class IntegerHistogram(object):
+    """Histogram of integer values (latency in msec) with one bucket per value.
+
+    Percentiles are exact and equal to np.percentile results, memory depends
+    on maximum value.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values)
+        if len(values):
+            self._add(np.bincount(values.astype(np.int64)))
+
+    def merge(self, other):
+        self._add(other.counts)
+
+    def percentile(self, q):
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        cum = np.cumsum(self.counts)
+        pos = q / 100. * (self.count - 1)
+        lo = np.floor(pos)
+        v_lo = np.searchsorted(cum, lo, side='right')
+        v_hi = np.searchsorted(cum, np.ceil(pos), side='right')
+        return v_lo + (v_hi - v_lo) * (pos - lo)
+
+    def _add(self, counts):
+        if len(self.counts) < len(counts):
+            self.counts, counts = counts.astype(np.int64), self.counts
+        else:
+            self.counts = self.counts.copy()
+        self.counts[:len(counts)] += counts
+        self.count = int(self.counts.sum())
+
+
+class LogHistogram(object):
+    """HDR-style histogram with logarithmic buckets.
+
+    Bucket k holds values in (gamma^(k-1), gamma^k], where
+    gamma = (1 + error) / (1 - error), so relative error of every percentile
+    is at most `error`. Number of buckets grows with log of range of values
+    and not with number of values. Histograms with the same error can be
+    merged.
+    """
+
+    def __init__(self, error=DEFAULT_ERROR):
+        self.error = error
+        self._gamma = (1. + error) / (1. - error)
+        self._log_gamma = math.log(self._gamma)
+        # counts of buckets, counts[0] is bucket with index `offset`
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+        # count of values <= 0
+        self.zero_count = 0
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        positive = values[values > 0]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int64)
+            offset = keys.min()
+            self._add(offset, np.bincount(keys - offset))
+
+    def merge(self, other):
+        if other.error != self.error:
+            raise ValueError('Cannot merge histograms with different error: %s and %s' % (self.error, other.error))
+        self.count += other.count
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(other.counts):
+            self._add(other.offset, other.counts)
+
+    def percentile(self, q):
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        cum = np.cumsum(np.concatenate([[self.zero_count], self.counts]))
+        pos = q / 100. * (self.count - 1)
+        lo = np.floor(pos)
+        v_lo = self._bucket_value(np.searchsorted(cum, lo, side='right'))
+        v_hi = self._bucket_value(np.searchsorted(cum, np.ceil(pos), side='right'))
+        return np.clip(v_lo + (v_hi - v_lo) * (pos - lo), self.min, self.max)
+
+    def _bucket_value(self, index):
+        """Value representing bucket, index 0 is bucket of values <= 0.
+        """
+        keys = self.offset + np.asarray(index) - 1
+        values = 2. * self._gamma ** keys / (self._gamma + 1.)
+        return np.where(np.asarray(index) == 0, 0., values)
+
+    def _add(self, offset, counts):
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.astype(np.int64)
+            return
+        start = min(self.offset, offset)
+        end = max(self.offset + len(self.counts), offset + len(counts))
+        result = np.zeros(end - start, dtype=np.int64)
+        result[self.offset - start:self.offset - start + len(self.counts)] += self.counts
+        result[offset - start:offset - start + len(counts)] += counts
+        self.offset, self.counts = start, result
+
+
+ENGINES = {'exact': ExactQuantiles,
+           'histogram': IntegerHistogram,
+           'sketch': LogHistogram}
+
+
+def engine_factory(name, error=DEFAULT_ERROR):
+    """Return function creating empty quantile engine by name.
+
+    Keyword arguments:
+    name -- 'exact' (all values), 'histogram' (exact for integer msec) or
+            'sketch' (logarithmic histogram with relative error `error`).
+    error -- relative error of 'sketch' engine.
+    """
+    if name not in ENGINES:
+        raise ValueError('Unknown quantile engine "%s", use one of: %s' % (name, ', '.join(sorted(ENGINES))))
+    if name == 'sketch':
+        return partial(LogHistogram, error)
+    return ENGINES[name]
@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from lib.aggregate import LabelStats
+from lib.quantiles import DEFAULT_ERROR, IntegerHistogram, LogHistogram, engine_factory
+
+# default directory of stored runs
+DEFAULT_RUNS_DIR = 'results/runs'
+
+_META = 'meta.json'
+_ARRAYS = 'arrays.npz'
+_RUN_ID = re.compile(r'^[\w.-]+$')
+
+
+def time_series(store):
+    """Per second series of test: number of samples, sum of latency and number
+    of errors, as data frame indexed by second (unix time).
+
+    Keyword arguments:
+    store -- samples of test with time (lib.samplestore.SampleStore).
+    """
+    seconds = store['timeStamp'].astype('datetime64[s]').astype(np.int64)
+    keys, codes = np.unique(seconds, return_inverse=True)
+    result = pd.DataFrame({'count': np.bincount(codes, minlength=len(keys)),
+                           'latency': np.bincount(codes, weights=store['Latency'], minlength=len(keys))},
+                          index=pd.Index(keys, name='second'))
+    if 'success' in store:
+        failed = ~store['success']
+        result['errors'] = np.bincount(codes, weights=failed, minlength=len(keys)).astype(np.int64)
+    return result
+
+
+def series_frame(series):
+    """Series of test from lib.timeseries.TimeSeries as data frame with
+    columns of time_series indexed by start of bucket (unix time in seconds),
+    buckets without samples are skipped.
+    """
+    start = 0 if series.start is None else series.start
+    seconds = (start + np.arange(series.size, dtype=np.int64)) * series.resolution
+    result = pd.DataFrame({'count': series.count.sum(axis=1),
+                           'latency': series.latency,
+                           'errors': series.errors},
+                          index=pd.Index(seconds, name='second'),
+                          columns=['count', 'latency', 'errors'])
+    return result[result['count'] > 0]
+
+
+class RunStore(object):
+    """File based store of compact run summaries.
+
+    Summary of run is statistics by label (count, sum, min, max, M2 and
+    quantile engine, see lib.aggregate.LabelStats) and time series of all
+    labels (time series by label are not stored).
+    It is kept instead of raw JTL files to compare later runs against it.
+    Every run is a directory with meta.json and arrays.npz.
+    """
+
+    def __init__(self, runs_dir=DEFAULT_RUNS_DIR):
+        """Keyword arguments:
+        runs_dir -- directory of stored runs.
+        """
+        self.runs_dir = runs_dir
+
+    def exists(self, run_id):
+        return bool(_RUN_ID.match(run_id)) and os.path.isfile(os.path.join(self.runs_dir, run_id, _META))
+
+    def runs(self):
+        """List of stored run ids.
+        """
+        if not os.path.isdir(self.runs_dir):
+            return []
+        return sorted(r for r in os.listdir(self.runs_dir) if self.exists(r))
+
+    def save(self, run_id, stats, series=None, resolution=1):
+        """Save summary of run, replace previous run with the same id.
+
+        Keyword arguments:
+        run_id -- name of run, letters, digits, '_', '-' and '.'.
+        stats -- LabelStats with IntegerHistogram or LogHistogram engines.
+        series -- data frame of time series (see time_series and
+                  series_frame) or None.
+        resolution -- bucket size of series in seconds.
+        """
+        if not _RUN_ID.match(run_id):
+            raise ValueError('Invalid run id "%s", use letters, digits, "_", "-" and "."' % run_id)
+
+        engine, arrays = _encode_engines(stats.quantiles)
+        arrays.update({'count': stats.count, 'sum': stats.sum, 'min': stats.min, 'max': stats.max, 'm2': stats.m2,
+                       'first': stats.first, 'last': stats.last})
+        meta = {'labels': list(stats.labels), 'engine': engine, 'series': [], 'resolution': resolution}
+        if series is not None:
+            meta['series'] = list(series.columns)
+            arrays['series_index'] = series.index.values
+            for column in series.columns:
+                arrays['series_' + column] = series[column].values
+
+        path = os.path.join(self.runs_dir, run_id)
+        tmp = path + '.tmp%d' % os.getpid()
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        try:
+            np.savez_compressed(os.path.join(tmp, _ARRAYS), **arrays)
+            with open(os.path.join(tmp, _META), 'w') as f:
+                json.dump(meta, f)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.rename(tmp, path)
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def load(self, run_id):
+        """Load summary of run.
+
+        Return tuple of LabelStats and per second data frame (None if run has
+        no time series).
+        """
+        if not self.exists(run_id):
+            raise ValueError('Run "%s" not found in %s' % (run_id, self.runs_dir))
+
+        path = os.path.join(self.runs_dir, run_id)
+        with open(os.path.join(path, _META)) as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, _ARRAYS), allow_pickle=False) as data:
+            arrays = dict(data.items())
+
+        engine = meta['engine'] or {'name': 'histogram'}
+        # times of samples are not in runs saved by older versions
+        times = dict((name, arrays[name]) for name in ('first', 'last') if name in arrays)
+        stats = LabelStats.from_arrays(engine_factory(engine['name'], engine.get('error', DEFAULT_ERROR)),
+                                       meta['labels'], _decode_engines(meta['engine'], arrays),
+                                       count=arrays['count'], sum=arrays['sum'], min=arrays['min'],
+                                       max=arrays['max'], m2=arrays['m2'], **times)
+
+        series = None
+        if meta['series']:
+            series = pd.DataFrame(dict((c, arrays['series_' + c]) for c in meta['series']),
+                                  index=pd.Index(arrays['series_index'], name='second'),
+                                  columns=meta['series'])
+        return stats, series
+
+
+def _encode_engines(engines):
+    """Quantile engines of labels as description of engine and flat arrays:
+    counts of all engines are concatenated, lengths and offsets of every
+    engine are kept separately.
+    """
+    if not engines:
+        return None, {'lengths': np.zeros(0, dtype=np.int64), 'counts': np.zeros(0, dtype=np.int64)}
+    if all(isinstance(e, LogHistogram) for e in engines):
+        errors = set(e.error for e in engines)
+        if len(errors) > 1:
+            raise ValueError('Cannot store sketches with different error: %s' % sorted(errors))
+        engine = {'name': 'sketch', 'error': errors.pop()}
+    elif all(isinstance(e, IntegerHistogram) for e in engines):
+        engine = {'name': 'histogram'}
+    else:
+        raise ValueError('Run summary needs histogram or sketch quantile engine')
+
+    arrays = {'lengths': np.array([len(e.counts) for e in engines], dtype=np.int64),
+              'counts': np.concatenate([e.counts for e in engines]).astype(np.int64)}
+    if engine['name'] == 'sketch':
+        arrays['offsets'] = np.array([e.offset for e in engines], dtype=np.int64)
+        arrays['zero_counts'] = np.array([e.zero_count for e in engines], dtype=np.int64)
+        arrays['sketch_min'] = np.array([e.min for e in engines], dtype=np.float64)
+        arrays['sketch_max'] = np.array([e.max for e in engines], dtype=np.float64)
+    return engine, arrays
+
+
+def _decode_engines(engine, arrays):
+    """Restore quantile engines from _encode_engines result.
+    """
+    if engine is None:
+        return []
+    ends = np.cumsum(arrays['lengths'])
+    result = []
+    for i, end in enumerate(ends):
+        counts = arrays['counts'][end - arrays['lengths'][i]:end]
+        if engine['name'] == 'sketch':
+            e = LogHistogram(engine['error'])
+            e.offset = int(arrays['offsets'][i])
+            e.zero_count = int(arrays['zero_counts'][i])
+            e.min = float(arrays['sketch_min'][i])
+            e.max = float(arrays['sketch_max'][i])
+        else:
+            e = IntegerHistogram()
+        e.counts = counts
+        e.count = int(counts.sum()) + getattr(e, 'zero_count', 0)
+        result.append(e)
+    return result
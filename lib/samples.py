@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from lib.aggregate import segment_stats, stats_frame
+
+
+def sorted_percentile(values, q):
+    """Percentiles of sorted array with linear interpolation, as np.percentile
+    but without partitioning values again.
+    """
+    q = np.asarray(q, dtype=np.float64)
+    if not len(values):
+        return np.full(q.shape, np.nan)
+    pos = q / 100. * (len(values) - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def _rank_dtype(size):
+    return np.int32 if size < 2 ** 31 else np.int64
+
+
+class Samples(object):
+    """Response times of one label: values sorted once and rank of every
+    sample, shared by statistics, percentiles, histograms and plots.
+    """
+
+    def __init__(self, sorted_values, ranks):
+        """Keyword arguments:
+        sorted_values -- float array of values in ascending order.
+        ranks -- position in sorted_values of every sample in time order.
+        """
+        self.sorted = sorted_values
+        self.ranks = ranks
+
+    @classmethod
+    def from_values(cls, values):
+        """Samples of array of values in time order.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(values, kind='mergesort')
+        ranks = np.empty(len(order), dtype=_rank_dtype(len(order)))
+        ranks[order] = np.arange(len(order))
+        return cls(values[order], ranks)
+
+    def __len__(self):
+        return len(self.sorted)
+
+    def values(self):
+        """Values in time order.
+        """
+        return self.sorted[self.ranks]
+
+    def percentile(self, q):
+        """Percentile or array of percentiles (numbers from 0 to 100).
+        """
+        return sorted_percentile(self.sorted, q)
+
+    def below(self, q):
+        """Sorted values less than q-th percentile, e.g. values of 90% line
+        histogram for q = 90.
+        """
+        if not len(self.sorted):
+            return self.sorted
+        return self.sorted[:np.searchsorted(self.sorted, self.percentile(q), side='left')]
+
+
+class SampleViews(object):
+    """Samples of every label of test run, sorted by label and value in one
+    pass. Samples of label (see Samples) are views of contiguous slices of
+    shared arrays, so statistics and plots of all labels read the same sorted
+    data instead of grouping and sorting it again.
+    """
+
+    def __init__(self, labels, values, categories=None):
+        """Keyword arguments:
+        labels -- label of every sample, or codes of labels in categories.
+        values -- response time of every sample, in time order.
+        categories -- list of labels of codes (e.g. dictionary of
+                      lib.samplestore.SampleStore), None if labels are not codes.
+        """
+        if categories is None:
+            codes, uniques = pd.factorize(np.asarray(labels))
+        else:
+            codes, uniques = np.asarray(labels), categories
+        values = np.asarray(values, dtype=np.float64)
+        size = len(values)
+        order = np.lexsort((values, codes))
+        # values sorted by label, then by value
+        self.sorted = values[order]
+        # number of samples of every label
+        self.count = np.bincount(codes, minlength=len(uniques))
+        # start of samples of every label in self.sorted
+        self.starts = np.cumsum(self.count) - self.count
+        self.labels = list(uniques)
+
+        # rank of sample inside its label: position of sorted sample minus
+        # start of label, taken in time order of samples of label
+        position = np.empty(size, dtype=_rank_dtype(size))
+        position[order] = np.arange(size)
+        by_label = np.argsort(codes, kind='mergesort')
+        # ranks of samples of every label in time order, grouped by label
+        self.ranks = (position[by_label] - np.repeat(self.starts, self.count)).astype(position.dtype)
+        self._index = dict((label, i) for i, label in enumerate(self.labels))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self._index
+
+    def __getitem__(self, label):
+        i = self._index[label]
+        start, end = self.starts[i], self.starts[i] + self.count[i]
+        return Samples(self.sorted[start:end], self.ranks[start:end])
+
+    def get(self, label, default=None):
+        """Samples of label or default if label is absent.
+        """
+        return self[label] if label in self._index else default
+
+    def items(self):
+        """Iterate over (label, Samples) in order of labels, as groupby.
+        """
+        for label in sorted(self.labels):
+            yield label, self[label]
+
+    def frame(self, duration=None):
+        """Data frame of statistics by label with lib.aggregate.STATS_COLUMNS
+        columns, from sorted samples.
+
+        Keyword arguments:
+        duration -- seconds from first to last sample of every label (see
+                    lib.aggregate.durations), None if times are unknown.
+        """
+        stats = segment_stats(self.sorted, self.count)
+        return stats_frame(self.labels, stats['count'], stats['sum'], stats['min'], stats['max'], stats['m2'],
+                           stats[50], stats[90], duration)
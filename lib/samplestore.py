@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+
+from lib import jtl
+from lib.timeseries import success_mask
+
+# storage of JTL columns in SampleStore: dtype of values, 'dictionary' for
+# small integer codes of distinct strings or 'bitmap' for flags. Other
+# columns are not stored.
+STORE_COLUMNS = {'timeStamp': 'int64',
+                 'elapsed': 'uint32',
+                 'Latency': 'uint32',
+                 'Connect': 'uint32',
+                 'bytes': 'uint32',
+                 'grpThreads': 'uint32',
+                 'allThreads': 'uint32',
+                 'label': 'dictionary',
+                 'threadName': 'dictionary',
+                 'responseCode': 'dictionary',
+                 'success': 'bitmap'}
+
+
+def codes_dtype(size):
+    """Smallest unsigned integer dtype of codes of dictionary of `size` values.
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if size <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def _join(parts, dtype, size):
+    """Concatenate arrays into new array of dtype without intermediate copy.
+    """
+    result = np.empty(size, dtype=dtype)
+    position = 0
+    for part in parts:
+        result[position:position + len(part)] = part
+        position += len(part)
+    return result
+
+
+class SampleStore(object):
+    """Compact columnar store of samples of test run.
+
+    Every column is one NumPy array: strings (labels, thread names, response
+    codes) are codes of dictionary of distinct values in the smallest
+    unsigned type, times are int64 msec of local time, latency, elapsed and
+    other numbers are uint32 and success flags are bitmap. Only columns
+    needed by report are stored, e.g. label, latency, time, success and
+    active threads take 17 bytes per sample with less than 256 labels.
+
+    Columns are exposed as views of the arrays without copying (see
+    __getitem__ and codes), frames (see frame and chunks) are built on
+    demand for code working with data frames.
+    """
+
+    def __init__(self, size, columns, dictionaries):
+        """Keyword arguments:
+        size -- number of samples.
+        columns -- list of (name, array) of stored columns, bitmap columns
+                   are packed by np.packbits.
+        dictionaries -- dict of name of dictionary column to list of values.
+        """
+        self.size = size
+        # names of stored columns in order of file
+        self.names = [name for name, _ in columns]
+        self.columns = dict(columns)
+        self.dictionaries = dictionaries
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    @property
+    def nbytes(self):
+        """Size of stored columns in bytes.
+        """
+        return sum(values.nbytes for values in self.columns.values())
+
+    def __getitem__(self, name):
+        """Values of column: array of numbers (timeStamp as datetime64[ms])
+        without copying, boolean array of bitmap or categorical of dictionary
+        column.
+        """
+        return self._values(name, 0, self.size)
+
+    def codes(self, name):
+        """Tuple of codes (without copying) and list of values of dictionary column.
+        """
+        return self.columns[name], self.dictionaries[name]
+
+    def frame(self, start=0, end=None):
+        """Data frame of samples from start to end with stored columns,
+        indexed by time of samples if timeStamp is stored.
+        """
+        end = self.size if end is None else min(end, self.size)
+        names = [name for name in self.names if name != 'timeStamp']
+        data = dict((name, self._values(name, start, end)) for name in names)
+        if 'timeStamp' in self.columns:
+            index = pd.DatetimeIndex(self._values('timeStamp', start, end), name='timeStamp')
+        else:
+            index = pd.RangeIndex(start, end)
+        return pd.DataFrame(data, index=index, columns=names)
+
+    def chunks(self, chunksize=jtl.DEFAULT_CHUNKSIZE):
+        """Iterate over samples by data frames of at most `chunksize` rows, see frame.
+        """
+        for start in range(0, self.size, chunksize):
+            yield self.frame(start, start + chunksize)
+
+    def _values(self, name, start, end):
+        values = self.columns[name]
+        kind = STORE_COLUMNS[name]
+        if kind == 'bitmap':
+            bits = np.unpackbits(values[start // 8:(end + 7) // 8])
+            return bits[start % 8:start % 8 + end - start].view(np.bool_)
+        if kind == 'dictionary':
+            return pd.Categorical.from_codes(values[start:end], self.dictionaries[name])
+        if name == 'timeStamp':
+            return values[start:end].view('datetime64[ms]')
+        return values[start:end]
+
+    @classmethod
+    def concat(cls, stores):
+        """Join stores of files of one test in order of time of samples.
+        Only columns stored in every file are kept.
+        """
+        if len(stores) == 1:
+            return stores[0]
+        names = [name for name in stores[0].names if all(name in store for store in stores)]
+        size = sum(len(store) for store in stores)
+        columns = []
+        dictionaries = {}
+        for name in names:
+            kind = STORE_COLUMNS[name]
+            if kind == 'dictionary':
+                builder = StoreBuilder([name])
+                parts = [builder.encode(name, store.codes(name)[0], store.dictionaries[name]) for store in stores]
+                dictionaries[name] = builder.dictionaries[name]
+                values = _join(parts, codes_dtype(len(dictionaries[name])), size)
+            elif kind == 'bitmap':
+                values = _join([store[name] for store in stores], np.bool_, size)
+            else:
+                values = _join([store.columns[name] for store in stores], kind, size)
+            columns.append((name, values))
+
+        if 'timeStamp' in names:
+            # samples of files are merged by time, stable for equal times
+            order = np.argsort(dict(columns)['timeStamp'], kind='mergesort')
+            columns = [(name, values[order]) for name, values in columns]
+        return cls(size, [(name, np.packbits(values) if STORE_COLUMNS[name] == 'bitmap' else values)
+                          for name, values in columns], dictionaries)
+
+
+class StoreBuilder(object):
+    """Build SampleStore from chunks of JTL data frame (see lib.jtl.read_chunks).
+    """
+
+    def __init__(self, columns):
+        """Keyword arguments:
+        columns -- list of columns to store, columns missing in file and not
+                   in STORE_COLUMNS are skipped.
+        """
+        self.columns = [c for c in columns if c in STORE_COLUMNS]
+        self.size = 0
+        # names of stored columns, set by first chunk
+        self.names = None
+        # values of dictionary columns in order of codes
+        self.dictionaries = dict((c, []) for c in self.columns if STORE_COLUMNS[c] == 'dictionary')
+        self._index = dict((c, {}) for c in self.dictionaries)
+        self._parts = dict((c, []) for c in self.columns)
+
+    def append(self, chunk):
+        if self.names is None:
+            self.names = [c for c in self.columns if c in chunk]
+        for name in self.names:
+            column = chunk[name]
+            kind = STORE_COLUMNS[name]
+            if kind == 'dictionary':
+                if hasattr(column, 'cat'):
+                    values = self.encode(name, np.asarray(column.cat.codes), column.cat.categories)
+                else:
+                    if pd.api.types.is_numeric_dtype(column):
+                        # e.g. response codes of file with numeric codes only
+                        column = column.astype(str)
+                    values = self.encode(name, *pd.factorize(np.asarray(column, dtype=object)))
+            elif kind == 'bitmap':
+                values = success_mask(column)
+            elif name == 'timeStamp':
+                values = np.asarray(jtl.to_datetime(column), dtype='datetime64[ms]').view(np.int64)
+            else:
+                values = np.asarray(column, dtype=kind)
+            self._parts[name].append(values)
+        self.size += len(chunk)
+
+    def encode(self, name, codes, uniques):
+        """Map codes of values `uniques` to codes of dictionary of column,
+        new values are appended to dictionary. Missing values (code -1) are
+        stored as empty string.
+        """
+        codes = np.asarray(codes)
+        uniques = list(uniques)
+        if len(codes) and codes.min() < 0:
+            codes = np.where(codes < 0, len(uniques), codes)
+            uniques.append('')
+
+        dictionary = self.dictionaries[name]
+        index = self._index[name]
+        mapping = []
+        for value in uniques:
+            if value not in index:
+                index[value] = len(dictionary)
+                dictionary.append(value)
+            mapping.append(index[value])
+        return np.asarray(mapping, dtype=np.int64)[codes]
+
+    def store(self):
+        """SampleStore of appended chunks.
+        """
+        names = self.columns if self.names is None else self.names
+        columns = []
+        for name in names:
+            kind = STORE_COLUMNS[name]
+            if kind == 'dictionary':
+                dtype = codes_dtype(len(self.dictionaries[name]))
+            elif kind == 'bitmap':
+                dtype = np.bool_
+            else:
+                dtype = kind
+            values = _join(self._parts.pop(name), dtype, self.size)
+            columns.append((name, np.packbits(values) if kind == 'bitmap' else values))
+        return SampleStore(self.size, columns, dict((name, self.dictionaries[name]) for name in names
+                                                    if name in self.dictionaries))
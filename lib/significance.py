@@ -0,0 +1,178 @@
+import math
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from lib.samples import sorted_percentile
+from lib.utils import parallel_map
+
+# number of quantiles in summary of label used for tests
+DEFAULT_SUMMARY = 2000
+# number of bootstrap resamples
+DEFAULT_RESAMPLES = 1000
+# significance level, confidence intervals are at level 1 - alpha
+DEFAULT_ALPHA = 0.05
+# base of random seeds, results do not depend on order of labels or number of processes
+DEFAULT_SEED = 42
+# percentiles with confidence intervals of difference
+PERCENTILES = (50, 90)
+# columns of significance data frame
+SIGNIFICANCE_COLUMNS = ['p_value', 'median_low', 'median_high', 'line90_low', 'line90_high', 'verdict']
+
+
+def label_seed(label, seed=DEFAULT_SEED):
+    """Random seed of label, stable between runs and processes.
+    """
+    return (seed + zlib.crc32(str(label).encode('utf-8'))) % (2 ** 32)
+
+
+def _probabilities(size):
+    return (np.arange(size) + 0.5) / size
+
+
+def summary(values, size=DEFAULT_SUMMARY, is_sorted=False):
+    """Summary of sample for tests: sorted values, or `size` evenly spaced
+    quantiles of larger sample.
+
+    Keyword arguments:
+    is_sorted -- values are sorted (e.g. lib.samples.Samples.sorted).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if is_sorted:
+        return values if len(values) <= size else sorted_percentile(values, _probabilities(size) * 100)
+    if len(values) <= size:
+        return np.sort(values)
+    return np.percentile(values, _probabilities(size) * 100)
+
+
+def sketch_summary(engine, count, size=DEFAULT_SUMMARY):
+    """Summary of sample from quantile engine (see lib.quantiles), for runs
+    without raw samples.
+
+    Keyword arguments:
+    engine -- quantile engine of label.
+    count -- number of samples of label.
+    size -- maximum number of quantiles.
+    """
+    size = int(min(count, size))
+    if not size:
+        return np.zeros(0)
+    return np.asarray(engine.percentile(_probabilities(size) * 100), dtype=np.float64)
+
+
+def mann_whitney(a, b, n_a=None, n_b=None):
+    """Two-sided Mann-Whitney U test with normal approximation and correction
+    for ties.
+
+    Effect (probability of superiority) and ties are estimated from summaries
+    a and b (see summary) of samples of n_a and n_b values, p-value is
+    calculated for full sizes of samples.
+
+    Return tuple of probability that value of b is greater than value of a
+    (ties count half) and p-value.
+    """
+    m_a, m_b = len(a), len(b)
+    if not m_a or not m_b:
+        return np.nan, np.nan
+    n_a = n_a or m_a
+    n_b = n_b or m_b
+    pooled = np.concatenate([a, b])
+    m = len(pooled)
+    _, inverse, counts = np.unique(pooled, return_inverse=True, return_counts=True)
+    # average rank of every distinct value
+    ranks = np.cumsum(counts) - (counts - 1) / 2.
+    u_b = ranks[inverse[m_a:]].sum() - m_b * (m_b + 1) / 2.
+    effect = u_b / (m_a * m_b)
+
+    ties = (counts ** 3 - counts).sum() / float(m ** 3 - m) if m > 1 else 1.
+    n = n_a + n_b
+    variance = n_a * n_b * (n + 1) / 12. * (1 - ties)
+    if variance <= 0:
+        return effect, 1.
+    z = (effect - 0.5) * n_a * n_b / math.sqrt(variance)
+    return effect, math.erfc(abs(z) / math.sqrt(2))
+
+
+def bootstrap_percentiles(values, n=None, q=PERCENTILES, resamples=DEFAULT_RESAMPLES, rng=None):
+    """Percentiles of bootstrap resamples of sample of n values with summary
+    `values` (see summary), array resamples x len(q).
+
+    Percentile of resample of n values is its k-th order statistic. Resample
+    is n uniform draws mapped by quantile function of sample, so k-th order
+    statistic of resample is quantile function of k-th order statistic of n
+    uniform values, which is Beta(k, n - k + 1). It is drawn directly, in
+    O(resamples) without materializing resamples of n values.
+    """
+    rng = rng or np.random.RandomState(DEFAULT_SEED)
+    n = n or len(values)
+    result = np.empty((resamples, len(q)))
+    for i, p in enumerate(q):
+        k = min(int(p / 100. * (n - 1)) + 1, n)
+        u = rng.beta(k, n - k + 1, resamples)
+        result[:, i] = np.interp(u, _probabilities(len(values)), values)
+    return result
+
+
+def bootstrap_diff(a, b, n_a=None, n_b=None, q=PERCENTILES, resamples=DEFAULT_RESAMPLES,
+                   alpha=DEFAULT_ALPHA, seed=DEFAULT_SEED):
+    """Bootstrap percentile confidence interval of differences of percentiles
+    (b - a) of samples of n_a and n_b values with summaries a and b.
+
+    Return array len(q) x 2 of lower and upper bounds at level 1 - alpha.
+    """
+    if not len(a) or not len(b):
+        return np.full((len(q), 2), np.nan)
+    rng = np.random.RandomState(seed)
+    diff = bootstrap_percentiles(b, n_b, q, resamples, rng) - bootstrap_percentiles(a, n_a, q, resamples, rng)
+    return np.percentile(diff, [alpha * 50, 100 - alpha * 50], axis=0).T
+
+
+def compare_label(a, b, n_a=None, n_b=None, resamples=DEFAULT_RESAMPLES, alpha=DEFAULT_ALPHA,
+                  seed=DEFAULT_SEED):
+    """Significance of difference of response times of label in two runs.
+
+    Keyword arguments:
+    a -- summary of response times of base run, see summary.
+    b -- summary of response times of compared run.
+    n_a, n_b -- number of samples of label in runs, sizes of a and b by default.
+
+    Return list of values of SIGNIFICANCE_COLUMNS: p-value of Mann-Whitney U
+    test, bounds of confidence intervals of differences of median and 90%
+    line in msec and verdict: 'regression' or 'improvement' if difference is
+    significant and confidence interval of median or 90% line excludes zero,
+    'same' otherwise.
+    """
+    _, p_value = mann_whitney(a, b, n_a, n_b)
+    ci = bootstrap_diff(a, b, n_a, n_b, PERCENTILES, resamples, alpha, seed)
+    verdict = 'same'
+    if p_value < alpha:
+        if (ci[:, 0] > 0).any():
+            verdict = 'regression'
+        elif (ci[:, 1] < 0).any():
+            verdict = 'improvement'
+    return [p_value] + ci.ravel().tolist() + [verdict]
+
+
+def _compare_labels(items, resamples, alpha, seed):
+    return [compare_label(a, b, n_a, n_b, resamples, alpha, label_seed(label, seed))
+            for label, a, n_a, b, n_b in items]
+
+
+def significance(items, resamples=DEFAULT_RESAMPLES, alpha=DEFAULT_ALPHA, seed=DEFAULT_SEED, jobs=1):
+    """Significance of differences of labels of two runs, labels are split
+    into `jobs` batches processed in parallel. Every label has own fixed
+    seed, so result does not depend on number of processes.
+
+    Keyword arguments:
+    items -- list of (label, a, n_a, b, n_b) tuples, see compare_label.
+
+    Return data frame indexed by label with SIGNIFICANCE_COLUMNS columns.
+    """
+    size = int(math.ceil(len(items) / float(max(jobs, 1)))) or 1
+    batches = [items[i:i + size] for i in range(0, len(items), size)]
+    rows = []
+    for result in parallel_map(_compare_labels, [(batch, resamples, alpha, seed) for batch in batches], jobs):
+        rows.extend(result)
+    return pd.DataFrame(rows, index=pd.Index([item[0] for item in items], name='label'),
+                        columns=SIGNIFICANCE_COLUMNS)
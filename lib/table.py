@@ -0,0 +1,75 @@
+import numpy as np
+from markupsafe import escape
+
+# classes of report table
+TABLE_CLASS = 'table table-hover table-condensed table-responsive table-bordered'
+
+
+def format_value(value):
+    """Text of table cell.
+    """
+    if isinstance(value, (float, np.floating)):
+        return 'NaN' if np.isnan(value) else str(float(value))
+    return escape(value)
+
+
+def _attributes(attrs):
+    return ''.join(' %s="%s"' % (k, escape(v)) for k, v in attrs)
+
+
+def html_table(index, columns, plots=(), charts=False, row_id=None, table_class=TABLE_CLASS, table_id='data', index_name=''):
+    """Render HTML table by rows, without building whole table in memory.
+
+    Every data row is followed by hidden row with plots of label, it is shown
+    by click on data row (bootstrap collapse).
+
+    Keyword arguments:
+    index -- labels of rows.
+    columns -- list of (title, css class, values) tuples, values are array
+               of column values in order of index. Optional fourth item is
+               dict of extra attributes of column cells.
+    plots -- suffixes of plot file names of row, file of plot is
+             plots/<row id><suffix>.
+    charts -- show charts of row drawn by js/charts.js from data/<row id>.js
+              instead of plot files.
+    row_id -- function making id of row (and plot file name prefix) from label.
+    table_class -- classes of table element.
+    table_id -- id of table element.
+    index_name -- title of index column.
+
+    Yield HTML text chunks.
+    """
+    cells = []
+    for column in columns:
+        _, css, values = column[:3]
+        attrs = sorted(column[3].items()) if len(column) > 3 else []
+        cells.append(('<td class="%s"%s>' % (css, _attributes(attrs)), np.asarray(values).tolist()))
+
+    yield '<table border="1" class="%s" id="%s">\n' % (table_class, table_id)
+    yield '  <thead>\n    <tr style="text-align: right;">\n      <th>%s</th>\n' % escape(index_name)
+    for column in columns:
+        yield '      <th class="%s">%s</th>\n' % (column[1], escape(column[0]))
+    yield '    </tr>\n  </thead>\n  <tbody>\n'
+
+    colspan = len(columns) + 1
+    for i, label in enumerate(index):
+        expand = (plots or charts) and row_id is not None
+        if expand:
+            name = escape(row_id(label))
+            row = ['    <tr data-toggle="collapse" data-target="#%s" class="accordion-toggle">\n' % name]
+        else:
+            row = ['    <tr>\n']
+        row.append('      <th>%s</th>\n' % escape(label))
+        for td, values in cells:
+            row.append('      %s%s</td>\n' % (td, format_value(values[i])))
+        row.append('    </tr>\n')
+        if expand:
+            row.append('    <tr><td colspan="%d" class="hiddenRow nohover"><div id="%s" class="accordian-body collapse">' % (colspan, name))
+            if charts:
+                row.append('<div class="charts" data-key="%s" data-src="data/%s.js"></div>' % (name, name))
+            else:
+                row.extend('<img src="plots/%s%s"/>' % (name, suffix) for suffix in plots)
+            row.append('</div></td></tr>\n')
+        yield ''.join(row)
+
+    yield '  </tbody>\n</table>\n'
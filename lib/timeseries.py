@@ -0,0 +1,239 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# supported resolutions of time series, seconds
+RESOLUTIONS = (1, 10, 60)
+# relative error of windowed percentiles
+DEFAULT_ERROR = 0.05
+# windowed percentiles of latency
+PERCENTILES = (50, 90, 99)
+
+
+def success_mask(success):
+    """Boolean array of successful samples from JTL success column.
+    """
+    if pd.api.types.is_bool_dtype(success):
+        return np.asarray(success)
+    return np.asarray(pd.Series(success).astype(str).str.lower() == 'true')
+
+
+class TimeSeries(object):
+    """Incremental time series of test with fixed resolution.
+
+    Samples are binned by time into buckets of `resolution` seconds. For every
+    bucket and label number of samples is kept (for requests per second of
+    labels), for every bucket number of errors, sum of latency, maximum of
+    active threads and logarithmic histogram of latency (for windowed
+    percentiles). Memory depends on number of buckets and labels, not on
+    number of samples.
+
+    Arrays are allocated with spare buckets and labels and grow geometrically,
+    so adding samples of new buckets (e.g. in follow mode) does not copy the
+    whole series every time. count, errors, latency, threads and histogram
+    are views of the used part.
+    """
+
+    def __init__(self, resolution=1, error=DEFAULT_ERROR):
+        """Keyword arguments:
+        resolution -- bucket size in seconds.
+        error -- relative error of windowed percentiles.
+        """
+        self.resolution = resolution
+        self.error = error
+        self._log_gamma = math.log((1. + error) / (1. - error))
+        # number of latency histogram bins, last bin holds values above 1 hour
+        self.bins = int(math.ceil(math.log(3600 * 1000.) / self._log_gamma)) + 1
+        # label names in order of appearance
+        self.labels = []
+        self._index = {}
+        # number of first bucket since epoch, None if empty
+        self.start = None
+        # number of used buckets
+        self.size = 0
+        # allocated buckets x labels
+        self._count = np.zeros((0, 0), dtype=np.int64)
+        # allocated buckets
+        self._errors = np.zeros(0, dtype=np.int64)
+        self._latency = np.zeros(0)
+        self._threads = np.zeros(0, dtype=np.int64)
+        # allocated buckets x bins
+        self._histogram = np.zeros((0, self.bins), dtype=np.int64)
+
+    @property
+    def count(self):
+        """Number of samples, buckets x labels.
+        """
+        return self._count[:self.size, :len(self.labels)]
+
+    @property
+    def errors(self):
+        """Number of errors by bucket.
+        """
+        return self._errors[:self.size]
+
+    @property
+    def latency(self):
+        """Sum of latency by bucket.
+        """
+        return self._latency[:self.size]
+
+    @property
+    def threads(self):
+        """Maximum of active threads by bucket.
+        """
+        return self._threads[:self.size]
+
+    @property
+    def histogram(self):
+        """Histogram of latency, buckets x bins.
+        """
+        return self._histogram[:self.size]
+
+    def update(self, timestamps, labels, latency, success=None, threads=None):
+        """Add chunk of samples.
+
+        Keyword arguments:
+        timestamps -- times of samples, datetime64 (see lib.jtl.to_datetime).
+        labels -- labels of samples.
+        latency -- latencies of samples in msec.
+        success -- success flags of samples or None.
+        threads -- number of active threads (allThreads) or None.
+        """
+        if not len(timestamps):
+            return
+        buckets = np.asarray(timestamps, dtype='datetime64[ms]').astype(np.int64) // (self.resolution * 1000)
+        codes, uniques = pd.factorize(np.asarray(labels))
+        mapping = np.array([self._label(label) for label in uniques], dtype=np.int64)
+        codes = mapping[codes]
+        self._resize(buckets.min(), buckets.max())
+
+        # only buckets of chunk are updated
+        first = buckets.min() - self.start
+        b = buckets - self.start - first
+        n_buckets, n_labels = b.max() + 1, len(self.labels)
+        rows = slice(first, first + n_buckets)
+        flat = b * n_labels + codes
+        size = n_buckets * n_labels
+        latency = np.asarray(latency, dtype=np.float64)
+        self.count[rows] += np.bincount(flat, minlength=size).reshape(n_buckets, n_labels)
+        self.latency[rows] += np.bincount(b, weights=latency, minlength=n_buckets)
+        if success is not None:
+            failed = ~success_mask(success)
+            self.errors[rows] += np.bincount(b[failed], minlength=n_buckets)
+        if threads is not None:
+            np.maximum.at(self.threads, b + first, np.asarray(threads, dtype=np.int64))
+
+        keys = self._keys(latency)
+        self.histogram[rows] += np.bincount(b * self.bins + keys,
+                                            minlength=n_buckets * self.bins).reshape(n_buckets, self.bins)
+
+    def merge(self, other):
+        """Add time series of other file of the same test with the same resolution.
+        """
+        if other.resolution != self.resolution or other.error != self.error:
+            raise ValueError('Cannot merge time series with different resolution or error')
+        if other.start is None:
+            return
+        for label in other.labels:
+            self._label(label)
+        self._resize(other.start, other.start + other.size - 1)
+        rows = slice(other.start - self.start, other.start - self.start + other.size)
+        columns = [self._index[label] for label in other.labels]
+        self.count[rows, columns] += other.count
+        self.errors[rows] += other.errors
+        self.latency[rows] += other.latency
+        self.threads[rows] = np.maximum(self.threads[rows], other.threads)
+        self.histogram[rows] += other.histogram
+
+    def index(self):
+        """Start times of buckets as DatetimeIndex.
+        """
+        start = 0 if self.start is None else self.start
+        ms = (start + np.arange(self.size)) * self.resolution * 1000
+        return pd.DatetimeIndex(pd.to_datetime(ms, unit='ms'), name='time')
+
+    def percentiles(self, q=PERCENTILES):
+        """Windowed percentiles of latency of all labels, array buckets x len(q).
+        """
+        cum = np.cumsum(self.histogram, axis=1)
+        total = cum[:, -1:]
+        pos = np.asarray(q, dtype=np.float64) / 100. * np.maximum(total - 1, 0)
+        keys = (cum[:, None, :] <= pos[:, :, None]).sum(axis=2)
+        gamma = math.exp(self._log_gamma)
+        values = 2. * gamma ** keys / (gamma + 1.)
+        values[total[:, 0] == 0] = np.nan
+        return values
+
+    def frame(self):
+        """Data frame by bucket: tps (requests per second of wall time),
+        error rate in %, active threads, mean latency and windowed percentiles
+        of latency.
+        """
+        count = self.count.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = pd.DataFrame({'tps': count / float(self.resolution),
+                                   'errors': self.errors * 100. / count,
+                                   'threads': self.threads,
+                                   'mean': self.latency / count},
+                                  index=self.index(),
+                                  columns=['tps', 'errors', 'threads', 'mean'])
+        for q, values in zip(PERCENTILES, self.percentiles(PERCENTILES).T):
+            result['percentile%d' % q] = values
+        return result
+
+    def label_tps(self):
+        """Data frame of requests per second by bucket (rows) and label (columns).
+        """
+        return pd.DataFrame(self.count / float(self.resolution), index=self.index(),
+                            columns=pd.Index(self.labels, name='label'))
+
+    def _keys(self, latency):
+        """Histogram bin of every latency: bin 0 for values <= 1 msec, then
+        logarithmic bins.
+        """
+        with np.errstate(divide='ignore'):
+            keys = np.ceil(np.log(np.maximum(latency, 1.)) / self._log_gamma).astype(np.int64)
+        return np.clip(keys, 0, self.bins - 1)
+
+    def _label(self, label):
+        if label not in self._index:
+            self._index[label] = len(self.labels)
+            self.labels.append(label)
+        return self._index[label]
+
+    def _resize(self, first, last):
+        """Grow series to cover buckets from `first` to `last` and all labels.
+        Arrays are reallocated only if they have no room for them (or for
+        buckets before start), with at least double capacity.
+        """
+        if self.start is None:
+            self.start = first
+        start = min(self.start, first)
+        before = self.start - start
+        n_buckets = max(self.start + self.size, last + 1) - start
+        capacity, label_capacity = self._count.shape
+        if before or n_buckets > capacity or len(self.labels) > label_capacity:
+            if n_buckets > capacity:
+                capacity = max(n_buckets, 2 * capacity)
+            if len(self.labels) > label_capacity:
+                label_capacity = max(len(self.labels), 2 * label_capacity)
+            used = slice(before, before + self.size)
+
+            def grow(array, shape):
+                result = np.zeros(shape, dtype=array.dtype)
+                if array.ndim == 1:
+                    result[used] = array[:self.size]
+                else:
+                    columns = min(array.shape[1], shape[1])
+                    result[used, :columns] = array[:self.size, :columns]
+                return result
+
+            self._count = grow(self._count, (capacity, label_capacity))
+            self._errors = grow(self._errors, (capacity,))
+            self._latency = grow(self._latency, (capacity,))
+            self._threads = grow(self._threads, (capacity,))
+            self._histogram = grow(self._histogram, (capacity, self.bins))
+        self.start = start
+        self.size = n_buckets
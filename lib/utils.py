@@ -1,22 +1,40 @@
-import numpy as np
-
-
-def percentile60(x):
-    return np.percentile(x, 60)
-
-def percentile70(x):
-    return np.percentile(x, 70)
-
-def percentile80(x):
-    return np.percentile(x, 80)
-
-def percentile90(x):
-    return np.percentile(x, 90)
+from multiprocessing import Pool
 
+import numpy as np
 
-def trend(row):
-    if row[0] > row[1]:
-        return (row[0] / row[1]) * 100 - 100
-    else:
-        return -((row[1] / row[0]) * 100 - 100)
 
+def trends(base, values):
+    """Vectorized trend: arrays of base and new values to array of trends in %.
+    Positive trend means that new value is less than base value.
+    """
+    base = np.asarray(base, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base > values, base / values * 100 - 100, -(values / base * 100 - 100))
+
+
+def _call(task):
+    func, args = task
+    return func(*args)
+
+
+def parallel_map(func, args_list, jobs=1, initializer=None):
+    """Call func(*args) for every args of args_list in pool of `jobs` processes
+    and return list of results in the same order. Func must be defined at
+    module level. Calls are made in current process if jobs is 1.
+    """
+    return run_tasks([(func, args) for args in args_list], jobs, initializer)
+
+
+def run_tasks(tasks, jobs=1, initializer=None):
+    """Call func(*args) for every (func, args) task in pool of `jobs` processes,
+    as parallel_map, but every task can call other function.
+    """
+    if jobs > 1 and len(tasks) > 1:
+        pool = Pool(min(jobs, len(tasks)), initializer=initializer)
+        try:
+            return pool.map(_call, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    return [_call(task) for task in tasks]
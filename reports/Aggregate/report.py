@@ -1,297 +1,439 @@
 import datetime
-from mpl_toolkits.axes_grid1 import host_subplot
-import mpl_toolkits.axisartist as AA
-from matplotlib import rc
-import matplotlib.mlab as mlab
-import matplotlib.pyplot as plt
+import os
+import time
 import numpy as np
-import pandas
-from lxml import etree
-from mpltools import style
 
-from lib.basereport import BaseReport
-from lib.utils import percentile90
+from lib import charts, jtl, perfmon
+from lib.basereport import BaseReport, store_stats, update_series
+from lib.downsample import downsample
+from lib.aggregate import LabelStats, throughput
+from lib.density import Density
+from lib.follow import JtlTail
+from lib.plots import PlotTimer, density_plot
+from lib.quantiles import engine_factory
+from lib.runstore import series_frame, time_series
+from lib.samples import Samples, sorted_percentile
+from lib.table import html_table
+from lib.timeseries import TimeSeries
+
+
+# number of labels on requests per second plot
+TOP_LABELS = 10
+# latency series of response time over time plot: name, column of time series frame
+LATENCY_SERIES = [('mean', 'mean'), ('median', 'percentile50'), ('90% line', 'percentile90'),
+                  ('99% line', 'percentile99')]
+# colors of series of perfmon plots, shared by all axes
+PERFMON_COLORS = ['#E24A33', '#348ABD', '#988ED5', '#777777', '#FBC15E', '#8EBA42', '#FFB5B8']
 
 
 class AggregateReport(BaseReport):
     """Aggregate JMeter report.
-    Calculate Mean, Median, 90% Line, Max, Min and Throughput by label.
+    Calculate Mean, Median, 90% Line, Max, Min and Throughput by label,
+    errors, response codes, time breakdown and traffic by label.
     """
 
+    def __init__(self):
+        super(AggregateReport, self).__init__()
+        # errors, response codes, elapsed, connect time and bytes are collected
+        # in the same pass as latency statistics
+        self.details = True
+
+    def follow(self, file_paths, report_name, interval=10):
+        """Live report of running test: tail growing JTL files and regenerate
+        report every `interval` seconds until interrupted (Ctrl+C).
+
+        Only new lines of files are parsed and added to statistics by label
+        and time series, as in streaming mode, so cost of refresh depends on
+        amount of new data. Samples are not kept, so there are no plots of
+        latency by label (see _has_samples), only time series. Page of report
+        reloads itself every `interval` seconds.
+
+        Keyword arguments:
+        file_paths -- list of paths or glob patterns of JTL files, new files
+                      matching patterns are picked up on the fly.
+        report_name -- report name.
+        interval -- refresh interval in seconds.
+        """
+        # samples of previous read are dropped, report has no plots of them
+        self.store = None
+        self._release_samples()
+        self.stats = LabelStats(self._engine(), self.details)
+        self.series = TimeSeries(self.resolution) if self.resolution else None
+        self.refresh = interval
+        report_name = self._prepare_report_dir(report_name)
+        tails = {}
+        total = 0
+        try:
+            while True:
+                start = time.time()
+                new = 0
+                for path in jtl.expand_paths(file_paths):
+                    if path not in tails:
+                        tails[path] = JtlTail(path)
+                    for chunk in tails[path].read():
+                        self.stats.update(chunk['label'], chunk['Latency'], chunk)
+                        if self.series is not None and 'timeStamp' in chunk:
+                            update_series(self.series, chunk, jtl.to_datetime(chunk['timeStamp']))
+                        new += len(chunk)
+                if new:
+                    total += new
+                    self._write_report(report_name)
+                    print('%s: %d new samples, %d total' % (datetime.datetime.now().strftime('%H:%M:%S'), new, total))
+                time.sleep(max(0, interval - (time.time() - start)))
+        except KeyboardInterrupt:
+            # final report without page reload
+            self.refresh = None
+            self._write_report(report_name)
+            self._write_stats(report_name)
+
+    def save_run(self, run_id):
+        """Save summary of test (statistics by label with quantile sketch and
+        time series of all labels) into run store, see lib.runstore. Time
+        series has resolution of report, it is per second if time series of
+        report is disabled.
+
+        Keyword arguments:
+        run_id -- name of run, can be used instead of data file in Compare report.
+        """
+        stats = self.stats
+        if self.store is not None:
+            engine = self.quantile_engine if self.quantile_engine in ('histogram', 'sketch') else 'sketch'
+            stats = store_stats(self.store, engine_factory(engine, self.quantile_error))
+        # streaming mode keeps time series of report, not samples
+        series = self._time_series()
+        if series is not None:
+            self.run_store.save(run_id, stats, series_frame(series), series.resolution)
+        elif self.store is not None and 'timeStamp' in self.store:
+            self.run_store.save(run_id, stats, time_series(self.store))
+        else:
+            self.run_store.save(run_id, stats)
+
     def _generate_html_data(self):
-        if not hasattr(self, 'df') or self.df.empty:
+        if self.stats is None and (self.store is None or not len(self.store)):
             return ''
 
-        # group data by 'label' field. this data use in plot generation.
-        self._group_by_operation = self.df.groupby('label')
-        # calc statistic by operation: mean, median, 90% line
-        result = self._group_by_operation['Latency'].agg([np.mean, np.median, percentile90, np.min, np.max, np.std, np.sum])
-        size = self._group_by_operation.size()
-
-        # Calc throughput for every group
-        result['sum'] = result['sum'].astype(float)
-        for i in size.index:
-            result['sum'][i] = float(size[i]) / float(result['sum'][i]) * 1000
-
-        result = result.applymap(lambda x: round(x, 2))
-
-        # rename columns
-        result.rename(columns={'mean': 'Mean, msec',
-                               'median': 'Median, msec',
-                               'percentile90': '90% Line, msec',
-                               'amin': 'Min, msec',
-                               'amax': 'Max, msec',
-                               'sum': 'Throughput, req/sec',
-                               'std': 'StDev, msec'}, inplace=True)
-
-        xml = etree.XML(result.to_html())
-        xml.set('class', 'table table-hover table-condensed table-responsive table-bordered')
-        xml.set('id', 'data')
-
-        paths = {'mean': ['//table[@id="data"]/tbody/tr/td[1]', '//table[@id="data"]/thead/tr/th[2]'],
-                 'median': ['//table[@id="data"]/tbody/tr/td[2]', '//table[@id="data"]/thead/tr/th[3]'],
-                 '90line': ['//table[@id="data"]/tbody/tr/td[3]', '//table[@id="data"]/thead/tr/th[4]'],
-                 'min': ['//table[@id="data"]/tbody/tr/td[4]', '//table[@id="data"]/thead/tr/th[5]'],
-                 'max': ['//table[@id="data"]/tbody/tr/td[5]', '//table[@id="data"]/thead/tr/th[6]'],
-                 'std': ['//table[@id="data"]/tbody/tr/td[6]', '//table[@id="data"]/thead/tr/th[7]'],
-                 'throughput': ['//table[@id="data"]/tbody/tr/td[7]', '//table[@id="data"]/thead/tr/th[8]']}
-
-        for k in paths:
-            for path in paths[k]:
-                tags = xml.xpath(path)
-                for t in tags:
-                    t.set('class', k)
-
-        for t in xml.xpath('//table[@id="data"]/tbody/tr'):
-            req_name = self._normalize_test_name(t[0].text)
-            t.set('data-toggle', 'collapse')
-            t.set('data-target', '#' + req_name)
-            t.set('class', 'accordion-toggle')
-            t.addnext(etree.XML('<tr>' +
-                                '<td colspan="8" class="hiddenRow nohover">' +
-                                '<div id="' + req_name + '" class="accordian-body collapse">' +
-
-                                '<img src="plots/' + req_name + '_hist_prob_all.png"/>' +
-                                '<img src="plots/' + req_name + '_hist_prob_90line.png"/>' +
-                                '<img src="plots/' + req_name + '_requests.png"/>' +
-                                '<img src="plots/' + req_name + '_percentiles.png"/>' +
-
-                                '</div>' +
-                                '</td>' +
-                                '</tr>'))
-
-        return etree.tostring(xml)
+        # calc statistic by operation: mean, median, 90% line, min, max, stdev and throughput
+        with self._stage('statistics'):
+            result = self._label_stats(self.store, self.stats)
+            result['throughput'] = throughput(result)
+            result = result.round(2)
+
+        columns = [('Mean, msec', 'mean', result['mean'].values),
+                   ('Median, msec', 'median', result['median'].values),
+                   ('90% Line, msec', '90line', result['percentile90'].values),
+                   ('Min, msec', 'min', result['amin'].values),
+                   ('Max, msec', 'max', result['amax'].values),
+                   ('StDev, msec', 'std', result['std'].values),
+                   ('Throughput, req/sec', 'throughput', result['throughput'].values)]
+        with self._stage('details'):
+            details = self._details()
+        if details is not None:
+            details = details.details_frame().reindex(result.index).round(2)
+            columns += [('Errors', 'errors', details['errors'].values),
+                        ('Errors, %', 'errors', details['error_rate'].values),
+                        ('Elapsed, msec', 'elapsed', details['elapsed'].values),
+                        ('Connect, msec', 'breakdown', details['connect'].values),
+                        ('Server, msec', 'breakdown', details['server'].values),
+                        ('Download, msec', 'breakdown', details['download'].values),
+                        ('Traffic, KB/sec', 'traffic', (details['bytes_per_sec'] / 1024.).round(2).values)]
+        # rows of streaming mode have no plots
+        samples = self._has_samples()
+        return html_table(result.index, columns,
+                          plots=['_hist_prob_all.png', '_hist_prob_90line.png', '_requests.png', '_percentiles.png']
+                          if self.charts == 'png' and samples else (),
+                          charts=self.charts == 'json' and samples,
+                          row_id=self._normalize_test_name,
+                          index_name=result.index.name)
+
+    def _template_vars(self):
+        """Table of response codes by label.
+        """
+        details = self._details()
+        if details is None or not details.codes:
+            return {}
+        codes = details.codes_frame()
+        columns = [(code, 'code', codes[code].values) for code in codes.columns]
+        return {'codes_table': html_table(codes.index, columns, table_id='codes', index_name=codes.index.name)}
 
     def _generate_plots(self, report_name):
         """
 
         :param report_name:
         """
-        font = {'size': '8'}
-        #'family' : 'monospace',
-        #'weight' : 'bold',
-        rc('font', **font)
-        style.use('ggplot')
-
-        #if self.perfmon:
-        #     for (name, param) in self.perfmon.items():
-        #         with pandas.plot_params.use('x_compat', True):
-        #             plt.figure(figsize=(12, 8), dpi=150)
-        #
-        #             fig, host = plt.subplots()
-        #             #axes = [host] + [host.twinx() for i in xrange(0, len(param['input']) - 1)]
-        #             axes = [host, host]
-        #
-        #             for i in xrange(0, len(param['input'])):
-        #                 input_file = param['input'].keys()[i]
-        #                 input_param = param['input'][input_file]
-        #                 ax = axes[i]
-        #                 df = pandas.read_csv(input_file)
-        #
-        #                 if 'real-date' in input_param:
-        #                     df['timeStamp'] = df['timeStamp'].apply(lambda x: datetime.datetime.fromtimestamp(int(str(x)[:-3])).strftime('%Y-%m-%d %H:%M:%S'))
-        #                 else:
-        #                     start_time = datetime.datetime.fromtimestamp(int(str(df['timeStamp'][0])[:-3]))
-        #                     df['timeStamp'] = df['timeStamp'].apply(lambda x: str(datetime.datetime.fromtimestamp(int(str(x)[:-3])) - start_time))
-        #
-        #                 if 'group-by' in input_param:
-        #                     grp = df.groupby(input_param['group-by'])
-        #
-        #                     for g in grp:
-        #                         if g[0] in input_param['groups']:
-        #                             for column_name, column_param in input_param['columns'].items():
-        #                                 if not 'as_is' in column_param or not column_param['as_is']:
-        #                                     g[1][column_name] = g[1][column_name].apply(lambda x: float(x) / 1000)
-        #
-        #                                 c = g[1].set_index('timeStamp').unstack()[column_name]
-        #                                 c.plot(label=g[0], ax=ax)
-        #
-        #                 else:
-        #                     for column in input_param['columns']:
-        #                         c = df.set_index('timeStamp').unstack()[column]
-        #                         #c.plot(label=column, ax=ax)
-        #
-        #             #ax1 = plt.subplot(111)
-        #             # box = host.get_position()
-        #             # host.set_position([box.x0, box.y0, box.width * 0.8, box.height])
-        #             # host.legend(axes, loc='center left', bbox_to_anchor=(1, 0.5))
-        #
-        #             plt.xticks(rotation=70)
-        #             plt.xlabel('')
-        #             plt.ylabel('Metrics')
-        #
-        #             plt.tight_layout(rect=[0.02, 0, 0.8, 1])
-        #             plt.savefig('test.png')
-        #             plt.close()
-        #
-        # exit(0)
-
-        # i = 1
-        # for df in self.perfmon:
-        #     grp = df.groupby('label')
-        #     plt.figure(figsize=(12, 8), dpi=150)
-        #     ax = plt.subplot(111)
-        #
-        #     for g in grp:
-        #         elapsed = g[1].set_index('timeStamp').unstack()['elapsed']
-        #         elapsed.plot(label=g[0])
-        #
-        #     font_prop = FontProperties()
-        #     font_prop.set_size('small')
-        #
-        #     box = ax.get_position()
-        #     ax.set_position([box.x0, box.y0, box.width * 0.8, box.height])
-        #     ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), prop=font_prop)
-        #
-        #     plt.xticks(rotation=70)
-        #     for tick in ax.xaxis.get_major_ticks():
-        #         tick.label.set_fontsize(10)
-        #     plt.xlabel('')
-        #     plt.ylabel('Metrics')
-        #
-        #     plt.tight_layout(rect=[0.02, -0.02, 0.8, 1])
-        #     plt.savefig('results/' + report_name + '/plots/perfmon{0}.png'.format(i))
-        #     i += 1
-        #     plt.close()
-
-        l = self.df['Latency']
-        from scipy.stats import gaussian_kde
-
-        plt.figure(figsize=(8, 5), dpi=150)
-        l.hist(normed=True, alpha=0.2)
-        l.plot(kind='kde')
-        plt.fill(color='0.8')
-
-        #density = gaussian_kde(l)
-        #plt.plot(density)
-        #plt.fill(l.index, density(l.index), alpha=.5, zorder=5, antialiased=True, color="#E01B6A")
-        #plt.fill()
-        plt.xlabel('Response time', fontsize=9)
-        plt.ylabel('Probability', fontsize=9)
-        plt.title('Histogram of all response time', fontsize=10)
-        plt.tick_params(axis='both', which='major', labelsize=8)
-        plt.tick_params(axis='both', which='minor', labelsize=6)
-        plt.tight_layout()
-        plt.savefig('results/' + report_name + '/plots/hist_prob_all.png')
-        plt.close()
-
-        plt.figure(figsize=(8, 5), dpi=150)
-        l[l < np.percentile(l, 90)].hist(normed=True, alpha=0.2)
-        l[l < np.percentile(l, 90)].plot(kind='kde')
-        plt.xlabel('Response time', fontsize=9)
-        plt.ylabel('Probability', fontsize=9)
-        plt.title('Histogram of 90% line response time', fontsize=10)
-        plt.tick_params(axis='both', which='major', labelsize=8)
-        plt.tick_params(axis='both', which='minor', labelsize=6)
-        plt.tight_layout()
-        plt.savefig('results/' + report_name + '/plots/hist_prob_line90.png')
-        plt.close()
-
-        # percentile plot
-        d = np.sort(l).cumsum()
-        p = np.array([0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0, 100.0])
-        perc = mlab.prctile(d, p=p)
-        plt.figure(figsize=(8, 5), dpi=150)
-        plt.plot(d)
-        plt.plot((len(d) - 1) * p / 100., perc, 'r.')
-        plt.xticks((len(d) - 1) * p / 100., map(str, p))
-        plt.xlabel('Percentile', fontsize=9)
-        plt.ylabel('Response time', fontsize=9)
-        plt.title('Percentiles', fontsize=10)
-        plt.tick_params(axis='both', which='major', labelsize=8)
-        plt.tick_params(axis='both', which='minor', labelsize=6)
-        plt.tight_layout()
-        plt.savefig('results/' + report_name + '/plots/percentiles.png')
-        plt.close()
-
-        for label, data in self._group_by_operation:
-            file_name = self._normalize_test_name(label)
-            d = data['Latency']
-
-            # histogram of all response time
-            plt.figure(figsize=(6, 4))
-            d.hist(normed=True, alpha=0.2)
-            try:
-                d.plot(kind='kde')
-            except np.linalg.linalg.LinAlgError:
-                pass
-                # if singular matrix - no plot
-            except:
-                raise
-            plt.xlabel('Response time', fontsize=9)
-            plt.ylabel('Probability', fontsize=9)
-            plt.title('Histogram of all response time', fontsize=10)
-            plt.tick_params(axis='both', which='major', labelsize=8)
-            plt.tick_params(axis='both', which='minor', labelsize=6)
-            plt.tight_layout()
-            plt.savefig('results/' + report_name + '/plots/' + file_name + '_hist_prob_all.png')
-            plt.close()
-
-            # histogram of 90% line response time
-            plt.figure(figsize=(6, 4), dpi=150)
-            d[d < np.percentile(d, 90)].hist(normed=True, alpha=0.2)
-            try:
-                d[d < np.percentile(d, 90)].plot(kind='kde')
-            except np.linalg.linalg.LinAlgError:
-                pass
-                # if singular matrix - no plot
-            except:
-                raise
-            plt.xlabel('Response time', fontsize=9)
-            plt.ylabel('Probability', fontsize=9)
-            plt.title('Histogram of 90% line response time', fontsize=10)
-            plt.tick_params(axis='both', which='major', labelsize=8)
-            plt.tick_params(axis='both', which='minor', labelsize=6)
-            plt.tight_layout()
-            plt.savefig('results/' + report_name + '/plots/' + file_name + '_hist_prob_90line.png')
-            plt.close()
-
-            # scatterplot
-            plt.figure(figsize=(6, 4), dpi=150)
-            a = data['Latency']
-            plt.plot(range(1, len(a) + 1), a, 'ro', color='g', alpha=0.50)
-            plt.xlabel('Request', fontsize=9)
-            plt.ylabel('Response time', fontsize=9)
-            plt.title('Requests times', fontsize=10)
-            plt.tick_params(axis='both', which='major', labelsize=8)
-            plt.tick_params(axis='both', which='minor', labelsize=6)
-            plt.tight_layout()
-            plt.savefig('results/' + report_name + '/plots/' + file_name + '_requests.png')
-            plt.close()
-
-            # percentile plot
-            pd = np.sort(d).cumsum()
-            p = np.array([0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0, 100.0])
-            perc = mlab.prctile(pd, p=p)
-            plt.figure(figsize=(6, 4), dpi=150)
-            plt.plot(pd)
-            plt.plot((len(pd) - 1) * p / 100., perc, 'r.')
-            plt.xticks((len(pd) - 1) * p / 100., map(str, p))
-            plt.xlabel('Percentile', fontsize=9)
-            plt.ylabel('Response time', fontsize=9)
-            plt.title('Percentiles', fontsize=10)
-            plt.tick_params(axis='both', which='major', labelsize=8)
-            plt.tick_params(axis='both', which='minor', labelsize=6)
-            plt.tight_layout()
-            plt.savefig('results/' + report_name + '/plots/' + file_name + '_percentiles.png')
-            plt.close()
\ No newline at end of file
+        series = self._time_series()
+        if self.perfmon:
+            # server metrics are aligned to time buckets of test
+            index = series.index() if series is not None else None
+            self._render_plots([(plot_perfmon, ('results/' + report_name + '/plots/perfmon%d.png' % (i + 1), title,
+                                                params, self.resolution or 1, index))
+                                for i, (title, params) in enumerate(self.perfmon.items())], cached=False)
+
+        if series is not None:
+            frame, label_tps = series.frame(), series.label_tps()
+            if self.charts == 'json':
+                self._render_charts([(chart_timeseries, ('results/' + report_name + '/data/', frame, label_tps))])
+            else:
+                self._render_plots([(plot_timeseries, ('results/' + report_name + '/plots/', frame, label_tps))])
+
+        if self.store is None:
+            # streaming mode keeps no samples, nothing to plot
+            return
+
+        # samples sorted once are shared by statistics and all plots
+        views = self._sample_views()
+        samples = Samples.from_values(self.store['Latency'])
+        if self.charts == 'json':
+            path = 'results/' + report_name + '/data/'
+            tasks = [(chart_all, (path, samples))]
+            for label, label_samples in views.items():
+                tasks.append((chart_label, (path, self._normalize_test_name(label), label_samples)))
+            self._render_charts(tasks)
+            return
+
+        path = 'results/' + report_name + '/plots/'
+        tasks = [(plot_all, (path, samples))]
+        for label, label_samples in views.items():
+            tasks.append((plot_label, (path + self._normalize_test_name(label), label_samples)))
+        self._render_plots(tasks)
+
+
+def _top_labels(label_tps, top=TOP_LABELS):
+    """Columns of requests per second of labels with most requests.
+    """
+    return label_tps[label_tps.sum().sort_values(ascending=False).index[:top]]
+
+
+def plot_perfmon(path, title, params, resolution, index=None):
+    """Multi-axis plot of server metrics from perfmon config, one y axis for
+    every input file.
+
+    Keyword arguments:
+    path -- plot file path.
+    title -- plot title.
+    params -- plot config: 'input' dict of CSV path to input parameters (see
+              lib.perfmon.read_metrics, plus 'min-y' of axis and 'real-date'
+              for dates on time axis instead of seconds from start).
+    resolution -- bucket size in seconds.
+    index -- time buckets of test to align metrics to, None to keep own buckets.
+    """
+    import matplotlib.pyplot as plt
+
+    timer = PlotTimer()
+    inputs = []
+    for file_path, input_params in params['input'].items():
+        input_params = input_params or {}
+        metrics = perfmon.read_metrics(file_path, input_params, resolution)
+        if index is not None:
+            metrics = perfmon.align(metrics, index, resolution)
+        inputs.append((file_path, input_params, metrics))
+
+    real_date = any(p.get('real-date') for _, p, _ in inputs)
+    starts = [m.index[0] for _, _, m in inputs if len(m)]
+    start = min(starts) if starts else None
+
+    plt.figure(figsize=(12, 6), dpi=150)
+    host = plt.subplot(111)
+    lines = []
+    color = 0
+    for i, (file_path, input_params, metrics) in enumerate(inputs):
+        ax = host if i == 0 else host.twinx()
+        if i > 1:
+            ax.spines['right'].set_position(('axes', 1 + 0.1 * (i - 1)))
+        if real_date or start is None:
+            x = metrics.index
+        else:
+            x = (metrics.index - start).total_seconds()
+        for column in metrics.columns:
+            lines += ax.plot(x, metrics[column].values, label=column, color=PERFMON_COLORS[color % len(PERFMON_COLORS)])
+            color += 1
+        if 'min-y' in input_params:
+            ax.set_ylim(bottom=input_params['min-y'])
+        ax.set_ylabel(os.path.basename(file_path), fontsize=9)
+
+    host.legend(lines, [l.get_label() for l in lines], loc='upper left', fontsize=6)
+    host.set_xlabel('Time' if real_date else 'Time, sec', fontsize=9)
+    plt.title(title, fontsize=10)
+    plt.xticks(rotation=70)
+    timer.save(path)
+    return timer.timings
+
+
+def chart_timeseries(path, frame, label_tps):
+    """Chart data of requests per second, latency, errors and threads over time.
+    """
+    seconds = (frame.index - frame.index[0]).total_seconds().values if len(frame) else []
+    top = _top_labels(label_tps)
+    return charts.write_charts(path + '_timeseries.js', '_timeseries', [
+        charts.line_chart('Requests per second', 'Time, sec', 'Requests/sec',
+                          [('all', seconds, frame['tps'].values)] +
+                          [(label, seconds, top[label].values) for label in top.columns]),
+        charts.line_chart('Response time over time', 'Time, sec', 'Response time',
+                          [(name, seconds, frame[column].values) for name, column in LATENCY_SERIES]),
+        charts.line_chart('Errors', 'Time, sec', 'Errors, %', [('errors', seconds, frame['errors'].values)]),
+        charts.line_chart('Active threads', 'Time, sec', 'Threads', [('threads', seconds, frame['threads'].values)])])
+
+
+def plot_timeseries(path, frame, label_tps):
+    """Plots of requests per second, latency, errors and threads over time.
+    """
+    import matplotlib.pyplot as plt
+
+    timer = PlotTimer()
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    frame['tps'].plot(label='all', linewidth=1.5)
+    top = _top_labels(label_tps)
+    for label in top.columns:
+        top[label].plot(label=label, linewidth=0.8, alpha=0.7)
+    plt.legend(fontsize=6)
+    plt.xlabel('Time', fontsize=9)
+    plt.ylabel('Requests/sec', fontsize=9)
+    plt.title('Requests per second', fontsize=10)
+    timer.save(path + 'tps.png')
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    for name, column in LATENCY_SERIES:
+        frame[column].plot(label=name)
+    plt.legend(fontsize=6)
+    plt.xlabel('Time', fontsize=9)
+    plt.ylabel('Response time', fontsize=9)
+    plt.title('Response time over time', fontsize=10)
+    timer.save(path + 'latency_over_time.png')
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    frame['errors'].fillna(0).plot(color='r')
+    plt.xlabel('Time', fontsize=9)
+    plt.ylabel('Errors, %', fontsize=9)
+    plt.title('Errors', fontsize=10)
+    timer.save(path + 'errors.png')
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    frame['threads'].plot()
+    plt.xlabel('Time', fontsize=9)
+    plt.ylabel('Threads', fontsize=9)
+    plt.title('Active threads', fontsize=10)
+    timer.save(path + 'threads.png')
+    return timer.timings
+
+
+def chart_all(path, samples):
+    """Chart data of histograms and percentiles of all response times
+    (lib.samples.Samples).
+    """
+    return charts.write_charts(path + '_all.js', '_all',
+                               [charts.histogram_chart('Histogram of all response time', [('all', samples.sorted)]),
+                                charts.histogram_chart('Histogram of 90% line response time',
+                                                       [('90% line', samples.below(90))]),
+                                charts.percentiles_chart('Percentiles', [('all', samples.sorted)], is_sorted=True)])
+
+
+def chart_label(path, name, samples):
+    """Chart data of histograms, requests times and percentiles of one label.
+    """
+    return charts.write_charts(path + name + '.js', name,
+                               [charts.histogram_chart('Histogram of all response time', [(name, samples.sorted)]),
+                                charts.histogram_chart('Histogram of 90% line response time',
+                                                       [(name, samples.below(90))]),
+                                charts.scatter_chart('Requests time', [(name, samples.values())]),
+                                charts.percentiles_chart('Percentiles', [(name, samples.sorted)], is_sorted=True)])
+
+
+def plot_all(path, samples):
+    """Histograms and percentiles of all response times (lib.samples.Samples).
+    """
+    import matplotlib.pyplot as plt
+
+    timer = PlotTimer()
+    density = Density(samples.sorted, is_sorted=True)
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    density_plot(density)
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of all response time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + 'hist_prob_all.png')
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    density_plot(density, upper=density.p90)
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of 90% line response time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + 'hist_prob_line90.png')
+
+    # percentile plot
+    d = samples.sorted.cumsum()
+    p = np.array([0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0, 100.0])
+    perc = sorted_percentile(d, p)
+    plt.figure(figsize=(8, 5), dpi=150)
+    plt.plot(d)
+    plt.plot((len(d) - 1) * p / 100., perc, 'r.')
+    plt.xticks((len(d) - 1) * p / 100., [str(x) for x in p])
+    plt.xlabel('Percentile', fontsize=9)
+    plt.ylabel('Response time', fontsize=9)
+    plt.title('Percentiles', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + 'percentiles.png')
+    return timer.timings
+
+
+def plot_label(path, samples):
+    """Histograms, requests times and percentiles of response times of one
+    label (lib.samples.Samples).
+    """
+    import matplotlib.pyplot as plt
+
+    timer = PlotTimer()
+    # one binned density for both histograms
+    density = Density(samples.sorted, is_sorted=True)
+
+    # histogram of all response time
+    plt.figure(figsize=(6, 4))
+    density_plot(density)
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of all response time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_hist_prob_all.png')
+
+    # histogram of 90% line response time
+    plt.figure(figsize=(6, 4), dpi=150)
+    density_plot(density, upper=density.p90)
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of 90% line response time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_hist_prob_90line.png')
+
+    # scatterplot
+    plt.figure(figsize=(6, 4), dpi=150)
+    x, a = downsample(np.arange(1, len(samples) + 1), samples.values())
+    plt.plot(x, a, 'ro', color='g', alpha=0.50)
+    plt.xlabel('Request', fontsize=9)
+    plt.ylabel('Response time', fontsize=9)
+    plt.title('Requests times', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_requests.png')
+
+    # percentile plot
+    pd = samples.sorted.cumsum()
+    p = np.array([0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0, 100.0])
+    perc = sorted_percentile(pd, p)
+    plt.figure(figsize=(6, 4), dpi=150)
+    plt.plot(pd)
+    plt.plot((len(pd) - 1) * p / 100., perc, 'r.')
+    plt.xticks((len(pd) - 1) * p / 100., [str(x) for x in p])
+    plt.xlabel('Percentile', fontsize=9)
+    plt.ylabel('Response time', fontsize=9)
+    plt.title('Percentiles', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_percentiles.png')
+    return timer.timings
@@ -1,325 +1,373 @@
-import math
+import os
+
 import numpy as np
-import pandas as pd
-from lxml import etree
 
-from lib.basereport import BaseReport
-from lib.utils import percentile90, trend
-import matplotlib.pyplot as plt
-import pylab as pl
-from matplotlib import rc
-from mpltools import style
+from lib import charts, jtl
+from lib.basereport import BaseReport, read_files, store_durations, store_stats, store_views
+from lib.downsample import downsample
+from lib.aggregate import throughput
+from lib.density import Density
+from lib.plots import PlotTimer, density_plot
+from lib.samples import Samples
+from lib.significance import DEFAULT_ALPHA, significance, sketch_summary, summary
+from lib.table import html_table
+from lib.utils import parallel_map, trends
+
+# compared columns: statistic, title, css class, unit, calc trend
+COLUMNS = [('mean', 'Mean', 'mean', 'msec', True),
+           ('median', 'Median', 'median', 'msec', True),
+           ('percentile90', '90% Line', 'line90', 'msec', True),
+           ('amin', 'Min', 'min', 'msec', False),
+           ('amax', 'Max', 'max', 'msec', False),
+           ('throughput', 'Throughput', 'throughput', 'req/sec', False)]
+
+# plot colors of runs
+COLORS = ['g', 'b', 'r', 'c', 'm', 'y', 'k']
+
+
+def read_run(file_paths, chunksize, engine, exact, cache):
+    """Read files of one test run.
+
+    Keyword arguments:
+    file_paths -- list of paths to JTL files of run.
+    chunksize -- number of rows in chunk in streaming mode, None to keep samples.
+    engine -- function creating quantile engine, see lib.quantiles.
+    exact -- calculate exact percentiles from samples instead of quantile engine.
+    cache -- cache of parsed files (lib.cache.JtlCache) or None.
+
+    Return tuple of samples (lib.samplestore.SampleStore, None in streaming
+    mode), data frame of statistics by label, summaries of samples by label
+    (see run_summaries) and samples by label sorted once
+    (lib.samples.SampleViews, None in streaming mode), which are used by
+    statistics, summaries and plots.
+    """
+    store, stats, _, _ = read_files(file_paths, chunksize, engine, cache)
+    if stats is None and not exact:
+        stats = store_stats(store, engine)
+    if stats is not None and store is None:
+        return store, stats.frame(), run_summaries(stats), None
+    views = store_views(store)
+    summaries = dict((label, (summary(samples.sorted, is_sorted=True), len(samples)))
+                     for label, samples in views.items())
+    return store, stats.frame() if stats is not None else views.frame(store_durations(store)), summaries, views
+
+
+def run_summaries(stats):
+    """Summaries of response times by label from quantile engines of
+    LabelStats, see lib.significance: dict of label to tuple of summary and
+    number of samples.
+    """
+    return dict((label, (sketch_summary(engine, count), count))
+                for label, engine, count in zip(stats.labels, stats.quantiles, stats.count) if count)
 
 
 class CompareReport(BaseReport):
     """Compare JMeter report.
-    Compare Mean, Median, 90% Line, Max, Min and Throughput by label.
+    Compare Mean, Median, 90% Line, Max, Min and Throughput by label for two
+    or more test runs with trends and significance of differences against
+    baseline run.
     """
 
-    def read_csv(self, file_paths):
-        self.df1 = pd.read_csv(file_paths[0])
-        self.df2 = pd.read_csv(file_paths[1])
+    def __init__(self):
+        super(CompareReport, self).__init__()
+        # names of runs
+        self.run_names = []
+        # samples of runs (lib.samplestore.SampleStore), None in streaming mode
+        self.stores = []
+        # data frames of statistics by label of runs
+        self.run_stats = []
+        # index of baseline run
+        self.baseline = 0
+        # summaries of response times by label of runs for significance tests
+        self.run_summaries = []
+        # samples by label of runs sorted once (lib.samples.SampleViews), None
+        # for runs without samples
+        self.run_views = []
+        # significance level of differences against baseline, None to skip tests
+        self.alpha = DEFAULT_ALPHA
+
+    def read_csv(self, file_paths, chunksize=None):
+        """Read test runs in self.jobs processes.
+
+        Keyword arguments:
+        file_paths -- list of paths or glob patterns of JTL files, one for every
+                      run. Pattern can match several files of distributed run.
+                      Id of run saved in run store (see lib.runstore) can be
+                      used instead of path, then statistics of run are loaded
+                      from store and raw data is not read.
+        chunksize -- read files by chunks of this number of rows and keep only
+                     statistics by label instead of whole data frame.
+        """
+        exact = not chunksize and self.quantile_engine in (None, 'exact')
+        runs = [None] * len(file_paths)
+        args = []
+        with self._stage('read_csv'):
+            for i, p in enumerate(file_paths):
+                paths = jtl.expand_paths([p])
+                if not any(os.path.exists(f) for f in paths) and self.run_store.exists(p):
+                    stats, _ = self.run_store.load(p)
+                    runs[i] = (None, stats.frame(), run_summaries(stats), None)
+                else:
+                    args.append((i, (paths, chunksize, self._engine(), exact, self.cache)))
+
+            for (i, _), run in zip(args, parallel_map(read_run, [a for _, a in args], self.jobs)):
+                runs[i] = run
+
+        self.run_names = [str(i + 1) for i in range(len(runs))]
+        self.stores = [store for store, _, _, _ in runs]
+        self.run_stats = [stats for _, stats, _, _ in runs]
+        self.run_summaries = [summaries for _, _, summaries, _ in runs]
+        self.run_views = [views for _, _, _, views in runs]
+        if self.instrumentation is not None:
+            self.instrumentation.count('runs', len(runs))
+            self.instrumentation.count('rows', int(sum(stats['count'].sum() for stats in self.run_stats)))
+
+    def set_baseline(self, index):
+        """Set index of baseline run, trends of other runs are calculated against it.
+        """
+        self.baseline = index
+
+    def set_significance(self, alpha):
+        """Set significance level of differences against baseline run
+        (Mann-Whitney U test and bootstrap confidence intervals of median and
+        90% line difference, see lib.significance), None to skip tests.
+        """
+        if alpha is not None and not 0 < alpha < 1:
+            raise ValueError('Significance level must be between 0 and 1, got %s' % alpha)
+        self.alpha = alpha
+
+    def _significance(self, index):
+        """Significance of differences of every run against baseline run:
+        list of data frames indexed by `index` (None for baseline run).
+        """
+        base = self.run_summaries[self.baseline]
+        result = []
+        for i, summaries in enumerate(self.run_summaries):
+            if i == self.baseline:
+                result.append(None)
+                continue
+            items = [(label, base[label][0], base[label][1], summaries[label][0], summaries[label][1])
+                     for label in index if label in base and label in summaries]
+            result.append(significance(items, alpha=self.alpha, jobs=self.jobs).reindex(index))
+        return result
 
     def _generate_html_data(self):
-        if not hasattr(self, 'df1') or self.df1.empty:
-            return ''
-        if not hasattr(self, 'df2') or self.df2.empty:
+        if len(self.run_stats) < 2 or any(stats.empty for stats in self.run_stats):
             return ''
-
-        # Calc aggregate report for first data frame
-        group_by_operation = self.df1.groupby('label')
-        result_df1 = group_by_operation['Latency'].agg([np.mean, np.median, percentile90, np.min, np.max, np.sum])
-        size = group_by_operation.size()
-
-        result_df1['sum'] = result_df1['sum'].astype(float)
-        for i in size.index:
-            result_df1['sum'][i] = float(size[i]) / float(result_df1['sum'][i]) * 1000
-
-        result_df1.rename(columns={'mean': 'Mean 1, msec',
-                                   'median': 'Median 1, msec',
-                                   'percentile90': '90% Line 1, msec',
-                                   'amin': 'Min 1, msec',
-                                   'amax': 'Max 1, msec',
-                                   'sum': 'Throughput 1, req/sec'}, inplace=True)
-
-        # Calc aggregate report for second data frame
-        group_by_operation = self.df2.groupby('label')
-        result_df2 = group_by_operation['Latency'].agg([np.mean, np.median, percentile90, np.min, np.max, np.sum])
-        size = group_by_operation.size()
-
-        result_df2['sum'] = result_df2['sum'].astype(float)
-        for i in size.index:
-            result_df2['sum'][i] = float(size[i]) / float(result_df2['sum'][i]) * 1000
-
-        result_df2.rename(columns={'mean': 'Mean 2, msec',
-                                   'median': 'Median 2, msec',
-                                   'percentile90': '90% Line 2, msec',
-                                   'amin': 'Min 2, msec',
-                                   'amax': 'Max 2, msec',
-                                   'sum': 'Throughput 2, req/sec'}, inplace=True)
-
-        result = result_df1.join(result_df2, how='outer')
-
-        # calc trend for mean, median, 90% line
-        result['Mean trend, %'] = result[['Mean 1, msec', 'Mean 2, msec']].apply(trend, axis=1)
-        result['Median trend, %'] = result[['Median 1, msec', 'Median 2, msec']].apply(trend, axis=1)
-        result['90% Line trend, %'] = result[['90% Line 1, msec', '90% Line 2, msec']].apply(trend, axis=1)
-
-        # reorder columns
-        result = result.applymap(lambda x: round(x, 2))
-        result = result[['Mean 1, msec', 'Mean 2, msec', 'Mean trend, %',
-                         'Median 1, msec', 'Median 2, msec', 'Median trend, %',
-                         '90% Line 1, msec', '90% Line 2, msec', '90% Line trend, %',
-                         'Min 1, msec', 'Min 2, msec',
-                         'Max 1, msec', 'Max 2, msec',
-                         'Throughput 1, req/sec', 'Throughput 2, req/sec']]
-
-        # generate html table, parse and add bootstrap classes
-        xml = etree.XML(result.to_html())
-        xml.set('class', 'table table-hover table-striped table-condensed table-responsive table-bordered')
-        xml.set('id', 'data')
-
-        # add classes for columns, for fast select in jquery
-        paths = {'mean1': ['//table[@id="data"]/tbody/tr/td[1]', '//table[@id="data"]/thead/tr/th[2]'],
-                 'mean2': ['//table[@id="data"]/tbody/tr/td[2]', '//table[@id="data"]/thead/tr/th[3]'],
-                 'mean_trend': ['//table[@id="data"]/tbody/tr/td[3]', '//table[@id="data"]/thead/tr/th[4]'],
-                 'median1': ['//table[@id="data"]/tbody/tr/td[4]', '//table[@id="data"]/thead/tr/th[5]'],
-                 'median2': ['//table[@id="data"]/tbody/tr/td[5]', '//table[@id="data"]/thead/tr/th[6]'],
-                 'median_trend': ['//table[@id="data"]/tbody/tr/td[6]', '//table[@id="data"]/thead/tr/th[7]'],
-                 'line901': ['//table[@id="data"]/tbody/tr/td[7]', '//table[@id="data"]/thead/tr/th[8]'],
-                 'line902': ['//table[@id="data"]/tbody/tr/td[8]', '//table[@id="data"]/thead/tr/th[9]'],
-                 'line90_trend': ['//table[@id="data"]/tbody/tr/td[9]', '//table[@id="data"]/thead/tr/th[10]'],
-                 'min1': ['//table[@id="data"]/tbody/tr/td[10]', '//table[@id="data"]/thead/tr/th[11]'],
-                 'min2': ['//table[@id="data"]/tbody/tr/td[11]', '//table[@id="data"]/thead/tr/th[12]'],
-                 'max1': ['//table[@id="data"]/tbody/tr/td[12]', '//table[@id="data"]/thead/tr/th[13]'],
-                 'max2': ['//table[@id="data"]/tbody/tr/td[13]', '//table[@id="data"]/thead/tr/th[14]'],
-                 'throughput1': ['//table[@id="data"]/tbody/tr/td[14]', '//table[@id="data"]/thead/tr/th[15]'],
-                 'throughput2': ['//table[@id="data"]/tbody/tr/td[15]', '//table[@id="data"]/thead/tr/th[16]']}
-
-        for k in paths:
-            for path in paths[k]:
-                tags = xml.xpath(path)
-                for t in tags:
-                    t.set('class', k)
-
-        for t in xml.xpath('//table[@id="data"]/tbody/tr'):
-            req_name = self._normalize_test_name(t[0].text)
-            t.set('data-toggle', 'collapse')
-            t.set('data-target', '#' + req_name)
-            t.set('class', 'accordion-toggle')
-            t.addnext(etree.XML('<tr>'
-                                    '<td colspan="10" class="hiddenRow nohover">'
-                                        '<div id="' + req_name + '" class="accordian-body collapse">'
-                                            '<img src="plots/' + req_name + '_hist_prob_all.png"/>'
-                                            '<img src="plots/' + req_name + '_hist_prob_90line.png"/>'
-                                            '<img src="plots/' + req_name + '_requests.png"/>'
-                                        '</div>'
-                                    '</td>'
-                                 '</tr>'))
-
-        return etree.tostring(xml)
+        if not 0 <= self.baseline < len(self.run_stats):
+            raise ValueError('Baseline run %d is out of range 1..%d' % (self.baseline + 1, len(self.run_stats)))
+
+        runs = [stats.assign(throughput=throughput(stats)) for stats in self.run_stats]
+        index = runs[0].index
+        for stats in runs[1:]:
+            index = index.union(stats.index)
+        runs = [stats.reindex(index) for stats in runs]
+        base = runs[self.baseline]
+
+        # columns of table: value of every run, then trend of every run against baseline
+        columns = []
+        for key, title, css, unit, with_trend in COLUMNS:
+            for name, stats in zip(self.run_names, runs):
+                columns.append(('%s %s, %s' % (title, name, unit), '%s %s%s' % (css, css, name),
+                                stats[key].round(2).values))
+            if with_trend:
+                for i, (name, stats) in enumerate(zip(self.run_names, runs)):
+                    if i == self.baseline:
+                        continue
+                    # value cell of the same run is colored with trend
+                    columns.append(('%s trend %s, %%' % (title, name), '%s trend %s_trend%s' % (css, css, name),
+                                    np.round(trends(base[key].values, stats[key].values), 2),
+                                    {'data-run': '%s%s' % (css, name)}))
+
+        # significance of differences against baseline
+        if self.alpha is not None:
+            with self._stage('significance'):
+                tests = self._significance(index)
+            for name, sig in zip(self.run_names, tests):
+                if sig is None:
+                    continue
+                columns += [('Difference %s' % name, 'significance verdict', sig['verdict'].values),
+                            ('p-value %s' % name, 'significance', sig['p_value'].round(4).values),
+                            ('Median diff %s, msec' % name, 'significance',
+                             _intervals(sig['median_low'].values, sig['median_high'].values)),
+                            ('90%% Line diff %s, msec' % name, 'significance',
+                             _intervals(sig['line90_low'].values, sig['line90_high'].values))]
+
+        # runs without samples are not plotted
+        samples = self._has_samples()
+        return html_table(index, columns,
+                          plots=['_hist_prob_all.png', '_hist_prob_90line.png', '_requests.png']
+                          if self.charts == 'png' and samples else (),
+                          charts=self.charts == 'json' and samples,
+                          row_id=self._normalize_test_name,
+                          table_class='table table-hover table-striped table-condensed table-responsive table-bordered',
+                          index_name=index.name)
+
+    def _has_samples(self):
+        return any(store is not None for store in self.stores)
+
+    def _release_samples(self):
+        super(CompareReport, self)._release_samples()
+        self.run_views = [None] * len(self.run_views)
 
     def _generate_plots(self, report_name):
         """
 
         :param report_name:
         """
-        font = {'size': '8'}
-        #'family' : 'monospace',
-        #'weight' : 'bold',
-        rc('font', **font)
-        style.use('ggplot')
-
-        l1 = self.df1['Latency']
-        l2 = self.df2['Latency']
-
-        plt.figure(figsize=(8, 5), dpi=150)
-        plt.hist(l1,
-                 bins=math.pow(len(l1), float(1) / 3),
-                 normed=True,
-                 color=['g'],
-                 fill=True,
-                 alpha=0.40,
-                 histtype='step',
-                 label='1')
-        plt.hist(l2,
-                 bins=math.pow(len(l1), float(1) / 3),
-                 normed=True,
-                 color=['g'],
-                 fill=True,
-                 alpha=0.40,
-                 histtype='step',
-                 label='2')
-        plt.tick_params(axis='both', which='major', labelsize=8)
-        plt.tick_params(axis='both', which='minor', labelsize=6)
-        plt.legend()
-        plt.xlabel('Response time', fontsize=9)
-        plt.ylabel('Probability', fontsize=9)
-        plt.title('Histogram of all response time', fontsize=10)
-        plt.tight_layout()
-        plt.savefig('results/' + report_name + '/plots/hist_prob_all.png')
-        plt.close()
-
-        plt.figure(figsize=(8, 5), dpi=150)
-        l1_90 = l1[l1 < np.percentile(l1, 90)].reset_index(drop=True)
-        l2_90 = l2[l2 < np.percentile(l2, 90)].reset_index(drop=True)
-        plt.hist(l1_90,
-                 bins=math.pow(len(l1_90), float(1) / 3),
-                 normed=True,
-                 color=['g'],
-                 fill=True,
-                 alpha=0.40,
-                 histtype='step',
-                 label='1')
-        plt.hist(l2_90,
-                 bins=math.pow(len(l2_90), float(1) / 3),
-                 normed=True,
-                 color=['g'],
-                 fill=True,
-                 alpha=0.40,
-                 histtype='step',
-                 label='2')
-        plt.tick_params(axis='both', which='major', labelsize=8)
-        plt.tick_params(axis='both', which='minor', labelsize=6)
-        plt.legend()
-        plt.xlabel('Response time', fontsize=9)
-        plt.ylabel('Probability', fontsize=9)
-        plt.title('Histogram of 90% line response time', fontsize=10)
-        plt.tight_layout()
-        plt.savefig('results/' + report_name + '/plots/hist_prob_90line.png')
-        plt.close()
+        # runs without samples (streaming mode, stored runs) are not plotted
+        # samples released after previous report are sorted again
+        runs = [(store, views if views is not None else store_views(store), name)
+                for store, views, name in zip(self.stores, self.run_views, self.run_names) if store is not None]
+        if not runs:
+            return
+        stores, groups, names = zip(*runs)
+        # samples of labels were sorted once when runs were read
+        totals = [Samples.from_values(store['Latency']) for store in stores]
+
+        labels = set()
+        for views in groups:
+            labels.update(views.labels)
+        labels = sorted(labels)
+
+        if self.charts == 'json':
+            path = 'results/' + report_name + '/data/'
+            tasks = [(chart_all, (path, totals, names))]
+            for label in labels:
+                tasks.append((chart_label, (path, self._normalize_test_name(label), [g.get(label) for g in groups], names)))
+            self._render_charts(tasks)
+            return
+
+        path = 'results/' + report_name + '/plots/'
+        tasks = [(plot_all, (path, totals, names))]
 
         # generate compare plots for tests
-        # this code is ugly
-        x1 = self.df1.loc[:, ['label', 'Latency']]
-        x1 = x1.groupby('label')
-        x1m = x1['Latency'].agg([np.mean, np.std])
-
-        x2 = self.df2.loc[:, ['label', 'Latency']]
-        x2 = x2.groupby('label')
-        x2m = x2['Latency'].agg([np.mean, np.std])
-
-        df = x1m.join(x2m, how='outer', lsuffix='1', rsuffix='2')
-        for label, data in df.iterrows():
-            file_name = self._normalize_test_name(label)
-            if not pd.isnull(data['mean1']):
-                d1 = x1.get_group(label)['Latency']
-            if not pd.isnull(data['mean2']):
-                d2 = x2.get_group(label)['Latency']
-
-            if not pd.isnull(data['mean1']) or not pd.isnull(data['mean2']):
-                plt.figure(figsize=(6, 4))
-                if not pd.isnull(data['mean1']):
-                    d1.hist(normed=True, alpha=0.2, label='1')
-                    d1.plot(kind='kde', label='1')
-
-                if not pd.isnull(data['mean2']):
-                    d2.hist(normed=True, alpha=0.2, label='2')
-                    d2.plot(kind='kde', label='2')
-
-                # if not pd.isnull(data['mean1']) and not pd.isnull(data['mean2']):
-                #     l = len(d1) if len(d1) > len(d2) else len(d2)
-                #     n, bins, patches = plt.hist([d1, d2],
-                #                                 bins=math.pow(l, float(1) / 3),
-                #                                 normed=1,
-                #                                 alpha=0.60,
-                #                                 label=['1', '2'],
-                #                                 color=['g', 'b'])
-                #     #plt.plot(bins, pl.normpdf(bins, np.mean(d1), np.std(d1)), 'r--', color='g', label='norm1', linewidth=2)
-                #     #plt.plot(bins, pl.normpdf(bins, np.mean(d2), np.std(d2)), 'r--', color='b', label='norm2', linewidth=2)
-                # elif not pd.isnull(data['mean1']):
-                #     n, bins, patches = plt.hist(d1,
-                #                                 bins=math.pow(len(d1), float(1) / 3),
-                #                                 normed=1,
-                #                                 alpha=0.60,
-                #                                 label='1',
-                #                                 color='g')
-                #     plt.plot(bins, pl.normpdf(bins, np.mean(d1), np.std(d1)), 'r--', color='g', label='norm1', linewidth=2)
-                # elif not pd.isnull(data['mean2']):
-                #     n, bins, patches = plt.hist(d2,
-                #                                 bins=math.pow(len(d2), float(1) / 3),
-                #                                 normed=1,
-                #                                 alpha=0.60,
-                #                                 label='2',
-                #                                 color='b')
-                #     plt.plot(bins, pl.normpdf(bins, np.mean(d2), np.std(d2)), 'r--', color='g', label='norm2', linewidth=2)
-                plt.legend()
-                plt.xlabel('Response time', fontsize=9)
-                plt.ylabel('Probability', fontsize=9)
-                plt.title('Histogram of all response time', fontsize=10)
-                plt.tick_params(axis='both', which='major', labelsize=8)
-                plt.tick_params(axis='both', which='minor', labelsize=6)
-                plt.tight_layout()
-                plt.savefig('results/' + report_name + '/plots/' + file_name + '_hist_prob_all.png')
-                plt.close()
-
-                plt.figure(figsize=(6, 4))
-                if not pd.isnull(data['mean1']):
-                    d1[d1 < np.percentile(d1, 90)].hist(normed=True, alpha=0.2, label='1')
-                    try:
-                        d1[d1 < np.percentile(d1, 90)].plot(kind='kde', label='1')
-                    except np.linalg.linalg.LinAlgError:
-                        pass
-                        # if singular matrix - no plot
-                    except:
-                        raise
-
-                if not pd.isnull(data['mean2']):
-                    d2[d2 < np.percentile(d2, 90)].hist(normed=True, alpha=0.2, label='2')
-                    try:
-                        d2[d2 < np.percentile(d2, 90)].plot(kind='kde', label='2')
-                    except np.linalg.linalg.LinAlgError:
-                        pass
-                        # if singular matrix - no plot
-                    except:
-                        raise
-                # if not pd.isnull(data['mean1']) and not pd.isnull(data['mean2']):
-                #     l = len(d1) if len(d1) > len(d2) else len(d2)
-                #     n, bins, patches = plt.hist([d1[d1 < np.percentile(d1, 90)], d2[d2 < np.percentile(d2, 90)]],
-                #                                 bins=math.pow(l, float(1) / 3),
-                #                                 normed=1,
-                #                                 alpha=0.60,
-                #                                 label=['1', '2'],
-                #                                 color=['g', 'b'])
-                #     plt.plot(bins, pl.normpdf(bins, np.mean(d1[d1 < np.percentile(d1, 90)]), np.std(d1[d1 < np.percentile(d1, 90)])), 'r--', color='g', label='norm1', linewidth=2)
-                #     plt.plot(bins, pl.normpdf(bins, np.mean(d2[d2 < np.percentile(d2, 90)]), np.std(d2[d2 < np.percentile(d2, 90)])), 'r--', color='b', label='norm2', linewidth=2)
-                # elif not pd.isnull(data['mean1']):
-                #     n, bins, patches = plt.hist(d1[d1 < np.percentile(d1, 90)],
-                #                                 bins=math.pow(len(d1[d1 < np.percentile(d1, 90)]), float(1) / 3),
-                #                                 normed=1,
-                #                                 alpha=0.60,
-                #                                 label='1',
-                #                                 color='g')
-                #     plt.plot(bins, pl.normpdf(bins, np.mean(d1[d1 < np.percentile(d1, 90)]), np.std(d1[d1 < np.percentile(d1, 90)])), 'r--', color='g', label='norm1', linewidth=2)
-                # elif not pd.isnull(data['mean2']):
-                #     n, bins, patches = plt.hist(d2[d2 < np.percentile(d2, 90)],
-                #                                 bins=math.pow(len(d2[d2 < np.percentile(d2, 90)]), float(1) / 3),
-                #                                 normed=1,
-                #                                 alpha=0.60,
-                #                                 label='2',
-                #                                 color='b')
-                #     plt.plot(bins, pl.normpdf(bins, np.mean(d2[d2 < np.percentile(d2, 90)]), np.std(d2[d2 < np.percentile(d2, 90)])), 'r--', color='g', label='norm2', linewidth=2)
-                plt.legend()
-                plt.xlabel('Response time', fontsize=9)
-                plt.ylabel('Probability', fontsize=9)
-                plt.title('Histogram of 90% line response time', fontsize=10)
-                plt.tick_params(axis='both', which='major', labelsize=8)
-                plt.tick_params(axis='both', which='minor', labelsize=6)
-                plt.tight_layout()
-                plt.savefig('results/' + report_name + '/plots/' + file_name + '_hist_prob_90line.png')
-                plt.close()
-
-                plt.figure(figsize=(6, 4), dpi=150)
-                if not pd.isnull(data['mean1']):
-                    plt.plot(range(1, len(d1) + 1), d1, 'ro', color='g', alpha=0.50, label='1')
-                if not pd.isnull(data['mean2']):
-                    plt.plot(range(1, len(d2) + 1), d2, 'ro', color='b', alpha=0.50, label='2')
-                plt.legend()
-                plt.xlabel('Request', fontsize=9)
-                plt.ylabel('Time', fontsize=9)
-                plt.title('Requests time', fontsize=10)
-                plt.tick_params(axis='both', which='major', labelsize=8)
-                plt.tick_params(axis='both', which='minor', labelsize=6)
-                plt.tight_layout()
-                plt.savefig('results/' + report_name + '/plots/' + file_name + '_requests.png')
-                plt.close()
\ No newline at end of file
+        for label in labels:
+            tasks.append((plot_label, (path + self._normalize_test_name(label), [g.get(label) for g in groups], names)))
+        self._render_plots(tasks)
+
+
+def _intervals(low, high):
+    """Text of confidence intervals.
+    """
+    return ['' if np.isnan(lo) else '%.2f .. %.2f' % (lo, hi) for lo, hi in zip(low, high)]
+
+
+def _sorted(samples):
+    return None if samples is None else samples.sorted
+
+
+def _line90(samples):
+    return None if samples is None else samples.below(90)
+
+
+def _values(samples):
+    return None if samples is None else samples.values()
+
+
+def chart_all(path, samples, names):
+    """Chart data of histograms of all response times of every test
+    (lib.samples.Samples).
+    """
+    return charts.write_charts(path + '_all.js', '_all',
+                               [charts.histogram_chart('Histogram of all response time',
+                                                       [(n, _sorted(s)) for n, s in zip(names, samples)]),
+                                charts.histogram_chart('Histogram of 90% line response time',
+                                                       [(n, _line90(s)) for n, s in zip(names, samples)])])
+
+
+def chart_label(path, name, samples, names):
+    """Chart data of histograms and requests times of one label for every test.
+    Samples of test are None if label is absent in test.
+    """
+    return charts.write_charts(path + name + '.js', name,
+                               [charts.histogram_chart('Histogram of all response time',
+                                                       [(n, _sorted(s)) for n, s in zip(names, samples)]),
+                                charts.histogram_chart('Histogram of 90% line response time',
+                                                       [(n, _line90(s)) for n, s in zip(names, samples)]),
+                                charts.scatter_chart('Requests time', [(n, _values(s)) for n, s in zip(names, samples)])])
+
+
+def plot_all(path, samples, names):
+    """Histograms of all response times of every test (lib.samples.Samples).
+    """
+    import matplotlib.pyplot as plt
+
+    timer = PlotTimer()
+    # one binned density of every test for both histograms
+    densities = [(Density(s.sorted, is_sorted=True), name) for s, name in zip(samples, names)]
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    for i, (density, name) in enumerate(densities):
+        density_plot(density, label=name, color=COLORS[i % len(COLORS)])
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    plt.legend()
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of all response time', fontsize=10)
+    timer.save(path + 'hist_prob_all.png')
+
+    plt.figure(figsize=(8, 5), dpi=150)
+    for i, (density, name) in enumerate(densities):
+        density_plot(density, upper=density.p90, label=name, color=COLORS[i % len(COLORS)])
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    plt.legend()
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of 90% line response time', fontsize=10)
+    timer.save(path + 'hist_prob_90line.png')
+
+    return timer.timings
+
+
+def plot_label(path, samples, names):
+    """Histograms and requests times of one label for every test.
+    Samples of test (lib.samples.Samples) are None if label is absent in test.
+    """
+    import matplotlib.pyplot as plt
+
+    timer = PlotTimer()
+    # one binned density of every test for both histograms
+    densities = [(None if s is None else Density(s.sorted, is_sorted=True), name) for s, name in zip(samples, names)]
+
+    plt.figure(figsize=(6, 4))
+    for i, (density, name) in enumerate(densities):
+        if density is not None:
+            density_plot(density, label=name, color=COLORS[i % len(COLORS)])
+
+    plt.legend()
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of all response time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_hist_prob_all.png')
+
+    plt.figure(figsize=(6, 4))
+    for i, (density, name) in enumerate(densities):
+        if density is not None:
+            density_plot(density, upper=density.p90, label=name, color=COLORS[i % len(COLORS)])
+
+    plt.legend()
+    plt.xlabel('Response time', fontsize=9)
+    plt.ylabel('Probability', fontsize=9)
+    plt.title('Histogram of 90% line response time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_hist_prob_90line.png')
+
+    plt.figure(figsize=(6, 4), dpi=150)
+    for i, (s, name) in enumerate(zip(samples, names)):
+        if s is not None:
+            x, y = downsample(np.arange(1, len(s) + 1), s.values())
+            plt.plot(x, y, 'ro', color=COLORS[i % len(COLORS)], alpha=0.50, label=name)
+    plt.legend()
+    plt.xlabel('Request', fontsize=9)
+    plt.ylabel('Time', fontsize=9)
+    plt.title('Requests time', fontsize=10)
+    plt.tick_params(axis='both', which='major', labelsize=8)
+    plt.tick_params(axis='both', which='minor', labelsize=6)
+    timer.save(path + '_requests.png')
+    return timer.timings
@@ -0,0 +1,66 @@
+"""Tests of cache of parsed JTL files.
+
+Usage (from repository root):
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from lib import jtl
+from lib.cache import JtlCache, evict
+
+HEADER = 'timeStamp,elapsed,label,responseCode,responseMessage,success,failureMessage,bytes,Latency,Connect\n'
+# numeric response codes and empty failure messages in first chunk only
+ROWS = ['1500000000000,10,home,200,OK,true,,100,5,1\n',
+        '1500000001000,20,login,200,OK,true,,200,6,\n',
+        '1500000002000,30,home,Non HTTP response code: java.net.SocketException,'
+        'Non HTTP response message: Connection reset,false,Connection reset,0,7,2\n',
+        '1500000003000,40,login,404,Not Found,false,Not found,300,8,3\n']
+
+
+class JtlCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, 'mixed.jtl')
+        with open(self.file, 'w') as f:
+            f.write(HEADER)
+            f.writelines(ROWS)
+        self.cache = JtlCache(os.path.join(self.dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        return pd.concat(list(self.cache.read_chunks(self.file, chunksize=2)))
+
+    def test_mixed_chunks(self):
+        expected = pd.concat(list(jtl.read_chunks(self.file, chunksize=2)))
+        # first read writes entry, second reads it
+        for df in (self.read(), self.read()):
+            self.assertEqual(list(df['responseCode'].astype(str)),
+                             ['200', '200', 'Non HTTP response code: java.net.SocketException', '404'])
+            self.assertEqual(list(df['failureMessage'].astype(object).fillna('')), ['', '', 'Connection reset', 'Not found'])
+            self.assertEqual(list(df['success'].astype(str).str.lower()), ['true', 'true', 'false', 'false'])
+            self.assertEqual(list(df['Connect'].astype(float).fillna(-1)), [1, -1, 2, 3])
+            self.assertEqual(list(df['elapsed']), list(expected['elapsed']))
+            self.assertEqual(list(df['label'].astype(str)), list(expected['label']))
+
+    def test_evict_skips_entries_being_written(self):
+        self.read()
+        cache_dir = self.cache.cache_dir
+        tmp = os.path.join(cache_dir, 'entry.tmp%d' % os.getpid())
+        os.makedirs(tmp)
+        with open(os.path.join(tmp, 'elapsed.bin'), 'wb') as f:
+            f.write(b'\0' * 16)
+        evict(cache_dir, 0, 3600)
+        self.assertEqual([d for d in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, d))],
+                         [os.path.basename(tmp)])
+
+
+if __name__ == '__main__':
+    unittest.main()